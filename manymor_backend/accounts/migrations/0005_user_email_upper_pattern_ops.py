@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 03:38
+
+from django.db import migrations
+
+
+def use_pattern_ops(apps, schema_editor):
+    """
+    Rebuild the UPPER(email) index with text_pattern_ops so istartswith can
+    use it outside the C locale. Operator classes are PostgreSQL only, so
+    the migration state keeps the plain expression index and other
+    databases keep it as is.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    User = apps.get_model('accounts', 'User')
+    quote = schema_editor.quote_name
+    schema_editor.execute(f"DROP INDEX IF EXISTS {quote('accounts_user_email_upper')}")
+    schema_editor.execute(
+        f"CREATE INDEX {quote('accounts_user_email_upper')} "
+        f"ON {quote(User._meta.db_table)} (UPPER({quote('email')}) text_pattern_ops)"
+    )
+
+
+def use_plain_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    User = apps.get_model('accounts', 'User')
+    quote = schema_editor.quote_name
+    schema_editor.execute(f"DROP INDEX IF EXISTS {quote('accounts_user_email_upper')}")
+    schema_editor.execute(
+        f"CREATE INDEX {quote('accounts_user_email_upper')} "
+        f"ON {quote(User._meta.db_table)} (UPPER({quote('email')}))"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_accounts_user_email_upper'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        # Database only: the model state keeps models.Index(Upper('email'))
+        migrations.SeparateDatabaseAndState(
+            state_operations=[],
+            database_operations=[
+                migrations.RunPython(use_pattern_ops, use_plain_index),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class UserManager(BaseUserManager):
@@ -53,6 +54,14 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search on email (admin order search).
+            # On PostgreSQL migration 0005 rebuilds it with text_pattern_ops,
+            # which istartswith (UPPER(email) LIKE ...) needs outside the C locale
+            models.Index(Upper('email'), name='accounts_user_email_upper'),
+        ]
+
     def __str__(self):
         return self.email
     
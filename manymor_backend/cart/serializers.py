@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Cart, CartItem
 from products.serializers import ProductSerializer
 from products.models import Product
+from promotions.pricing import quote_products
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -26,7 +27,13 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ('id', 'items', 'total')
 
     def get_total(self, obj):
+        # Promotional prices, shared with the nested product serializers
+        items = obj.items.all()
+        quotes = self.context.setdefault('price_quotes', {})
+        quotes.update(quote_products([
+            item.product for item in items if item.product_id not in quotes
+        ]))
         return sum(
-            item.product.price * item.quantity
-            for item in obj.items.all()
+            quotes[item.product_id].price * item.quantity
+            for item in items
         )
@@ -5,3 +5,6 @@ class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
 
+    def ready(self):
+        """Import signals when app is ready"""
+        import dashboard.signals
@@ -0,0 +1,41 @@
+"""
+Stale-while-revalidate caching for expensive dashboard reads.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def cached_with_revalidate(key, compute, fresh_seconds, stale_seconds):
+    """
+    Return the cached value for ``key``, computing it with ``compute()`` when
+    missing.
+
+    A value is fresh for ``fresh_seconds``. After that it may still be served
+    for up to ``stale_seconds`` while exactly one caller (the one that wins
+    the refresh lock) recomputes it. Concurrent dashboards therefore cause at
+    most one recomputation per freshness window.
+    """
+    now = time.time()
+    entry = cache.get(key)
+    lock_key = f'{key}:refreshing'
+    locked = False
+
+    if entry is not None:
+        value, computed_at = entry
+        if now - computed_at < fresh_seconds:
+            return value
+        # Stale: let a single caller refresh, everyone else gets the old value
+        locked = cache.add(lock_key, True, timeout=fresh_seconds)
+        if not locked:
+            return value
+
+    try:
+        value = compute()
+        cache.set(key, (value, time.time()), timeout=fresh_seconds + stale_seconds)
+    finally:
+        # Only the lock holder releases it; a cold-cache caller never took it
+        if locked:
+            cache.delete(lock_key)
+
+    return value
@@ -0,0 +1,135 @@
+"""
+In-process publish/subscribe hub and Server-Sent Events helpers.
+
+Model signals publish small events to a topic; each open SSE connection
+holds an asyncio queue subscribed to that topic. Publishing is thread-safe
+(signals fire in sync worker threads) and never blocks: a subscriber that
+falls too far behind simply loses its oldest events.
+
+The hub lives in one process. Run the site under an ASGI server (see
+Procfile) so a single process can hold many idle connections cheaply.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
+
+
+KEEPALIVE_SECONDS = 15
+
+
+class EventHub:
+    """Fan out events published from any thread to asyncio subscribers"""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topic):
+        """Register a queue for ``topic``. Must be called from the event loop."""
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers[topic].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, topic, queue):
+        with self._lock:
+            self._subscribers[topic] = {
+                entry for entry in self._subscribers[topic] if entry[1] is not queue
+            }
+            if not self._subscribers[topic]:
+                del self._subscribers[topic]
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic, event_type, data, event_id=None):
+        """
+        Deliver an event to every subscriber of ``topic``; safe from any
+        thread. Events are numbered by the hub unless ``event_id`` is given.
+        """
+        if event_id is None:
+            event_id = next(self._ids)
+        event = {'id': event_id, 'type': event_type, 'data': data}
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, event)
+            except RuntimeError:
+                # Event loop already closed; the subscriber is going away
+                pass
+        return event
+
+
+def _put_latest(queue, event):
+    """Enqueue, dropping the oldest event if the subscriber is too slow"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+def format_sse(event_type, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def iter_events(hub, topic, initial=()):
+    """
+    Async generator of SSE messages for one connection: the ``initial``
+    messages, then every event published to ``topic``, with keep-alive
+    comments while idle. Unsubscribes when the client disconnects.
+    """
+    queue = hub.subscribe(topic)
+    try:
+        for message in initial:
+            yield message
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event['type'], event['data'], event['id'])
+    finally:
+        hub.unsubscribe(topic, queue)
+
+
+def _authenticate(request):
+    """
+    Resolve the JWT user for a plain Django request. EventSource cannot set
+    headers, so a ``?token=`` query parameter is accepted as well as the
+    usual Authorization: Bearer header.
+    """
+    authentication = JWTAuthentication()
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        result = authentication.authenticate(request)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+authenticate_stream_request = sync_to_async(_authenticate)
+
+
+# Topic-based hub shared by the admin dashboard stream
+admin_hub = EventHub()
+ADMIN_TOPIC = 'admin'
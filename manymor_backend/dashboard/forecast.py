@@ -0,0 +1,121 @@
+"""
+Stock depletion forecasting.
+
+Daily unit sales per product come from ProductDailySales (already grouped
+per product and day, cancelled orders excluded), are laid out as one
+products x days NumPy matrix, and smoothed with exponentially weighted
+averages in a single matrix-vector product. Days until stockout is then
+current stock divided by the smoothed daily demand.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Product
+from .models import ProductDailySales, StockForecast
+
+
+HISTORY_DAYS = 56
+
+# Weight of the most recent day; older days decay by (1 - alpha) per day
+SMOOTHING_ALPHA = 0.2
+
+# Stockouts further out than this get no date
+MAX_FORECAST_DAYS = 3650
+
+
+def smoothing_weights(days, alpha=SMOOTHING_ALPHA):
+    """Normalized exponential weights, oldest day first"""
+    weights = (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def daily_sales_matrix(product_ids, start_day, days):
+    """
+    Units sold per product (rows, in ``product_ids`` order, which must be
+    sorted) per day (columns, from ``start_day``). One query.
+    """
+    matrix = np.zeros((len(product_ids), days), dtype=np.float64)
+    rows = list(
+        ProductDailySales.objects.filter(
+            date__gte=start_day,
+            date__lt=start_day + timedelta(days=days),
+            units__gt=0
+        ).values_list('product_id', 'date', 'units').iterator(chunk_size=10000)
+    )
+    if not rows:
+        return matrix
+
+    sales_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    offsets = np.fromiter(
+        (row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows)
+    ) - start_day.toordinal()
+    units = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    # Drop sales of products that are not being forecast (inactive, deleted)
+    positions = np.searchsorted(product_ids, sales_ids)
+    positions = np.minimum(positions, len(product_ids) - 1)
+    known = product_ids[positions] == sales_ids
+
+    matrix[positions[known], offsets[known]] = units[known]
+    return matrix
+
+
+def forecast_demand(matrix, alpha=SMOOTHING_ALPHA):
+    """Smoothed daily demand per row of a products x days sales matrix"""
+    return matrix @ smoothing_weights(matrix.shape[1], alpha)
+
+
+def days_until_stockout(stock, demand):
+    """Stock divided by demand; NaN where there is no demand"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(demand > 0, np.maximum(stock, 0) / demand, np.nan)
+    return days
+
+
+def compute_forecasts(today=None, history_days=HISTORY_DAYS, alpha=SMOOTHING_ALPHA):
+    """
+    Recompute StockForecast for every active product from the last
+    ``history_days`` full days of sales. Returns the number of products.
+    """
+    today = today or timezone.localdate()
+    start_day = today - timedelta(days=history_days)
+    computed_at = timezone.now()
+
+    products = list(
+        Product.objects.filter(is_active=True).order_by('id').values_list('id', 'stock_quantity')
+    )
+    product_ids = np.array([row[0] for row in products], dtype=np.int64)
+    stock = np.array([row[1] for row in products], dtype=np.float64)
+
+    if len(products):
+        demand = forecast_demand(daily_sales_matrix(product_ids, start_day, history_days), alpha)
+        days = days_until_stockout(stock, demand)
+    else:
+        demand = days = np.zeros(0)
+
+    forecasts = []
+    for product_id, quantity, rate, remaining in zip(
+        product_ids.tolist(), stock.tolist(), demand.tolist(), days.tolist()
+    ):
+        has_demand = not math.isnan(remaining)
+        forecasts.append(StockForecast(
+            product_id=product_id,
+            daily_demand=round(rate, 4),
+            stock_quantity=int(quantity),
+            days_until_stockout=round(remaining, 2) if has_demand else None,
+            stockout_date=(
+                today + timedelta(days=int(remaining))
+                if has_demand and remaining <= MAX_FORECAST_DAYS else None
+            ),
+            computed_at=computed_at
+        ))
+
+    with transaction.atomic():
+        StockForecast.objects.all().delete()
+        StockForecast.objects.bulk_create(forecasts, batch_size=5000)
+
+    return len(forecasts)
@@ -0,0 +1,29 @@
+"""
+Management command to rebuild customer RFM and lifetime value metrics.
+Usage: python manage.py compute_customer_metrics [--batch-size 10000]
+Intended to run nightly (e.g. from cron).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.customers import compute_customer_metrics, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute recency, frequency, monetary value and LTV for every customer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Orders aggregated per NumPy batch (default: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        self.stdout.write('Computing customer metrics...')
+
+        count = compute_customer_metrics(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Computed metrics for {count} customers'))
@@ -0,0 +1,36 @@
+"""
+Management command to recompute stock depletion forecasts.
+Usage: python manage.py forecast_stock [--history-days 56] [--alpha 0.2]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.forecast import compute_forecasts, HISTORY_DAYS, SMOOTHING_ALPHA
+
+
+class Command(BaseCommand):
+    help = 'Forecast days until stockout for every active product from recent daily sales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=HISTORY_DAYS,
+            help=f'Days of sales history to smooth (default: {HISTORY_DAYS})'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=SMOOTHING_ALPHA,
+            help=f'Exponential smoothing factor between 0 and 1 (default: {SMOOTHING_ALPHA})'
+        )
+
+    def handle(self, *args, **options):
+        if options['history_days'] < 1:
+            raise CommandError('--history-days must be at least 1')
+        if not 0 < options['alpha'] <= 1:
+            raise CommandError('--alpha must be in (0, 1]')
+
+        self.stdout.write(f"Forecasting stock from the last {options['history_days']} days of sales...")
+
+        count = compute_forecasts(history_days=options['history_days'], alpha=options['alpha'])
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Forecast {count} products'))
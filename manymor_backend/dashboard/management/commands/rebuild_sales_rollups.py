@@ -0,0 +1,32 @@
+"""
+Management command to backfill or reconcile the daily sales rollup table.
+Usage: python manage.py rebuild_sales_rollups [--since YYYY-MM-DD]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from dashboard.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute DailySalesRollup and ProductDailySales rows from hot and archived orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only rebuild days on or after this date (YYYY-MM-DD). Rebuilds everything when omitted.'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        scope = f'since {since.isoformat()}' if since else 'for all dates'
+        self.stdout.write(f'Rebuilding sales rollups {scope}...')
+
+        count = rebuild_rollups(since)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {count} rollup rows'))
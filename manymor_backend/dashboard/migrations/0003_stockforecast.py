@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_productdailysales'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_demand', models.FloatField(default=0)),
+                ('stock_quantity', models.IntegerField(default=0)),
+                ('days_until_stockout', models.FloatField(blank=True, null=True)),
+                ('stockout_date', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_forecast', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['days_until_stockout'], name='dashboard_forecast_urgency')],
+            },
+        ),
+    ]
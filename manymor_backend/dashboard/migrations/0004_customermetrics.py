@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_accounts_user_email_upper'),
+        ('dashboard', '0003_stockforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerMetrics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('first_order_at', models.DateTimeField()),
+                ('last_order_at', models.DateTimeField()),
+                ('recency_days', models.IntegerField()),
+                ('frequency', models.IntegerField()),
+                ('monetary', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('average_order_value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('lifetime_value', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('recency_score', models.PositiveSmallIntegerField()),
+                ('frequency_score', models.PositiveSmallIntegerField()),
+                ('monetary_score', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Customer metrics',
+                'indexes': [models.Index(fields=['-monetary', '-user'], name='dashboard_customer_monetary'), models.Index(fields=['-last_order_at', '-user'], name='dashboard_customer_last_order'), models.Index(fields=['-first_order_at', '-user'], name='dashboard_customer_first_order')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 09:12
+
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    """Fill the rollups from the orders placed before they were maintained"""
+    from dashboard.rollups import rebuild_rollups
+
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_customermetrics'),
+        ('orders', '0006_pendingordernotification'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,147 @@
 from django.db import models
+from django.db.models import Q
+from django.conf import settings
 
-# Create your models here.
+from orders.models import Order
+from products.models import Category, Product
+
+User = settings.AUTH_USER_MODEL
+
+
+class DailySalesRollup(models.Model):
+    """
+    Pre-aggregated sales per day (in TIME_ZONE) and current order status.
+
+    Rows with no category hold whole-order totals. Rows with a category
+    hold the share of that day's orders attributable to the category
+    (orders containing it, line revenue and units). Maintained
+    incrementally from order signals; ``manage.py rebuild_sales_rollups``
+    backfills and reconciles.
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    category = models.ForeignKey(
+        Category,
+        null=True,
+        blank=True,
+        related_name='sales_rollups',
+        on_delete=models.CASCADE
+    )
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'status'],
+                condition=Q(category__isnull=True),
+                name='dashboard_rollup_unique_total'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'status', 'category'],
+                name='dashboard_rollup_unique_category'
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.category.name if self.category_id else 'all'
+        return f"{self.date} {self.status} ({scope})"
+
+
+class ProductDailySales(models.Model):
+    """
+    Units sold and line revenue per product per day (in TIME_ZONE), from
+    orders that are not cancelled. Backs top-seller rankings and the
+    storefront's trending/best-selling sort orders.
+    """
+    product = models.ForeignKey(
+        Product,
+        related_name='daily_sales',
+        on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'date'],
+                name='dashboard_product_sales_unique_day'
+            ),
+        ]
+        indexes = [
+            # Range scans by date for top-N rankings over a window
+            models.Index(fields=['date', 'product'], name='dashboard_product_sales_date'),
+        ]
+        verbose_name_plural = "Product daily sales"
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}: {self.units}"
+
+
+class StockForecast(models.Model):
+    """
+    Latest demand forecast per active product, written by
+    ``manage.py forecast_stock``. ``days_until_stockout`` is null when the
+    product has no recent sales (no stockout expected).
+    """
+    product = models.OneToOneField(
+        Product,
+        related_name='stock_forecast',
+        on_delete=models.CASCADE
+    )
+    daily_demand = models.FloatField(default=0)
+    stock_quantity = models.IntegerField(default=0)
+    days_until_stockout = models.FloatField(null=True, blank=True)
+    stockout_date = models.DateField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Alerts are listed most urgent first
+            models.Index(fields=['days_until_stockout'], name='dashboard_forecast_urgency'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.days_until_stockout} days"
+
+
+class CustomerMetrics(models.Model):
+    """
+    Recency, frequency, monetary value and estimated lifetime value per
+    customer with at least one non-cancelled order (hot or archived).
+    Rebuilt nightly by ``manage.py compute_customer_metrics``; scores are
+    quintiles (1-5, 5 best) across all customers.
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='metrics',
+        on_delete=models.CASCADE
+    )
+    first_order_at = models.DateTimeField()
+    last_order_at = models.DateTimeField()
+    recency_days = models.IntegerField()
+    frequency = models.IntegerField()
+    monetary = models.DecimalField(max_digits=14, decimal_places=2)
+    average_order_value = models.DecimalField(max_digits=12, decimal_places=2)
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2)
+    recency_score = models.PositiveSmallIntegerField()
+    frequency_score = models.PositiveSmallIntegerField()
+    monetary_score = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # One index per segment ordering (see dashboard.customers.SEGMENTS)
+            models.Index(fields=['-monetary', '-user'], name='dashboard_customer_monetary'),
+            models.Index(fields=['-last_order_at', '-user'], name='dashboard_customer_last_order'),
+            models.Index(fields=['-first_order_at', '-user'], name='dashboard_customer_first_order'),
+        ]
+        verbose_name_plural = "Customer metrics"
+
+    def __str__(self):
+        return f"{self.user_id}: R{self.recency_score} F{self.frequency_score} M{self.monetary_score}"
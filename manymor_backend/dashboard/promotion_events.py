@@ -0,0 +1,53 @@
+"""
+Scheduled promotion starts and ends for the live admin dashboard.
+
+``run_promotion_scheduler`` fires the lifecycle signals in the worker
+process, where no dashboard is connected. Web processes follow the
+scheduler's database checkpoint instead: while an admin stream is open,
+a task polls it and publishes promotion_started / promotion_ended for
+every boundary the worker has passed since, so dashboards hear about a
+boundary once its derived data has been refreshed.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from promotions.scheduler import PromotionScheduler, get_last_run
+from promotions.signals import promotion_started
+from .events import admin_hub, ADMIN_TOPIC
+from .signals import promotion_event_data
+
+
+POLL_SECONDS = 5
+
+
+def publish_boundary(signal, promotion, at):
+    event_type = 'promotion_started' if signal is promotion_started else 'promotion_ended'
+    admin_hub.publish(ADMIN_TOPIC, event_type, promotion_event_data(promotion))
+
+
+class PromotionBoundaryRelay:
+    """Publishes scheduler boundaries to ``admin_hub`` while it has subscribers"""
+
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._task = None
+
+    def ensure_running(self):
+        """Start the relay on the running event loop unless it is already running"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self.run())
+
+    async def run(self):
+        scheduler = PromotionScheduler(since=await sync_to_async(get_last_run)(), send=publish_boundary)
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            if not admin_hub.subscriber_count(ADMIN_TOPIC):
+                return
+            last_run = await sync_to_async(get_last_run)()
+            if last_run is not None and last_run > scheduler.since:
+                await sync_to_async(scheduler.run_due)(last_run)
+
+
+promotion_relay = PromotionBoundaryRelay()
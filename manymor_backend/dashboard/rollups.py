@@ -0,0 +1,268 @@
+"""
+Incremental maintenance of DailySalesRollup and ProductDailySales.
+
+Every order event turns into a small delta applied with F() updates to the
+affected (date, status[, category]) rows, so dashboard reads never have to
+scan the Order table. ``rebuild_rollups`` recomputes rows from scratch for
+backfills and reconciliation.
+"""
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Sum, Count, F, DecimalField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import DailySalesRollup, ProductDailySales
+from .sales import local_midnight
+
+
+LINE_TOTAL = Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+
+
+def rollup_date(order):
+    """Rollup day of an order: its creation date in TIME_ZONE"""
+    return timezone.localdate(order.created_at)
+
+
+def bump_rollup(day, status, category_id=None, orders=0, revenue=Decimal('0'), units=0):
+    """Add the given deltas to one rollup row, creating it if needed"""
+    if not (orders or revenue or units):
+        return
+
+    rollup, _ = DailySalesRollup.objects.get_or_create(
+        date=day,
+        status=status,
+        category_id=category_id
+    )
+    DailySalesRollup.objects.filter(pk=rollup.pk).update(
+        order_count=F('order_count') + orders,
+        revenue=F('revenue') + revenue,
+        units=F('units') + units,
+        updated_at=timezone.now()
+    )
+
+
+def bump_product_sales(product_id, day, units, revenue):
+    """Add units/revenue to one product-day row, creating it if needed"""
+    if not (units or revenue):
+        return
+
+    stats, _ = ProductDailySales.objects.get_or_create(product_id=product_id, date=day)
+    ProductDailySales.objects.filter(pk=stats.pk).update(
+        units=F('units') + units,
+        revenue=F('revenue') + revenue
+    )
+
+
+def product_breakdown(order_id):
+    """Units and line revenue per product for one order"""
+    return list(
+        OrderItem.objects.filter(order_id=order_id).values('product_id').annotate(
+            units=Sum('quantity'),
+            revenue=LINE_TOTAL
+        ).order_by()
+    )
+
+
+def category_breakdown(order_id):
+    """Units and line revenue per category for one order"""
+    return list(
+        OrderItem.objects.filter(order_id=order_id).values(
+            category_id=F('product__category_id')
+        ).annotate(
+            units=Sum('quantity'),
+            revenue=LINE_TOTAL
+        ).order_by()
+    )
+
+
+def record_order_created(order):
+    """A new order counts towards its creation day and status"""
+    bump_rollup(
+        rollup_date(order),
+        order.status,
+        orders=1,
+        revenue=order.total_amount or Decimal('0')
+    )
+
+
+def record_order_item_created(item):
+    """A new line item adds units to the order's total row and its category row"""
+    order = item.order
+    day = rollup_date(order)
+    category_id = item.product.category_id
+
+    bump_rollup(day, order.status, units=item.quantity)
+
+    # The order counts once per category, however many lines it has in it
+    first_in_category = not OrderItem.objects.filter(
+        order_id=order.id,
+        product__category_id=category_id
+    ).exclude(pk=item.pk).exists()
+
+    bump_rollup(
+        day,
+        order.status,
+        category_id=category_id,
+        orders=1 if first_in_category else 0,
+        revenue=item.unit_price * item.quantity,
+        units=item.quantity
+    )
+
+    if order.status != Order.Status.CANCELLED:
+        bump_product_sales(item.product_id, day, item.quantity, item.unit_price * item.quantity)
+
+
+def record_order_changed(order, old_status, old_total, new_status=None, new_total=None):
+    """
+    Apply a status and/or total change of an existing order. The new values
+    default to the ones currently set on ``order``.
+
+    A status change moves the order's whole contribution (count, revenue,
+    units and category shares) from the old status row to the new one.
+    """
+    day = rollup_date(order)
+    new_status = new_status or order.status
+    new_total = (order.total_amount if new_total is None else new_total) or Decimal('0')
+    old_total = old_total or Decimal('0')
+
+    if old_status == new_status:
+        bump_rollup(day, new_status, revenue=new_total - old_total)
+        return
+
+    breakdown = category_breakdown(order.id)
+    units = sum(row['units'] for row in breakdown)
+
+    bump_rollup(day, old_status, orders=-1, revenue=-old_total, units=-units)
+    bump_rollup(day, new_status, orders=1, revenue=new_total, units=units)
+
+    for row in breakdown:
+        bump_rollup(day, old_status, category_id=row['category_id'],
+                    orders=-1, revenue=-row['revenue'], units=-row['units'])
+        bump_rollup(day, new_status, category_id=row['category_id'],
+                    orders=1, revenue=row['revenue'], units=row['units'])
+
+    # Product sales only count orders that are not cancelled
+    cancelled = Order.Status.CANCELLED
+    if cancelled in (old_status, new_status):
+        sign = -1 if new_status == cancelled else 1
+        for row in product_breakdown(order.id):
+            bump_product_sales(row['product_id'], day, sign * row['units'], sign * row['revenue'])
+
+
+def _accumulate(totals, key, order_count=0, revenue=None, units=0):
+    entry = totals.setdefault(key, {'order_count': 0, 'revenue': Decimal('0'), 'units': 0})
+    entry['order_count'] += order_count or 0
+    entry['revenue'] += revenue or Decimal('0')
+    entry['units'] += units or 0
+
+
+def _collect(totals, order_model, item_model, since):
+    """Add grouped totals for one pair of order/item tables into ``totals``"""
+    orders = order_model.objects.all()
+    items = item_model.objects.all()
+    if since is not None:
+        start = local_midnight(since, timezone.get_current_timezone())
+        orders = orders.filter(created_at__gte=start)
+        items = items.filter(order__created_at__gte=start)
+
+    for row in orders.annotate(day=TruncDate('created_at')).values('day', 'status').annotate(
+        order_count=Count('id'),
+        revenue=Sum('total_amount')
+    ).order_by():
+        _accumulate(totals, (row['day'], row['status'], None),
+                    order_count=row['order_count'], revenue=row['revenue'])
+
+    items = items.annotate(day=TruncDate('order__created_at'))
+
+    for row in items.values('day', status=F('order__status')).annotate(
+        units=Sum('quantity')
+    ).order_by():
+        _accumulate(totals, (row['day'], row['status'], None), units=row['units'])
+
+    for row in items.values(
+        'day', status=F('order__status'), category_id=F('product__category_id')
+    ).annotate(
+        order_count=Count('order', distinct=True),
+        revenue=LINE_TOTAL,
+        units=Sum('quantity')
+    ).order_by():
+        _accumulate(totals, (row['day'], row['status'], row['category_id']),
+                    order_count=row['order_count'], revenue=row['revenue'], units=row['units'])
+
+
+def _collect_products(totals, item_model, since):
+    """Add per product-day totals for one item table into ``totals``"""
+    items = item_model.objects.exclude(order__status=Order.Status.CANCELLED)
+    if since is not None:
+        start = local_midnight(since, timezone.get_current_timezone())
+        items = items.filter(order__created_at__gte=start)
+
+    for row in items.annotate(day=TruncDate('order__created_at')).values(
+        'day', 'product_id'
+    ).annotate(
+        units=Sum('quantity'),
+        revenue=LINE_TOTAL
+    ).order_by():
+        entry = totals.setdefault((row['product_id'], row['day']), {'units': 0, 'revenue': Decimal('0')})
+        entry['units'] += row['units'] or 0
+        entry['revenue'] += row['revenue'] or Decimal('0')
+
+
+def rebuild_rollups(since=None, apps=global_apps):
+    """
+    Recompute rollup and product sales rows from the hot and archived order
+    tables.
+
+    Rows dated on or after ``since`` (all rows when None) are replaced in a
+    single transaction. Returns the number of rows written. Migrations pass
+    their historical ``apps``.
+    """
+    Order, OrderItem, ArchivedOrder, ArchivedOrderItem = (
+        apps.get_model('orders', name) for name in ('Order', 'OrderItem', 'ArchivedOrder', 'ArchivedOrderItem')
+    )
+    DailySalesRollup = apps.get_model('dashboard', 'DailySalesRollup')
+    ProductDailySales = apps.get_model('dashboard', 'ProductDailySales')
+
+    totals = {}
+    _collect(totals, Order, OrderItem, since)
+    _collect(totals, ArchivedOrder, ArchivedOrderItem, since)
+
+    product_totals = {}
+    _collect_products(product_totals, OrderItem, since)
+    _collect_products(product_totals, ArchivedOrderItem, since)
+
+    rollups = [
+        DailySalesRollup(
+            date=day,
+            status=status,
+            category_id=category_id,
+            order_count=values['order_count'],
+            revenue=values['revenue'],
+            units=values['units']
+        )
+        for (day, status, category_id), values in totals.items()
+    ]
+    product_sales = [
+        ProductDailySales(
+            product_id=product_id,
+            date=day,
+            units=values['units'],
+            revenue=values['revenue']
+        )
+        for (product_id, day), values in product_totals.items()
+    ]
+
+    with transaction.atomic():
+        for model in (DailySalesRollup, ProductDailySales):
+            stale = model.objects.all()
+            if since is not None:
+                stale = stale.filter(date__gte=since)
+            stale.delete()
+        DailySalesRollup.objects.bulk_create(rollups, batch_size=1000)
+        ProductDailySales.objects.bulk_create(product_sales, batch_size=1000)
+
+    return len(rollups) + len(product_sales)
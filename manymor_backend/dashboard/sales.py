@@ -0,0 +1,198 @@
+"""
+Grouped sales queries for the admin dashboard.
+
+Every helper here costs a constant number of queries regardless of the
+date range: rows are grouped in the database and gaps are zero-filled in
+Python.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum, Count, Q, DateField
+from django.db.models.functions import Trunc
+
+from orders.models import Order
+from products.models import Product
+from .models import DailySalesRollup, ProductDailySales
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Revenue and order counts on the dashboard ignore cancelled orders
+NOT_CANCELLED = ~Q(status=Order.Status.CANCELLED)
+
+
+def format_money(value):
+    """Render a (possibly missing) amount with two decimal places"""
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def bucket_start(day, granularity):
+    """Return the first date of the bucket containing ``day``"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    """Return the first date of the bucket following the one starting at ``day``"""
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        if day.month == 12:
+            return day.replace(year=day.year + 1, month=1)
+        return day.replace(month=day.month + 1)
+    return day + timedelta(days=1)
+
+
+def iter_buckets(start_day, end_day, granularity):
+    """Yield the start date of every bucket between two dates (inclusive)"""
+    current = bucket_start(start_day, granularity)
+    while current <= end_day:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def local_midnight(day, tz):
+    """Aware datetime for the start of ``day`` in ``tz``"""
+    return datetime.combine(day, time.min, tzinfo=tz)
+
+
+def sales_series(range_start, end_day, granularity, tz):
+    """
+    Revenue and order count per bucket from ``range_start`` (aware datetime)
+    to ``end_day``, zero-filled. One query.
+    """
+    rows = Order.objects.filter(
+        created_at__gte=range_start
+    ).annotate(
+        period=Trunc('created_at', granularity, output_field=DateField(), tzinfo=tz)
+    ).values('period').annotate(
+        revenue=Sum('total_amount', filter=NOT_CANCELLED),
+        orders_count=Count('id', filter=NOT_CANCELLED)
+    ).order_by('period')
+
+    by_period = {row['period']: row for row in rows}
+
+    series = []
+    for period in iter_buckets(range_start.astimezone(tz).date(), end_day, granularity):
+        row = by_period.get(period, {})
+        series.append({
+            'date': period.isoformat(),
+            'revenue': format_money(row.get('revenue')),
+            'orders_count': row.get('orders_count') or 0
+        })
+    return series
+
+
+def sales_by_status(range_start):
+    """Order count and revenue per status since ``range_start``. One query."""
+    rows = Order.objects.filter(
+        created_at__gte=range_start
+    ).values('status').annotate(
+        count=Count('id'),
+        revenue=Sum('total_amount')
+    ).order_by()
+
+    by_status = {row['status']: row for row in rows}
+
+    return [{
+        'status': status_label,
+        'count': by_status.get(status_code, {}).get('count', 0),
+        'revenue': format_money(by_status.get(status_code, {}).get('revenue'))
+    } for status_code, status_label in Order.Status.choices]
+
+
+def rollup_sales_series(start_day, end_day, granularity):
+    """
+    Same shape as ``sales_series`` but read from DailySalesRollup, so the
+    cost depends on the number of days rather than the number of orders.
+    Rollup days are in TIME_ZONE.
+    """
+    rows = DailySalesRollup.objects.filter(
+        category__isnull=True,
+        date__gte=start_day,
+        date__lte=end_day
+    ).annotate(
+        period=Trunc('date', granularity, output_field=DateField())
+    ).values('period').annotate(
+        revenue=Sum('revenue', filter=NOT_CANCELLED),
+        orders_count=Sum('order_count', filter=NOT_CANCELLED)
+    ).order_by('period')
+
+    by_period = {row['period']: row for row in rows}
+
+    series = []
+    for period in iter_buckets(start_day, end_day, granularity):
+        row = by_period.get(period, {})
+        series.append({
+            'date': period.isoformat(),
+            'revenue': format_money(row.get('revenue')),
+            'orders_count': row.get('orders_count') or 0
+        })
+    return series
+
+
+def rollup_sales_by_status(start_day):
+    """Same shape as ``sales_by_status`` but read from DailySalesRollup"""
+    rows = DailySalesRollup.objects.filter(
+        category__isnull=True,
+        date__gte=start_day
+    ).values('status').annotate(
+        count=Sum('order_count'),
+        revenue=Sum('revenue')
+    ).order_by()
+
+    by_status = {row['status']: row for row in rows}
+
+    return [{
+        'status': status_label,
+        'count': by_status.get(status_code, {}).get('count') or 0,
+        'revenue': format_money(by_status.get(status_code, {}).get('revenue'))
+    } for status_code, status_label in Order.Status.choices]
+
+
+def rollup_order_summary(today):
+    """Order totals for the summary cards in one aggregate over the rollups"""
+    totals = DailySalesRollup.objects.filter(category__isnull=True).aggregate(
+        total_orders=Sum('order_count'),
+        total_revenue=Sum('revenue', filter=NOT_CANCELLED),
+        recent_orders=Sum('order_count', filter=Q(date__gt=today - timedelta(days=7))),
+        pending_orders=Sum('order_count', filter=Q(
+            status__in=[Order.Status.PLACED, Order.Status.PACKED]
+        ))
+    )
+
+    return {
+        'total_orders': totals['total_orders'] or 0,
+        'total_revenue': totals['total_revenue'] or Decimal('0.00'),
+        'recent_orders': totals['recent_orders'] or 0,
+        'pending_orders': totals['pending_orders'] or 0,
+    }
+
+
+def top_products(start_day, limit=10):
+    """
+    Best sellers since ``start_day`` ranked by units, with their revenue,
+    from ProductDailySales. Two queries (rankings, then products with images).
+    """
+    rankings = list(
+        ProductDailySales.objects.filter(
+            date__gte=start_day
+        ).values('product_id').annotate(
+            total_sold=Sum('units'),
+            revenue=Sum('revenue')
+        ).filter(total_sold__gt=0).order_by('-total_sold', 'product_id')[:limit]
+    )
+
+    products = Product.objects.prefetch_related('images').in_bulk(
+        [row['product_id'] for row in rankings]
+    )
+
+    return [
+        (products[row['product_id']], row['total_sold'], row['revenue'])
+        for row in rankings
+        if row['product_id'] in products
+    ]
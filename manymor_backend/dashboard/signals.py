@@ -0,0 +1,169 @@
+"""
+Django signals keeping the dashboard's pre-aggregated tables up to date and
+feeding the live admin event stream.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from products.models import Product
+from promotions.models import CarouselPromotion, ProductPromotion
+from .rollups import record_order_created, record_order_item_created, record_order_changed
+from .events import admin_hub, ADMIN_TOPIC
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollup_for_order(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Apply the order's contribution (or its change) to DailySalesRollup.
+    Deletions are deliberately ignored: archived orders keep counting.
+    """
+    if raw:
+        return
+
+    if created:
+        record_order_created(instance)
+        return
+
+    old_status = instance.get_loaded_value('status')
+    if old_status is None:
+        # Instance was not loaded from the database; nothing to diff against.
+        # rebuild_sales_rollups reconciles anything missed here.
+        return
+
+    old_total = instance.get_loaded_value('total_amount')
+    new_status = instance.status
+    new_total = instance.total_amount
+    if update_fields is not None:
+        if 'status' not in update_fields:
+            new_status = old_status
+        if 'total_amount' not in update_fields:
+            new_total = old_total
+
+    if new_status != old_status or new_total != old_total:
+        record_order_changed(instance, old_status, old_total, new_status, new_total)
+
+
+@receiver(post_save, sender=OrderItem)
+def update_sales_rollup_for_item(sender, instance, created, raw=False, **kwargs):
+    """Add a new order line's units and revenue to the rollups"""
+    if created and not raw:
+        record_order_item_created(instance)
+
+
+def publish_admin_event(event_type, build_data):
+    """
+    Publish to connected admin dashboards once the current transaction
+    commits. ``build_data`` is only called when someone is listening.
+    """
+    if not admin_hub.subscriber_count(ADMIN_TOPIC):
+        return
+    transaction.on_commit(
+        lambda: admin_hub.publish(ADMIN_TOPIC, event_type, build_data())
+    )
+
+
+def _order_event_data(order, **extra):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'total_amount': str(order.total_amount),
+        'customer_email': order.user.email,
+        'created_at': order.created_at.isoformat(),
+        **extra
+    }
+
+
+@receiver(post_save, sender=Order)
+def publish_order_event(sender, instance, created, raw=False, **kwargs):
+    """Push new orders and status changes to the admin stream"""
+    if raw:
+        return
+
+    if created:
+        # Built at commit time, when checkout has filled in the total
+        publish_admin_event('order_created', lambda: _order_event_data(instance))
+        return
+
+    old_status = instance.get_loaded_value('status')
+    if old_status is not None and old_status != instance.status:
+        publish_admin_event(
+            'order_status_changed',
+            lambda: _order_event_data(instance, previous_status=old_status)
+        )
+
+
+def record_bulk_status_changes(orders):
+    """
+    Do for orders updated with bulk_update what the post_save receivers
+    above do for a save(): update the rollups and push status changes.
+    Each order must still carry its loaded values; they are reset here.
+    """
+    for order in orders:
+        old_status = order.get_loaded_value('status')
+        old_total = order.get_loaded_value('total_amount')
+        if old_status is None or old_status == order.status:
+            continue
+        record_order_changed(order, old_status, old_total)
+        publish_admin_event(
+            'order_status_changed',
+            lambda order=order, old_status=old_status: _order_event_data(order, previous_status=old_status)
+        )
+        order.remember_loaded_values(['status'])
+
+
+@receiver(post_save, sender=Product)
+def publish_stock_event(sender, instance, created, raw=False, **kwargs):
+    """Push an alert when a product's stock drops below the low-stock threshold"""
+    if raw or not instance.is_active:
+        return
+
+    old_stock = instance.get_loaded_value('stock_quantity')
+    new_stock = instance.stock_quantity
+    threshold = Product.LOW_STOCK_THRESHOLD
+    if old_stock is None or old_stock < threshold or new_stock >= threshold:
+        return
+
+    publish_admin_event('stock_low', lambda: {
+        'id': instance.id,
+        'name': instance.name,
+        'stock_quantity': new_stock,
+        'threshold': threshold,
+        'status': 'out_of_stock' if new_stock == 0 else 'low_stock'
+    })
+
+
+def promotion_event_data(promotion):
+    return {
+        'id': promotion.id,
+        'kind': 'carousel' if isinstance(promotion, CarouselPromotion) else 'product',
+        'name': str(promotion),
+        'start_date': promotion.start_date.isoformat(),
+        'end_date': promotion.end_date.isoformat()
+    }
+
+
+@receiver(post_save, sender=CarouselPromotion)
+@receiver(post_save, sender=ProductPromotion)
+def publish_promotion_event(sender, instance, created, raw=False, **kwargs):
+    """Push promotion_started / promotion_ended when an edit changes whether it is live"""
+    if raw:
+        return
+
+    now = timezone.now()
+    was_active = instance.was_active_at(now)
+    is_active = instance.is_currently_active()
+    if was_active == is_active:
+        return
+
+    event_type = 'promotion_started' if is_active else 'promotion_ended'
+    publish_admin_event(event_type, lambda: promotion_event_data(instance))
+
+
+@receiver(post_delete, sender=CarouselPromotion)
+@receiver(post_delete, sender=ProductPromotion)
+def publish_promotion_deleted(sender, instance, **kwargs):
+    """Deleting a live promotion ends it"""
+    if instance.is_currently_active():
+        publish_admin_event('promotion_ended', lambda: promotion_event_data(instance))
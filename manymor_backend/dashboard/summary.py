@@ -0,0 +1,154 @@
+"""
+Admin dashboard summary cards and promotion statistics.
+
+The numbers come from one conditional aggregate per table (sales rollups,
+users, products) and are cached with stale-while-revalidate semantics.
+Promotion statistics only change when a promotion is edited or a schedule
+boundary passes, so they are cached until exactly then.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from accounts.models import User
+from products.models import Product
+from promotions.models import CarouselPromotion, ProductPromotion
+from promotions.cache import get_promotions_version
+from .cache import cached_with_revalidate
+from .sales import rollup_order_summary, format_money
+
+
+SUMMARY_CACHE_KEY = 'dashboard:summary'
+SUMMARY_FRESH_SECONDS = 15
+SUMMARY_STALE_SECONDS = 60
+
+PROMOTION_STATS_CACHE_KEY = 'dashboard:promotion-stats'
+PROMOTION_UPCOMING_DAYS = 7
+PROMOTION_EXPIRED_DAYS = 30
+# Upper bound on the cache lifetime when no boundary is scheduled
+PROMOTION_STATS_MAX_SECONDS = 3600
+
+
+def compute_summary():
+    """Compute the summary cards with three queries"""
+    order_summary = rollup_order_summary(timezone.localdate())
+
+    total_customers = User.objects.filter(role=User.Role.CUSTOMER).count()
+
+    product_stats = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_active=True)),
+        low_stock_count=Count('id', filter=Q(
+            is_active=True,
+            stock_quantity__lt=Product.LOW_STOCK_THRESHOLD
+        ))
+    )
+
+    return {
+        'total_orders': order_summary['total_orders'],
+        'total_revenue': format_money(order_summary['total_revenue']),
+        'total_customers': total_customers,
+        'total_products': product_stats['total_products'],
+        'active_products': product_stats['active_products'],
+        'low_stock_count': product_stats['low_stock_count'],
+        'recent_orders': order_summary['recent_orders'],
+        'pending_orders': order_summary['pending_orders'],
+        'generated_at': timezone.now().isoformat()
+    }
+
+
+def get_summary():
+    """Cached summary, shared by every admin polling the dashboard"""
+    return cached_with_revalidate(
+        SUMMARY_CACHE_KEY,
+        compute_summary,
+        fresh_seconds=SUMMARY_FRESH_SECONDS,
+        stale_seconds=SUMMARY_STALE_SECONDS
+    )
+
+
+def _active_at(now, prefix=''):
+    return Q(**{
+        f'{prefix}is_active': True,
+        f'{prefix}start_date__lte': now,
+        f'{prefix}end_date__gte': now,
+    })
+
+
+def compute_promotion_stats(now):
+    """
+    Promotion statistics at ``now`` with one aggregate per table, plus the
+    earliest future instant at which any of them can change (None if never).
+    """
+    upcoming_until = now + timedelta(days=PROMOTION_UPCOMING_DAYS)
+    expired_since = now - timedelta(days=PROMOTION_EXPIRED_DAYS)
+
+    carousel = CarouselPromotion.objects.aggregate(
+        active=Count('id', filter=_active_at(now)),
+        next_start=Min('start_date', filter=Q(is_active=True, start_date__gt=now)),
+        next_end=Min('end_date', filter=Q(is_active=True, end_date__gte=now))
+    )
+
+    promotions = ProductPromotion.objects.aggregate(
+        active=Count('id', filter=_active_at(now)),
+        upcoming=Count('id', filter=Q(
+            is_active=True,
+            start_date__gt=now,
+            start_date__lte=upcoming_until
+        )),
+        recently_expired=Count('id', filter=Q(end_date__lt=now, end_date__gte=expired_since)),
+        # Starts: the promotion becomes active and leaves "upcoming"
+        next_start=Min('start_date', filter=Q(is_active=True, start_date__gt=now)),
+        # Enters "upcoming" PROMOTION_UPCOMING_DAYS before it starts
+        next_upcoming=Min('start_date', filter=Q(is_active=True, start_date__gt=upcoming_until)),
+        # Ends: leaves "active" and enters "recently expired"
+        next_end=Min('end_date', filter=Q(end_date__gte=now)),
+        # Leaves "recently expired" PROMOTION_EXPIRED_DAYS after it ended
+        next_expiry=Min('end_date', filter=Q(end_date__gte=expired_since))
+    )
+
+    promoted = ProductPromotion.products.through.objects.aggregate(
+        products=Count('product_id', distinct=True, filter=_active_at(now, 'productpromotion__'))
+    )
+
+    boundaries = [
+        carousel['next_start'],
+        # Still active at exactly end_date; the count changes just after
+        carousel['next_end'] and carousel['next_end'] + timedelta(microseconds=1),
+        promotions['next_start'],
+        promotions['next_upcoming'] and promotions['next_upcoming'] - timedelta(days=PROMOTION_UPCOMING_DAYS),
+        promotions['next_end'] and promotions['next_end'] + timedelta(microseconds=1),
+        promotions['next_expiry'] and promotions['next_expiry'] + timedelta(days=PROMOTION_EXPIRED_DAYS),
+    ]
+    boundaries = [boundary for boundary in boundaries if boundary and boundary > now]
+
+    stats = {
+        'active_carousel_promotions': carousel['active'],
+        'active_product_promotions': promotions['active'],
+        'upcoming_promotions': promotions['upcoming'],
+        'recently_expired_promotions': promotions['recently_expired'],
+        'products_with_promotions': promoted['products'],
+    }
+    return stats, min(boundaries, default=None)
+
+
+def get_promotion_stats():
+    """
+    Promotion statistics cached until the next schedule boundary. The key
+    embeds the promotion version, so edits take effect immediately.
+    """
+    key = f'{PROMOTION_STATS_CACHE_KEY}:{get_promotions_version()}'
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    now = timezone.now()
+    stats, next_boundary = compute_promotion_stats(now)
+
+    timeout = PROMOTION_STATS_MAX_SECONDS
+    if next_boundary is not None:
+        timeout = min(timeout, max(1, (next_boundary - now).total_seconds()))
+    cache.set(key, stats, timeout=timeout)
+    return stats
@@ -1,3 +1,486 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+import numpy as np
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from manymor_backend.pagination import count_matches, decode_cursor, estimate_count, keyset_page
+from orders.models import ArchivedOrder, Order, OrderItem
+from products.models import Category, Product
+from .cache import cached_with_revalidate
+from .customers import compute_customer_metrics, quintile_scores, segment_queryset
+from .exports import ORDER_COLUMNS, aiter_chunks
+from .forecast import compute_forecasts, daily_sales_matrix, forecast_demand, smoothing_weights
+from .models import CustomerMetrics, DailySalesRollup, ProductDailySales, StockForecast
+from .promotion_events import promotion_relay
+from .rollups import rebuild_rollups
+from .signals import record_bulk_status_changes
+
+
+class DashboardTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', 'pw', role=User.Role.ADMIN)
+        self.customer = User.objects.create_user('customer@example.com', 'pw')
+        self.category = Category.objects.create(name='Shoes')
+        self.product = Product.objects.create(
+            category=self.category, name='Runner', price=Decimal('10.00'), stock_quantity=100
+        )
+
+    def create_order(self, quantity=1, unit_price=Decimal('10.00'), user=None, **fields):
+        order = Order.objects.create(
+            user=user or self.customer, total_amount=unit_price * quantity, **fields
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, unit_price=unit_price)
+        return order
+
+
+class OrderExportTests(DashboardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+
+    async def export(self, query):
+        response = await self.async_client.get(f'/api/admin/orders/export/?{query}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        # Streamed from an async iterator, so ASGI does not buffer the body
+        self.assertTrue(response.is_async)
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_streams_filtered_csv(self):
+        placed = await Order.objects.acreate(user=self.customer, total_amount=Decimal('30.00'))
+        await OrderItem.objects.acreate(order=placed, product=self.product, quantity=3, unit_price=Decimal('10.00'))
+        for _ in range(2):
+            await Order.objects.acreate(user=self.customer, total_amount=Decimal('5.00'), status=Order.Status.PACKED)
+
+        rows = list(csv.reader(io.StringIO(await self.export('status=PLACED'))))
+
+        self.assertEqual(rows[0], ORDER_COLUMNS)
+        self.assertEqual(len(rows), 2)
+        row = dict(zip(ORDER_COLUMNS, rows[1]))
+        self.assertEqual(row['order_id'], str(placed.id))
+        self.assertEqual(row['status'], Order.Status.PLACED)
+        self.assertEqual(row['customer_email'], 'customer@example.com')
+        self.assertEqual(row['total_amount'], '30.00')
+        self.assertEqual(row['item_count'], '1')
+        self.assertEqual(row['archived'], 'False')
+
+    async def test_streams_every_matching_row(self):
+        for _ in range(5):
+            await Order.objects.acreate(user=self.customer, total_amount=Decimal('5.00'), status=Order.Status.PACKED)
+        await Order.objects.acreate(user=self.customer, total_amount=Decimal('5.00'))
+
+        lines = (await self.export('status=PACKED&export_format=jsonl')).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertIn('"status": "PACKED"', lines[0])
+
+    async def test_chunks_lines_lazily(self):
+        produced = []
+
+        def lines():
+            for number in range(5):
+                produced.append(number)
+                yield f'{number}\n'
+
+        chunks = aiter_chunks(lines(), lines_per_chunk=2)
+        self.assertEqual(await anext(chunks), '0\n1\n')
+        self.assertEqual(produced, [0, 1])
+        self.assertEqual([chunk async for chunk in chunks], ['2\n3\n', '4\n'])
+
+
+class AdminEventStreamTests(DashboardTestCase):
+
+    @mock.patch.object(promotion_relay, 'ensure_running')
+    async def test_streams_summary_first(self, ensure_running):
+        response = await self.async_client.get(
+            '/api/admin/events/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+        events = response.streaming_content
+        self.assertTrue((await anext(events)).startswith(b'event: summary\n'))
+        await events.aclose()
+        ensure_running.assert_called_once()
+
+    async def test_requires_admin(self):
+        response = await self.async_client.get(
+            '/api/admin/events/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.customer)}'}
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+
+class SalesRollupTests(DashboardTestCase):
+
+    def rollup(self, status, category=None):
+        row = DailySalesRollup.objects.filter(status=status, category=category).first()
+        return (row.order_count, row.revenue, row.units) if row else (0, Decimal('0'), 0)
+
+    def product_sales(self):
+        row = ProductDailySales.objects.get(product=self.product)
+        return row.units, row.revenue
+
+    def snapshot(self):
+        # Incremental bookkeeping leaves emptied rows behind; a rebuild does not
+        return (
+            list(DailySalesRollup.objects.filter(order_count__gt=0).order_by('date', 'status', 'category').values_list(
+                'date', 'status', 'category', 'order_count', 'revenue', 'units'
+            )),
+            list(ProductDailySales.objects.filter(units__gt=0).order_by('product', 'date').values_list(
+                'product', 'date', 'units', 'revenue'
+            )),
+        )
+
+    def test_create_counts_order_and_category(self):
+        self.create_order(quantity=2)
+
+        self.assertEqual(self.rollup(Order.Status.PLACED), (1, Decimal('20.00'), 2))
+        self.assertEqual(self.rollup(Order.Status.PLACED, self.category), (1, Decimal('20.00'), 2))
+        self.assertEqual(self.product_sales(), (2, Decimal('20.00')))
+
+    def test_status_changes_move_the_order(self):
+        order = self.create_order(quantity=2)
+
+        order.status = Order.Status.PACKED
+        order.save()
+        self.assertEqual(self.rollup(Order.Status.PLACED), (0, Decimal('0.00'), 0))
+        self.assertEqual(self.rollup(Order.Status.PACKED), (1, Decimal('20.00'), 2))
+        self.assertEqual(self.rollup(Order.Status.PACKED, self.category), (1, Decimal('20.00'), 2))
+
+        order.status = Order.Status.CANCELLED
+        order.save()
+        self.assertEqual(self.rollup(Order.Status.PACKED), (0, Decimal('0.00'), 0))
+        self.assertEqual(self.rollup(Order.Status.CANCELLED), (1, Decimal('20.00'), 2))
+        self.assertEqual(self.product_sales(), (0, Decimal('0.00')))
+
+        # Restoring a cancelled order counts its product sales again
+        order.status = Order.Status.PLACED
+        order.save()
+        self.assertEqual(self.rollup(Order.Status.CANCELLED), (0, Decimal('0.00'), 0))
+        self.assertEqual(self.rollup(Order.Status.PLACED), (1, Decimal('20.00'), 2))
+        self.assertEqual(self.product_sales(), (2, Decimal('20.00')))
+
+    def test_total_change_keeps_the_status_row(self):
+        order = self.create_order(quantity=2)
+
+        order.total_amount = Decimal('15.00')
+        order.save(update_fields=['total_amount'])
+
+        self.assertEqual(self.rollup(Order.Status.PLACED), (1, Decimal('15.00'), 2))
+
+    def test_bulk_status_changes(self):
+        orders = [self.create_order(quantity=1), self.create_order(quantity=3)]
+        orders = list(Order.objects.filter(id__in=[order.id for order in orders]))
+
+        for order in orders:
+            order.status = Order.Status.CANCELLED
+        Order.objects.bulk_update(orders, ['status'])
+        record_bulk_status_changes(orders)
+
+        self.assertEqual(self.rollup(Order.Status.PLACED), (0, Decimal('0.00'), 0))
+        self.assertEqual(self.rollup(Order.Status.CANCELLED), (2, Decimal('40.00'), 4))
+        self.assertEqual(self.product_sales(), (0, Decimal('0.00')))
+
+        # Loaded values were reset, so a second call changes nothing
+        record_bulk_status_changes(orders)
+        self.assertEqual(self.rollup(Order.Status.CANCELLED), (2, Decimal('40.00'), 4))
+
+    def test_rebuild_matches_incremental_rows(self):
+        order = self.create_order(quantity=2)
+        self.create_order(quantity=1, status=Order.Status.PACKED)
+        order.status = Order.Status.CANCELLED
+        order.save()
+        incremental = self.snapshot()
+
+        rebuild_rollups()
+
+        self.assertEqual(self.snapshot(), incremental)
+
+
+@mock.patch('dashboard.cache.time.time')
+class CachedWithRevalidateTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.computed = []
+
+    def compute(self):
+        self.computed.append(len(self.computed) + 1)
+        return self.computed[-1]
+
+    def get(self):
+        return cached_with_revalidate('test:value', self.compute, fresh_seconds=10, stale_seconds=50)
+
+    def test_fresh_value_is_not_recomputed(self, now):
+        now.return_value = 1000
+        self.assertEqual(self.get(), 1)
+        now.return_value = 1009
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.computed, [1])
+
+    def test_stale_value_is_served_while_another_caller_refreshes(self, now):
+        now.return_value = 1000
+        self.get()
+        now.return_value = 1015
+        cache.add('test:value:refreshing', True)
+
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.computed, [1])
+
+    def test_stale_value_is_refreshed_by_the_lock_holder(self, now):
+        now.return_value = 1000
+        self.get()
+        now.return_value = 1015
+
+        self.assertEqual(self.get(), 2)
+        self.assertIsNone(cache.get('test:value:refreshing'))
+        # Fresh again from the refresh time
+        now.return_value = 1024
+        self.assertEqual(self.get(), 2)
+
+    def test_failed_refresh_releases_the_lock(self, now):
+        now.return_value = 1000
+        self.get()
+        now.return_value = 1015
+
+        with self.assertRaises(ZeroDivisionError):
+            cached_with_revalidate('test:value', lambda: 1 / 0, fresh_seconds=10, stale_seconds=50)
+
+        self.assertIsNone(cache.get('test:value:refreshing'))
+        self.assertEqual(self.get(), 2)
+
+    def test_cold_cache_does_not_take_the_lock(self, now):
+        now.return_value = 1000
+        cache.add('test:value:refreshing', True)
+
+        self.assertEqual(self.get(), 1)
+        self.assertTrue(cache.get('test:value:refreshing'))
+
+
+class KeysetPaginationTests(DashboardTestCase):
+
+    ORDERING = ['-created_at', '-id']
+
+    def setUp(self):
+        super().setUp()
+        # Five orders sharing one created_at, so only the id breaks the tie
+        self.orders = [self.create_order() for _ in range(5)]
+        Order.objects.update(created_at=timezone.now().replace(microsecond=123456))
+
+    def page_ids(self, cursor=None, page_size=2):
+        rows, next_cursor = keyset_page(Order.objects.all(), self.ORDERING, cursor, page_size)
+        return [order.id for order in rows], next_cursor
+
+    def test_pages_through_ties_once_each(self):
+        seen = []
+        cursor = None
+        while True:
+            ids, cursor = self.page_ids(cursor)
+            seen.extend(ids)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted((order.id for order in self.orders), reverse=True))
+
+    def test_cursor_is_stable_when_newer_rows_arrive(self):
+        _, cursor = self.page_ids()
+        self.create_order()
+
+        second, _ = self.page_ids(cursor)
+
+        self.assertEqual(second, sorted((order.id for order in self.orders), reverse=True)[2:4])
+
+    def test_rejects_malformed_cursor(self):
+        with self.assertRaises(ValueError):
+            self.page_ids('not-a-cursor')
+        with self.assertRaises(ValueError):
+            decode_cursor('WzFd', 2)  # [1]: one value for a two-field ordering
+
+    def test_estimate_count_is_postgresql_only(self):
+        self.assertIsNone(estimate_count(Order.objects.all()))
+
+    def test_count_matches_exact_below_limit(self):
+        self.assertEqual(count_matches(Order.objects.all(), exact_limit=5), (5, False))
+
+    def test_count_matches_falls_back_to_the_cap(self):
+        # No planner estimate on SQLite: the capped count is a lower bound
+        self.assertEqual(count_matches(Order.objects.all(), exact_limit=3), (4, True))
+
+
+class StockForecastTests(DashboardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.slow = Product.objects.create(
+            category=self.category, name='Walker', price=Decimal('5.00'), stock_quantity=7
+        )
+
+    def add_sales(self, product, days_ago, units):
+        ProductDailySales.objects.create(
+            product=product, date=self.today - timedelta(days=days_ago), units=units
+        )
+
+    def test_weights_favour_recent_days(self):
+        weights = smoothing_weights(4, alpha=0.5)
+
+        np.testing.assert_allclose(weights, np.array([1, 2, 4, 8]) / 15)
+
+    def test_demand_matches_per_row_smoothing(self):
+        matrix = np.array([[0, 3, 1, 4], [2, 2, 2, 2], [0, 0, 0, 0]], dtype=np.float64)
+
+        expected = []
+        for row in matrix:
+            weights = [(1 - 0.2) ** (len(row) - 1 - day) for day in range(len(row))]
+            expected.append(sum(units * weight for units, weight in zip(row, weights)) / sum(weights))
+
+        np.testing.assert_allclose(forecast_demand(matrix, alpha=0.2), expected)
+
+    def test_matrix_places_sales_by_product_and_day(self):
+        self.add_sales(self.product, 3, 4)
+        self.add_sales(self.slow, 1, 2)
+        # Outside the window
+        self.add_sales(self.slow, 10, 9)
+        start_day = self.today - timedelta(days=3)
+
+        matrix = daily_sales_matrix(np.array([self.product.id, self.slow.id]), start_day, 3)
+
+        np.testing.assert_array_equal(matrix, [[4, 0, 0], [0, 0, 2]])
+
+    def test_matrix_skips_products_not_forecast(self):
+        self.add_sales(self.slow, 1, 2)
+
+        matrix = daily_sales_matrix(np.array([self.product.id]), self.today - timedelta(days=2), 2)
+
+        np.testing.assert_array_equal(matrix, [[0, 0]])
+
+    def test_steady_sales_forecast_a_stockout_date(self):
+        for days_ago in range(1, 57):
+            self.add_sales(self.product, days_ago, 5)
+
+        self.assertEqual(compute_forecasts(today=self.today), 2)
+
+        forecast = StockForecast.objects.get(product=self.product)
+        self.assertAlmostEqual(forecast.daily_demand, 5)
+        self.assertAlmostEqual(forecast.days_until_stockout, 20)
+        self.assertEqual(forecast.stockout_date, self.today + timedelta(days=20))
+
+    def test_no_sales_means_no_stockout(self):
+        compute_forecasts(today=self.today)
+
+        forecast = StockForecast.objects.get(product=self.slow)
+        self.assertEqual(forecast.daily_demand, 0)
+        self.assertEqual(forecast.stock_quantity, 7)
+        self.assertIsNone(forecast.days_until_stockout)
+        self.assertIsNone(forecast.stockout_date)
+
+    def test_no_active_products(self):
+        Product.objects.update(is_active=False)
+
+        self.assertEqual(compute_forecasts(today=self.today), 0)
+        self.assertFalse(StockForecast.objects.exists())
+
+
+class CustomerMetricsTests(DashboardTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+
+    def customer_order(self, user, total, days_ago, **fields):
+        order = Order.objects.create(user=user, total_amount=Decimal(total), **fields)
+        Order.objects.filter(id=order.id).update(created_at=self.now - timedelta(days=days_ago))
+        return order
+
+    def customers(self, count):
+        return [User.objects.create_user(f'c{number}@example.com', 'pw') for number in range(count)]
+
+    def test_no_orders(self):
+        self.assertEqual(compute_customer_metrics(now=self.now), 0)
+        self.assertFalse(CustomerMetrics.objects.exists())
+
+    def test_single_customer(self):
+        self.customer_order(self.customer, '30.00', days_ago=10)
+        self.customer_order(self.customer, '10.00', days_ago=2)
+
+        self.assertEqual(compute_customer_metrics(now=self.now), 1)
+
+        metrics = CustomerMetrics.objects.get(user=self.customer)
+        self.assertEqual(metrics.recency_days, 2)
+        self.assertEqual(metrics.frequency, 2)
+        self.assertEqual(metrics.monetary, Decimal('40.00'))
+        self.assertEqual(metrics.average_order_value, Decimal('20.00'))
+        # Younger than a year, so counted as one year: 40 a year for 3 years
+        self.assertEqual(metrics.lifetime_value, Decimal('120.00'))
+        self.assertEqual(
+            (metrics.recency_score, metrics.frequency_score, metrics.monetary_score), (3, 3, 3)
+        )
+
+    def test_quintile_scores(self):
+        users = self.customers(5)
+        for number, user in enumerate(users):
+            self.customer_order(user, f'{number + 1}0.00', days_ago=number)
+
+        compute_customer_metrics(now=self.now)
+
+        metrics = {row.user_id: row for row in CustomerMetrics.objects.all()}
+        self.assertEqual([metrics[user.id].monetary_score for user in users], [1, 2, 3, 4, 5])
+        # The most recent buyer has the best recency score
+        self.assertEqual([metrics[user.id].recency_score for user in users], [5, 4, 3, 2, 1])
+
+    def test_all_equal_recency_scores_the_middle(self):
+        for user in self.customers(4):
+            self.customer_order(user, '10.00', days_ago=5)
+
+        compute_customer_metrics(now=self.now)
+
+        self.assertEqual(set(CustomerMetrics.objects.values_list('recency_score', flat=True)), {3})
+        self.assertEqual(quintile_scores(np.array([7, 7, 7])).tolist(), [3, 3, 3])
+
+    def test_counts_archived_and_skips_cancelled_orders(self):
+        self.customer_order(self.customer, '10.00', days_ago=1)
+        self.customer_order(self.customer, '99.00', days_ago=1, status=Order.Status.CANCELLED)
+        ArchivedOrder.objects.create(
+            id=9999, user=self.customer, total_amount=Decimal('5.00'), status=Order.Status.DELIVERED,
+            payment_status='PAID', created_at=self.now - timedelta(days=400)
+        )
+
+        compute_customer_metrics(now=self.now)
+
+        metrics = CustomerMetrics.objects.get(user=self.customer)
+        self.assertEqual(metrics.frequency, 2)
+        self.assertEqual(metrics.monetary, Decimal('15.00'))
+        self.assertEqual(metrics.recency_days, 1)
+
+    def test_customers_split_across_batches(self):
+        users = self.customers(3)
+        for user in users:
+            for days_ago in (1, 2, 3):
+                self.customer_order(user, '10.00', days_ago=days_ago)
+
+        compute_customer_metrics(now=self.now, batch_size=2)
+
+        self.assertEqual(
+            sorted(CustomerMetrics.objects.values_list('frequency', 'monetary')),
+            [(3, Decimal('30.00'))] * 3
+        )
+
+    def test_segments(self):
+        lapsed, new = self.customers(2)
+        self.customer_order(lapsed, '10.00', days_ago=200)
+        self.customer_order(new, '10.00', days_ago=3)
+        compute_customer_metrics(now=self.now)
+
+        self.assertEqual([row.user_id for row in segment_queryset('lapsed', self.now)], [lapsed.id])
+        self.assertEqual([row.user_id for row in segment_queryset('new', self.now)], [new.id])
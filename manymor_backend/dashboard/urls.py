@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import AdminSummaryView, AdminSalesView, StockAlertsView, AdminOrdersView, AdminPromotionStatsView
+from .views import (
+    AdminSummaryView, AdminSalesView, StockAlertsView, AdminOrdersView,
+    AdminOrdersExportView, AdminPromotionStatsView, AdminCustomerSegmentView,
+    admin_event_stream
+)
 
 urlpatterns = [
     path('summary/', AdminSummaryView.as_view(), name='admin-summary'),
     path('sales/', AdminSalesView.as_view(), name='admin-sales'),
     path('stock-alerts/', StockAlertsView.as_view(), name='stock-alerts'),
     path('orders/', AdminOrdersView.as_view(), name='admin-orders'),
+    path('orders/export/', AdminOrdersExportView.as_view(), name='admin-orders-export'),
     path('orders/<int:order_id>/', AdminOrdersView.as_view(), name='admin-order-update'),
+    path('customers/segments/<str:segment>/', AdminCustomerSegmentView.as_view(), name='admin-customer-segment'),
+    path('events/', admin_event_stream, name='admin-events'),
     path('promotions/stats/', AdminPromotionStatsView.as_view(), name='admin-promotion-stats'),
 ]
@@ -1,19 +1,79 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count, Q
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse, JsonResponse
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from decimal import Decimal
+import math
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from products.permissions import IsAdminUserRole
-from orders.models import Order
-from orders.serializers import OrderSerializer
+from manymor_backend.pagination import keyset_page, count_matches, parse_page_size
+from orders.models import Order, OrderItem, ArchivedOrder
+from orders.serializers import OrderSerializer, AdminOrderListSerializer, serialize_order
+from orders.archive import get_order_or_archived
 from products.models import Product
-from accounts.models import User
-from promotions.models import CarouselPromotion, ProductPromotion
 from promotions.serializers import CarouselPromotionSerializer, ProductPromotionSerializer
+from .sales import (
+    GRANULARITIES, bucket_start, local_midnight, format_money, top_products,
+    sales_series, sales_by_status,
+    rollup_sales_series, rollup_sales_by_status
+)
+from .summary import get_summary, get_promotion_stats
+from .models import StockForecast
+from .customers import SEGMENTS, segment_queryset
+from .events import (
+    admin_hub, ADMIN_TOPIC, format_sse, iter_events, authenticate_stream_request
+)
+from .promotion_events import promotion_relay
+from accounts.models import User
+from .exports import (
+    ORDER_COLUMNS, ITEM_COLUMNS, iter_export_orders, iter_export_rows,
+    stream_csv, stream_jsonl, aiter_chunks
+)
+
+
+def filter_orders(queryset, params):
+    """
+    Apply the admin order filters (status, payment_status, search and
+    date_from/date_to as YYYY-MM-DD) to an Order or ArchivedOrder queryset.
+    Raises ValueError for malformed dates.
+    """
+    # Filter by status if provided
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # Filter by payment status if provided
+    payment_status = params.get('payment_status')
+    if payment_status:
+        queryset = queryset.filter(payment_status=payment_status)
+
+    # Search: "123" or "#123" is an exact order id lookup, anything else
+    # is a case-insensitive prefix match on the customer's email. Both can
+    # use an index, unlike a contains match on a text-cast id.
+    search = (params.get('search') or '').strip()
+    if search:
+        order_id = search.lstrip('#')
+        if order_id.isdigit():
+            queryset = queryset.filter(id=int(order_id))
+        else:
+            queryset = queryset.filter(user__email__istartswith=search)
+
+    # Filter by creation date range (inclusive)
+    for param, lookup in (('date_from', 'created_at__date__gte'), ('date_to', 'created_at__date__lte')):
+        value = params.get(param)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'{param} must be a date in YYYY-MM-DD format')
+            queryset = queryset.filter(**{lookup: parsed})
+
+    return queryset
 
 
 class AdminSummaryView(APIView):
@@ -23,56 +83,8 @@ class AdminSummaryView(APIView):
     permission_classes = [IsAdminUserRole]
 
     def get(self, request):
-        # Total orders
-        total_orders = Order.objects.count()
-        
-        # Total revenue (sum of all completed orders)
-        total_revenue = Order.objects.exclude(
-            status=Order.Status.CANCELLED
-        ).aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
-        
-        # Total customers
-        total_customers = User.objects.filter(
-            role=User.Role.CUSTOMER
-        ).count()
-        
-        # Total products
-        total_products = Product.objects.count()
-        
-        # Active products
-        active_products = Product.objects.filter(is_active=True).count()
-        
-        # Low stock products count (stock < 10)
-        low_stock_count = Product.objects.filter(
-            is_active=True,
-            stock_quantity__lt=10
-        ).count()
-        
-        # Recent orders (last 7 days)
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_orders = Order.objects.filter(
-            created_at__gte=seven_days_ago
-        ).count()
-        
-        # Pending orders
-        pending_orders = Order.objects.filter(
-            status__in=[Order.Status.PLACED, Order.Status.PACKED]
-        ).count()
-        
-        summary = {
-            'total_orders': total_orders,
-            'total_revenue': str(total_revenue),
-            'total_customers': total_customers,
-            'total_products': total_products,
-            'active_products': active_products,
-            'low_stock_count': low_stock_count,
-            'recent_orders': recent_orders,
-            'pending_orders': pending_orders
-        }
-        
-        return Response(summary, status=status.HTTP_200_OK)
+        # Served from a short-lived shared cache; see dashboard/summary.py
+        return Response(get_summary(), status=status.HTTP_200_OK)
 
 
 class AdminSalesView(APIView):
@@ -83,81 +95,63 @@ class AdminSalesView(APIView):
 
     def get(self, request):
         # Get query parameters for date range
-        days = int(request.query_params.get('days', 30))
-        
-        # Calculate date range
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get daily sales data
-        daily_sales = []
-        current_date = start_date.date()
-        
-        while current_date <= end_date.date():
-            next_date = current_date + timedelta(days=1)
-            
-            # Get orders for this day
-            day_orders = Order.objects.filter(
-                created_at__date=current_date
-            ).exclude(status=Order.Status.CANCELLED)
-            
-            daily_revenue = day_orders.aggregate(
-                total=Sum('total_amount')
-            )['total'] or Decimal('0.00')
-            
-            daily_sales.append({
-                'date': current_date.isoformat(),
-                'revenue': str(daily_revenue),
-                'orders_count': day_orders.count()
-            })
-            
-            current_date = next_date
-        
-        # Get sales by status
-        sales_by_status = []
-        for status_choice in Order.Status.choices:
-            status_code = status_choice[0]
-            status_label = status_choice[1]
-            
-            status_count = Order.objects.filter(
-                status=status_code,
-                created_at__gte=start_date
-            ).count()
-            
-            status_revenue = Order.objects.filter(
-                status=status_code,
-                created_at__gte=start_date
-            ).aggregate(
-                total=Sum('total_amount')
-            )['total'] or Decimal('0.00')
-            
-            sales_by_status.append({
-                'status': status_label,
-                'count': status_count,
-                'revenue': str(status_revenue)
-            })
-        
-        # Top selling products
-        top_products = Product.objects.filter(
-            orderitem__order__created_at__gte=start_date
-        ).annotate(
-            total_sold=Sum('orderitem__quantity'),
-            revenue=Sum('orderitem__quantity') * Sum('orderitem__unit_price')
-        ).prefetch_related('images').order_by('-total_sold')[:10]
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if days < 1:
+            return Response(
+                {'error': 'days must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return Response(
+                {'error': f'granularity must be one of: {", ".join(GRANULARITIES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tz_name = request.query_params.get('timezone')
+        try:
+            tz = ZoneInfo(tz_name) if tz_name else timezone.get_current_timezone()
+        except (ZoneInfoNotFoundError, ValueError):
+            return Response(
+                {'error': f'Unknown timezone: {tz_name}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        # Calculate date range, aligned to whole buckets in the requested timezone
+        end_day = timezone.now().astimezone(tz).date()
+        start_day = bucket_start(end_day - timedelta(days=days), granularity)
+        start_date = local_midnight(start_day, tz)
+        
+        # Sales per day/week/month, zero-filled. The rollup table is kept in
+        # TIME_ZONE days, so other timezones fall back to grouping orders.
+        if str(tz) == timezone.get_default_timezone_name():
+            daily_sales = rollup_sales_series(start_day, end_day, granularity)
+            status_breakdown = rollup_sales_by_status(start_day)
+        else:
+            daily_sales = sales_series(start_date, end_day, granularity, tz)
+            status_breakdown = sales_by_status(start_date)
+        
+        # Top selling products, ranked from the per-product sales stats
         top_products_data = [{
             'id': product.id,
             'name': product.name,
-            'total_sold': product.total_sold or 0,
+            'total_sold': total_sold,
+            'revenue': format_money(revenue),
             'current_stock': product.stock_quantity,
             'images': [request.build_absolute_uri(img.image.url) for img in product.images.all()]
-        } for product in top_products]
+        } for product, total_sold, revenue in top_products(start_day)]
         
         sales_data = {
             'daily_sales': daily_sales,
-            'sales_by_status': sales_by_status,
+            'sales_by_status': status_breakdown,
             'top_products': top_products_data,
-            'period_days': days
+            'period_days': days,
+            'granularity': granularity,
+            'timezone': str(tz)
         }
         
         return Response(sales_data, status=status.HTTP_200_OK)
@@ -165,11 +159,19 @@ class AdminSalesView(APIView):
 
 class StockAlertsView(APIView):
     """
-    Get products with low stock or out of stock
+    Get products with low stock or out of stock.
+
+    With ``?mode=forecast`` products are instead ranked by forecast days
+    until stockout (see ``manage.py forecast_stock``), limited to those
+    running out within ``horizon`` days, with a suggested reorder quantity
+    covering ``cover_days`` of demand.
     """
     permission_classes = [IsAdminUserRole]
 
     def get(self, request):
+        if request.query_params.get('mode') == 'forecast':
+            return self.get_forecast(request)
+
         # Get threshold from query params (default: 10)
         threshold = int(request.query_params.get('threshold', 10))
         
@@ -216,46 +218,144 @@ class StockAlertsView(APIView):
         
         return Response(alerts, status=status.HTTP_200_OK)
 
+    def get_forecast(self, request):
+        try:
+            horizon = int(request.query_params.get('horizon', 14))
+            cover_days = int(request.query_params.get('cover_days', 30))
+        except ValueError:
+            return Response(
+                {'error': 'horizon and cover_days must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Most urgent first; products without recent sales never alert
+        forecasts = StockForecast.objects.filter(
+            product__is_active=True,
+            days_until_stockout__lte=horizon
+        ).select_related('product__category').order_by('days_until_stockout', 'product_id')
+
+        alerts = [{
+            'id': forecast.product_id,
+            'name': forecast.product.name,
+            'category': forecast.product.category.name,
+            'stock_quantity': forecast.product.stock_quantity,
+            'daily_demand': round(forecast.daily_demand, 2),
+            'days_until_stockout': forecast.days_until_stockout,
+            'stockout_date': forecast.stockout_date,
+            'reorder_quantity': max(
+                0, math.ceil(forecast.daily_demand * cover_days) - forecast.product.stock_quantity
+            ),
+            'status': 'out_of_stock' if forecast.product.stock_quantity <= 0 else 'forecast_low'
+        } for forecast in forecasts]
+
+        computed_at = StockForecast.objects.order_by('-computed_at').values_list(
+            'computed_at', flat=True
+        ).first()
+
+        return Response({
+            'alerts': alerts,
+            'count': len(alerts),
+            'horizon': horizon,
+            'cover_days': cover_days,
+            'computed_at': computed_at
+        }, status=status.HTTP_200_OK)
+
+
+class AdminCustomerSegmentView(APIView):
+    """
+    Page through a customer segment (top_spenders, lapsed, new) from the
+    precomputed CustomerMetrics table (see ``manage.py compute_customer_metrics``).
+    Keyset-paginated with ``cursor`` and ``page_size`` like the order listing.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request, segment):
+        if segment not in SEGMENTS:
+            return Response(
+                {'error': f"Unknown segment. Choose one of: {', '.join(SEGMENTS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        metrics = segment_queryset(segment)
+
+        try:
+            page, next_cursor = keyset_page(
+                metrics,
+                ordering=SEGMENTS[segment],
+                cursor=request.query_params.get('cursor'),
+                page_size=parse_page_size(request.query_params.get('page_size'))
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        count, count_is_estimate = count_matches(metrics)
+
+        customers = [{
+            'id': entry.user_id,
+            'email': entry.user.email,
+            'first_order_at': entry.first_order_at,
+            'last_order_at': entry.last_order_at,
+            'recency_days': entry.recency_days,
+            'frequency': entry.frequency,
+            'monetary': str(entry.monetary),
+            'average_order_value': str(entry.average_order_value),
+            'lifetime_value': str(entry.lifetime_value),
+            'rfm_score': f'{entry.recency_score}{entry.frequency_score}{entry.monetary_score}',
+            'computed_at': entry.computed_at
+        } for entry in page]
+
+        return Response({
+            'segment': segment,
+            'count': count,
+            'count_is_estimate': count_is_estimate,
+            'next_cursor': next_cursor,
+            'customers': customers
+        }, status=status.HTTP_200_OK)
+
 
 class AdminOrdersView(APIView):
     """
-    Get all orders for admin dashboard with filtering and pagination support
+    Get all orders for admin dashboard with filtering and pagination support.
+
+    Pages are keyset-paginated: pass the returned ``next_cursor`` back as
+    ``?cursor=`` (with an optional ``page_size``, max 200) to get the next page.
     """
     permission_classes = [IsAdminUserRole]
 
-    def get(self, request):
+    def get(self, request, order_id=None):
+        # Single order lookup, including orders moved to the archive tables
+        if order_id is not None:
+            order = get_order_or_archived(order_id)
+            return Response(serialize_order(order), status=status.HTTP_200_OK)
+
         # Get all orders (not filtered by user)
-        orders = Order.objects.select_related('user').prefetch_related('items__product')
-        
-        # Filter by status if provided
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            orders = orders.filter(status=status_filter)
-        
-        # Filter by payment status if provided
-        payment_status = request.query_params.get('payment_status')
-        if payment_status:
-            orders = orders.filter(payment_status=payment_status)
-        
-        # Search by order ID or user email
-        search = request.query_params.get('search')
-        if search:
-            orders = orders.filter(
-                Q(id__icontains=search) | 
-                Q(user__email__icontains=search) |
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search)
+        orders = Order.objects.all()
+
+        try:
+            orders = filter_orders(orders, request.query_params)
+            page_size = parse_page_size(request.query_params.get('page_size'))
+            # Most recent first; id breaks ties so the cursor is exact
+            page, next_cursor = keyset_page(
+                orders.select_related('user').prefetch_related(
+                    Prefetch('items', queryset=OrderItem.objects.select_related('product').only(
+                        'id', 'order_id', 'product_id', 'product__name', 'quantity', 'unit_price'
+                    ))
+                ),
+                ordering=('-created_at', '-id'),
+                cursor=request.query_params.get('cursor'),
+                page_size=page_size
             )
-        
-        # Order by most recent first
-        orders = orders.order_by('-created_at')
-        
-        # Serialize the orders
-        serializer = OrderSerializer(orders, many=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Exact for small result sets, planner estimate for large ones
+        count, count_is_estimate = count_matches(orders)
         
         return Response({
-            'count': orders.count(),
-            'orders': serializer.data
+            'count': count,
+            'count_is_estimate': count_is_estimate,
+            'next_cursor': next_cursor,
+            'orders': AdminOrderListSerializer(page, many=True).data
         }, status=status.HTTP_200_OK)
     
     def patch(self, request, order_id):
@@ -280,53 +380,97 @@ class AdminOrdersView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class AdminOrdersExportView(APIView):
+    """
+    Stream all matching orders as CSV or JSON Lines.
+
+    Query params: the AdminOrdersView filters plus date_from/date_to,
+    export_format=csv|jsonl, rows=orders|items and include_archived=true.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'csv')
+        rows = request.query_params.get('rows', 'orders')
+        include_archived = request.query_params.get('include_archived', 'false').lower() == 'true'
+
+        if export_format not in ('csv', 'jsonl'):
+            return Response(
+                {'error': 'export_format must be one of: csv, jsonl'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if rows not in ('orders', 'items'):
+            return Response(
+                {'error': 'rows must be one of: orders, items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            orders = filter_orders(Order.objects.all(), request.query_params)
+            archived_orders = None
+            if include_archived:
+                archived_orders = filter_orders(ArchivedOrder.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        export_rows = iter_export_rows(
+            iter_export_orders(orders, archived_orders, rows=rows),
+            rows=rows
+        )
+
+        if export_format == 'csv':
+            columns = ITEM_COLUMNS if rows == 'items' else ORDER_COLUMNS
+            content = stream_csv(export_rows, columns)
+            content_type = 'text/csv'
+        else:
+            content = stream_jsonl(export_rows)
+            content_type = 'application/x-ndjson'
+
+        filename = f"orders-{rows}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response = StreamingHttpResponse(aiter_chunks(content), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class AdminPromotionStatsView(APIView):
     """
-    Get promotion statistics for admin dashboard
+    Get promotion statistics for admin dashboard (cached until the next
+    promotion start/end or edit)
     """
     permission_classes = [IsAdminUserRole]
 
     def get(self, request):
-        now = timezone.now()
-        
-        # Active carousel promotions
-        active_carousel = CarouselPromotion.objects.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).count()
-        
-        # Active product promotions
-        active_product_promos = ProductPromotion.objects.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).count()
-        
-        # Upcoming promotions (starting in next 7 days)
-        upcoming = ProductPromotion.objects.filter(
-            is_active=True,
-            start_date__gt=now,
-            start_date__lte=now + timedelta(days=7)
-        ).count()
-        
-        # Expired promotions (ended in last 30 days)
-        recently_expired = ProductPromotion.objects.filter(
-            end_date__lt=now,
-            end_date__gte=now - timedelta(days=30)
-        ).count()
-        
-        # Products with active promotions
-        promoted_products = Product.objects.filter(
-            promotions__is_active=True,
-            promotions__start_date__lte=now,
-            promotions__end_date__gte=now
-        ).distinct().count()
-        
-        return Response({
-            'active_carousel_promotions': active_carousel,
-            'active_product_promotions': active_product_promos,
-            'upcoming_promotions': upcoming,
-            'recently_expired_promotions': recently_expired,
-            'products_with_promotions': promoted_products,
-        }, status=status.HTTP_200_OK)
+        return Response(get_promotion_stats(), status=status.HTTP_200_OK)
+
+
+async def admin_event_stream(request):
+    """
+    Live admin dashboard over Server-Sent Events.
+
+    Sends the current summary once, then pushes order_created,
+    order_status_changed, stock_low, promotion_started and promotion_ended
+    events as they happen. Authenticate with the usual Bearer header or,
+    for EventSource clients, ``?token=<access token>``.
+    """
+    user = await authenticate_stream_request(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    if user.role != User.Role.ADMIN:
+        return JsonResponse(
+            {'detail': 'You do not have permission to perform this action.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    summary = await sync_to_async(get_summary)()
+    promotion_relay.ensure_running()
+
+    response = StreamingHttpResponse(
+        iter_events(admin_hub, ADMIN_TOPIC, initial=[format_sse('summary', summary)]),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
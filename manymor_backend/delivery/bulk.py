@@ -0,0 +1,119 @@
+"""
+Bulk delivery status transitions for dispatch runs.
+
+A dispatch run moves hundreds of deliveries at once. Instead of one
+save() (and one email) per delivery, the batch is locked and validated in
+memory, written with bulk_update / bulk_create, and the customer emails
+are queued with the notification coalescer (orders.notifications), which
+sends them together over one mail connection.
+
+bulk_update does not send post_save, so the work the Order and Delivery
+receivers would have done (rollups, admin events, tracking cache, live
+tracking events) is done here explicitly.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.signals import record_bulk_status_changes
+from orders.models import Order
+from orders.notifications import order_notifications
+from .models import Delivery, DeliveryStatusLog, ORDER_STATUS_FOR_DELIVERY
+from .tracking import invalidate_tracking
+from .events import publish_status_logs
+from .eta import fill_estimated_delivery
+
+
+MAX_BULK_UPDATES = 1000
+
+# Deliveries only move forward through these
+STATUS_SEQUENCE = list(Delivery.Status.values)
+
+
+def parse_updates(data):
+    """
+    Normalize a request body (a list, or ``{"updates": [...]}``) to a list of
+    ``(order_id, status, notes)``. Raises ValueError for malformed input.
+    """
+    if isinstance(data, dict):
+        data = data.get('updates')
+    if not isinstance(data, list) or not data:
+        raise ValueError('Provide a non-empty list of {order_id, status, notes} updates')
+    if len(data) > MAX_BULK_UPDATES:
+        raise ValueError(f'At most {MAX_BULK_UPDATES} updates per request')
+
+    updates, seen = [], set()
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f'Update {index} must be an object')
+        try:
+            order_id = int(item.get('order_id'))
+        except (TypeError, ValueError):
+            raise ValueError(f'Update {index}: order_id must be an integer')
+        if order_id in seen:
+            raise ValueError(f'Update {index}: order {order_id} appears more than once')
+        seen.add(order_id)
+        updates.append((order_id, item.get('status'), item.get('notes') or ''))
+    return updates
+
+
+def transition_error(delivery, new_status):
+    """Why ``delivery`` cannot move to ``new_status``, or None if it can"""
+    if new_status not in Delivery.Status.values:
+        return f'Invalid status. Must be one of: {STATUS_SEQUENCE}'
+    if delivery.order.status == Order.Status.CANCELLED:
+        return 'Order is cancelled'
+    if STATUS_SEQUENCE.index(new_status) <= STATUS_SEQUENCE.index(delivery.status):
+        return f'Cannot move delivery from {delivery.status} to {new_status}'
+    return None
+
+
+def apply_status_updates(updates, user=None):
+    """
+    Apply ``(order_id, status, notes)`` transitions in one transaction.
+
+    Invalid entries are skipped and reported; the valid ones are applied.
+    Returns ``(deliveries, errors)`` where errors are
+    ``{'order_id', 'error'}`` dicts.
+    """
+    errors, changed = [], []
+    with transaction.atomic():
+        deliveries = Delivery.objects.select_related('order__user').select_for_update(of=('self', 'order')).in_bulk(
+            [order_id for order_id, _, _ in updates], field_name='order_id'
+        )
+
+        for order_id, new_status, notes in updates:
+            delivery = deliveries.get(order_id)
+            error = 'No delivery found for this order' if delivery is None else transition_error(delivery, new_status)
+            if error:
+                errors.append({'order_id': order_id, 'error': error})
+                continue
+            changed.append((delivery, new_status, notes or f'Status changed from {delivery.status} to {new_status}'))
+
+        if not changed:
+            return [], errors
+
+        now = timezone.now()
+        logs = []
+        order_notifications.add_many(
+            (delivery.order_id, delivery.order.status) for delivery, _, _ in changed
+        )
+        for delivery, new_status, notes in changed:
+            delivery.status = new_status
+            delivery.remember_loaded_values(['status'])
+            delivery.updated_at = now
+            fill_estimated_delivery(delivery, now)
+            delivery.order.status = ORDER_STATUS_FOR_DELIVERY[new_status]
+            logs.append(DeliveryStatusLog(delivery=delivery, status=new_status, notes=notes, created_by=user))
+
+        deliveries = [delivery for delivery, _, _ in changed]
+        orders = [delivery.order for delivery in deliveries]
+        Delivery.objects.bulk_update(deliveries, ['status', 'estimated_delivery', 'updated_at'])
+        Order.objects.bulk_update(orders, ['status'])
+        DeliveryStatusLog.objects.bulk_create(logs)
+        publish_status_logs(logs)
+
+        record_bulk_status_changes(orders)
+        order_ids = [order.id for order in orders]
+        transaction.on_commit(lambda: invalidate_tracking(*order_ids))
+
+    return deliveries, errors
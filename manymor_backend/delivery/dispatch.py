@@ -0,0 +1,117 @@
+"""
+Dispatch planning: pending orders grouped into batches by shipping city.
+
+A single grouped query over the lines of pending orders (served by the
+order (status, shipping_city) index) returns the quantity per city,
+status, order and product. Batches and their pick lists are assembled from
+it in memory. A batch moves on to its next status with one bulk
+transition (see delivery.bulk).
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Sum
+
+from orders.addresses import normalize_city
+from orders.models import Order, OrderItem
+from .bulk import apply_status_updates
+from .models import Delivery
+
+
+# Pending order status -> the delivery status a batch moves to
+NEXT_STATUS = {
+    Order.Status.PLACED: Delivery.Status.PACKED,
+    Order.Status.PACKED: Delivery.Status.DISPATCHED,
+}
+
+MAX_BATCH_SIZE = 100
+
+
+def _pending_lines(city=None, status=None):
+    lines = OrderItem.objects.filter(order__status__in=list(NEXT_STATUS))
+    if city is not None:
+        lines = lines.filter(order__shipping_city=normalize_city(city))
+    if status:
+        lines = lines.filter(order__status=status)
+    return lines.values(
+        'order__shipping_city', 'order__status', 'order_id', 'product_id', 'product__name'
+    ).annotate(quantity=Sum('quantity')).order_by(
+        'order__shipping_city', 'order__status', 'order_id', 'product_id'
+    )
+
+
+def _batch(city, status, order_ids, picks):
+    pick_list = sorted(picks.values(), key=lambda pick: (-pick['quantity'], pick['product_id']))
+    return {
+        'city': city,
+        'status': status,
+        'next_status': NEXT_STATUS[status],
+        'order_count': len(order_ids),
+        'order_ids': order_ids,
+        'units': sum(pick['quantity'] for pick in pick_list),
+        'pick_list': pick_list,
+    }
+
+
+def plan_dispatch_batches(city=None, status=None, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Batches of pending orders sharing a shipping city and status, at most
+    ``max_batch_size`` orders each, with the combined pick list (units per
+    product, largest first). One query.
+    """
+    if status and status not in NEXT_STATUS:
+        raise ValueError(f"status must be one of: {', '.join(NEXT_STATUS)}")
+    if max_batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+
+    batches = []
+    rows = _pending_lines(city, status)
+    for (batch_city, batch_status), group in groupby(rows, key=itemgetter('order__shipping_city', 'order__status')):
+        order_ids, picks = [], {}
+        for order_id, lines in groupby(group, key=itemgetter('order_id')):
+            if len(order_ids) == max_batch_size:
+                batches.append(_batch(batch_city, batch_status, order_ids, picks))
+                order_ids, picks = [], {}
+            order_ids.append(order_id)
+            for line in lines:
+                pick = picks.setdefault(line['product_id'], {
+                    'product_id': line['product_id'],
+                    'product_name': line['product__name'],
+                    'quantity': 0,
+                })
+                pick['quantity'] += line['quantity']
+        batches.append(_batch(batch_city, batch_status, order_ids, picks))
+    return batches
+
+
+def dispatch_batch(city, status, order_ids=None, notes='', user=None):
+    """
+    Move a batch (the given ``order_ids``, or every pending order of
+    ``city`` in ``status``) to its next status with one bulk transition.
+    Returns ``apply_status_updates``' ``(deliveries, errors)``.
+    """
+    if status not in NEXT_STATUS:
+        raise ValueError(f"status must be one of: {', '.join(NEXT_STATUS)}")
+    if order_ids is None:
+        order_ids = list(
+            Order.objects.filter(status=status, shipping_city=normalize_city(city)).values_list('id', flat=True)
+        )
+    if not order_ids:
+        raise ValueError('No pending orders in this batch')
+
+    # Orders outside the batch (another city or status by now) are reported, not moved
+    in_batch = set(
+        Order.objects.filter(
+            id__in=order_ids, status=status, shipping_city=normalize_city(city)
+        ).values_list('id', flat=True)
+    )
+    updates = [(order_id, NEXT_STATUS[status], notes) for order_id in order_ids if order_id in in_batch]
+    errors = [
+        {'order_id': order_id, 'error': 'Order is no longer in this batch'}
+        for order_id in order_ids if order_id not in in_batch
+    ]
+    if not updates:
+        return [], errors
+
+    deliveries, update_errors = apply_status_updates(updates, user=user)
+    return deliveries, errors + update_errors
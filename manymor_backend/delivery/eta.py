@@ -0,0 +1,152 @@
+"""
+Delivery date estimation from historical status transitions.
+
+``manage.py compute_delivery_etas`` mines DeliveryStatusLog: for each
+recently delivered order it takes the first time every status was reached
+and the time of delivery, lays them out as one deliveries x statuses
+NumPy array, and reduces the hours left until delivery to percentiles
+per (shipping city, status). The resulting table is small and cached
+whole, so estimating a date on each status transition is a dict lookup.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Delivery, DeliveryStatusLog, DeliveryEtaEstimate
+
+
+HISTORY_DAYS = 90
+
+# A city (or, for the all-cities fallback row, the whole history) needs
+# this many deliveries through a status to get a row
+MIN_SAMPLES = 20
+
+ETA_PERCENTILES = (50, 80, 95)
+
+ETA_CACHE_KEY = 'delivery:eta:table'
+
+# Rebuilds drop the cached table; the timeout bounds how stale it can get
+# if that delete is missed
+ETA_CACHE_SECONDS = 3600
+
+STATUS_SEQUENCE = list(Delivery.Status.values)
+DELIVERED_INDEX = STATUS_SEQUENCE.index(Delivery.Status.DELIVERED)
+
+
+def delivered_since(since):
+    return Delivery.objects.filter(status=Delivery.Status.DELIVERED, updated_at__gte=since)
+
+
+def hours_until_delivered(since):
+    """
+    ``(cities, hours)`` for deliveries completed since ``since``: ``hours``
+    is a deliveries x statuses array of hours from first reaching each
+    status until delivery (NaN where unknown), ``cities`` the city of each
+    row. Two queries.
+    """
+    rows = list(
+        DeliveryStatusLog.objects.filter(
+            delivery__in=delivered_since(since)
+        ).values_list('delivery_id', 'status', 'created_at')
+    )
+    status_index = {status: index for index, status in enumerate(STATUS_SEQUENCE)}
+    delivery_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    statuses = np.fromiter((status_index.get(row[1], -1) for row in rows), dtype=np.int64, count=len(rows))
+    stamps = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+
+    known = statuses >= 0
+    ids, positions = np.unique(delivery_ids[known], return_inverse=True)
+    reached = np.full((len(ids), len(STATUS_SEQUENCE)), np.inf)
+    np.minimum.at(reached, (positions, statuses[known]), stamps[known])
+
+    with np.errstate(invalid='ignore'):
+        hours = (reached[:, [DELIVERED_INDEX]] - reached) / 3600
+    hours[~np.isfinite(hours) | (hours < 0)] = np.nan
+
+    city_of = dict(delivered_since(since).values_list('id', 'order__shipping_city'))
+    cities = np.array([city_of.get(pk, '') for pk in ids.tolist()], dtype=object)
+    return cities, hours
+
+
+def _percentile_rows(city, hours, min_samples, computed_at):
+    estimates = []
+    for index, status in enumerate(STATUS_SEQUENCE):
+        if index == DELIVERED_INDEX:
+            continue
+        values = hours[:, index]
+        values = values[~np.isnan(values)]
+        if len(values) < min_samples:
+            continue
+        p50, p80, p95 = np.percentile(values, ETA_PERCENTILES)
+        estimates.append(DeliveryEtaEstimate(
+            city=city,
+            status=status,
+            samples=len(values),
+            hours_p50=round(float(p50), 2),
+            hours_p80=round(float(p80), 2),
+            hours_p95=round(float(p95), 2),
+            computed_at=computed_at
+        ))
+    return estimates
+
+
+def compute_eta_estimates(history_days=HISTORY_DAYS, min_samples=MIN_SAMPLES):
+    """
+    Rebuild DeliveryEtaEstimate from deliveries completed in the last
+    ``history_days``. Returns ``(deliveries, rows)`` counts.
+    """
+    computed_at = timezone.now()
+    cities, hours = hours_until_delivered(computed_at - timedelta(days=history_days))
+
+    estimates = _percentile_rows('', hours, min_samples, computed_at)
+    if len(cities):
+        # Group rows by city with one sort instead of a mask per city
+        names, codes = np.unique(cities.astype(str), return_inverse=True)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for city_hours, first in zip(np.split(hours[order], bounds), np.split(order, bounds)):
+            city = names[codes[first[0]]]
+            if city:
+                estimates.extend(_percentile_rows(city, city_hours, min_samples, computed_at))
+
+    with transaction.atomic():
+        DeliveryEtaEstimate.objects.all().delete()
+        DeliveryEtaEstimate.objects.bulk_create(estimates, batch_size=5000)
+        transaction.on_commit(lambda: cache.delete(ETA_CACHE_KEY))
+
+    return len(cities), len(estimates)
+
+
+def get_eta_table():
+    """``{(city, status): hours}`` at the 80th percentile; cached until the next rebuild or an hour"""
+    table = cache.get(ETA_CACHE_KEY)
+    if table is None:
+        table = {
+            (city, status): hours
+            for city, status, hours in DeliveryEtaEstimate.objects.values_list('city', 'status', 'hours_p80')
+        }
+        cache.set(ETA_CACHE_KEY, table, timeout=ETA_CACHE_SECONDS)
+    return table
+
+
+def estimate_delivery_date(city, status, at=None):
+    """Expected delivery date for a delivery that reached ``status`` at ``at``; None if unknown"""
+    at = at or timezone.now()
+    if status == Delivery.Status.DELIVERED:
+        return timezone.localdate(at)
+    table = get_eta_table()
+    hours = table.get((city, status), table.get(('', status)))
+    if hours is None:
+        return None
+    return timezone.localdate(at + timedelta(hours=hours))
+
+
+def fill_estimated_delivery(delivery, at=None):
+    """Set ``estimated_delivery`` for the delivery's current status, if there is an estimate"""
+    estimate = estimate_delivery_date(delivery.order.shipping_city, delivery.status, at)
+    if estimate is not None:
+        delivery.estimated_delivery = estimate
+    return delivery
@@ -0,0 +1,120 @@
+"""
+Live delivery tracking for customers.
+
+Every new DeliveryStatusLog is published (once its transaction commits) to
+a per-order topic on an in-process EventHub, with the log id as event id.
+Tracking pages hold an SSE connection, or a long-poll request as a
+fallback, instead of polling the delivery endpoint; idle watchers cost an
+asyncio queue each and no database work.
+
+Clients resume with the id of the last log they saw (SSE ``Last-Event-ID``
+or ``?after=``); anything they missed is read back from the database.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from dashboard.events import EventHub, KEEPALIVE_SECONDS, format_sse
+from .models import DeliveryStatusLog
+from .serializers import DeliveryStatusLogSerializer
+from .tracking import get_tracking
+
+
+LONG_POLL_SECONDS = 25
+
+
+def tracking_topic(order_id):
+    return f'delivery:{order_id}'
+
+
+def publish_status_logs(logs):
+    """
+    Push new status log entries to their order's watchers on commit. Who
+    is watching is checked then, so clients that connect in between see them.
+    """
+    logs = list(logs)
+
+    def publish():
+        for log in logs:
+            topic = tracking_topic(log.delivery.order_id)
+            if tracking_hub.subscriber_count(topic):
+                tracking_hub.publish(
+                    topic, 'status_log', DeliveryStatusLogSerializer(log).data, event_id=log.id
+                )
+
+    transaction.on_commit(publish)
+
+
+def _logs_after(order_id, after_id):
+    logs = DeliveryStatusLog.objects.filter(
+        delivery__order_id=order_id, id__gt=after_id
+    ).select_related('created_by').order_by('id')
+    return DeliveryStatusLogSerializer(logs, many=True).data
+
+
+logs_after = sync_to_async(_logs_after)
+get_tracking_async = sync_to_async(get_tracking)
+
+
+def snapshot_event_id(delivery):
+    """Id of the newest log in a serialized delivery (0 if none)"""
+    return max((log.get('id') or 0 for log in delivery['status_logs']), default=0)
+
+
+async def iter_tracking_events(order_id, last_event_id=None):
+    """
+    SSE messages for one tracking connection: the current delivery snapshot
+    (or, when resuming, just the logs after ``last_event_id``), then each
+    new status log as it is committed, with keep-alive comments while idle.
+    """
+    queue = tracking_hub.subscribe(tracking_topic(order_id))
+    try:
+        # Subscribed before reading, so nothing committed in between is lost;
+        # anything seen twice is skipped by id
+        if last_event_id is None:
+            tracking = await get_tracking_async(order_id)
+            if tracking is None:
+                return
+            last_event_id = snapshot_event_id(tracking['delivery'])
+            yield format_sse('snapshot', tracking['delivery'], last_event_id)
+        else:
+            for log in await logs_after(order_id, last_event_id):
+                last_event_id = log['id']
+                yield format_sse('status_log', log, log['id'])
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event['id'] <= last_event_id:
+                continue
+            last_event_id = event['id']
+            yield format_sse(event['type'], event['data'], event['id'])
+    finally:
+        tracking_hub.unsubscribe(tracking_topic(order_id), queue)
+
+
+async def wait_for_logs(order_id, after_id, timeout=LONG_POLL_SECONDS):
+    """
+    Long-poll: status logs after ``after_id``, waiting up to ``timeout``
+    seconds for one to be committed. Returns an empty list on timeout.
+    """
+    queue = tracking_hub.subscribe(tracking_topic(order_id))
+    try:
+        logs = await logs_after(order_id, after_id)
+        if logs:
+            return logs
+        try:
+            await asyncio.wait_for(queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        # Re-read so every log committed meanwhile comes back in order
+        return await logs_after(order_id, after_id)
+    finally:
+        tracking_hub.unsubscribe(tracking_topic(order_id), queue)
+
+
+tracking_hub = EventHub()
@@ -0,0 +1,67 @@
+"""
+Management command to create missing delivery records.
+Usage: python manage.py backfill_deliveries [--batch-size 1000] [--dry-run]
+
+Deliveries are normally created with their order (see delivery.signals).
+Orders placed before that existed, or created with signals bypassed, have
+no delivery; run this once to give them one.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from orders.models import Order
+from delivery.models import Delivery, DeliveryStatusLog, DELIVERY_STATUS_FOR_ORDER
+
+
+class Command(BaseCommand):
+    help = 'Create Delivery records (with an initial status log) for orders that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Orders handled per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many orders are missing a delivery'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        missing = Order.objects.filter(delivery__isnull=True)
+
+        if options['dry_run']:
+            self.stdout.write(f'{missing.count()} orders have no delivery record')
+            return
+
+        created = 0
+        while True:
+            with transaction.atomic():
+                orders = list(missing.order_by('id').values_list('id', 'status')[:batch_size])
+                if not orders:
+                    break
+
+                deliveries = Delivery.objects.bulk_create([
+                    Delivery(
+                        order_id=order_id,
+                        status=DELIVERY_STATUS_FOR_ORDER.get(order_status, Delivery.Status.PLACED)
+                    )
+                    for order_id, order_status in orders
+                ])
+                DeliveryStatusLog.objects.bulk_create([
+                    DeliveryStatusLog(
+                        delivery=delivery,
+                        status=delivery.status,
+                        notes='Delivery record backfilled'
+                    )
+                    for delivery in deliveries
+                ])
+            created += len(deliveries)
+            self.stdout.write(f'Created {created} deliveries...')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Backfilled {created} deliveries'))
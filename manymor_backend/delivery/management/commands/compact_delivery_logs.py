@@ -0,0 +1,54 @@
+"""
+Management command to compact old delivery status logs.
+Usage: python manage.py compact_delivery_logs [--days 180] [--batch-size 500] [--dry-run]
+
+Logs of deliveries completed more than --days ago are folded into
+Delivery.history and deleted, a batch of deliveries per short transaction.
+Safe to interrupt and rerun.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from delivery.models import DeliveryStatusLog
+from delivery.retention import (
+    compactable_deliveries, compact_delivery_logs, RETENTION_DAYS, BATCH_SIZE
+)
+
+
+class Command(BaseCommand):
+    help = 'Fold status logs of long-delivered orders into Delivery.history and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=RETENTION_DAYS,
+            help=f'Compact deliveries completed more than N days ago (default: {RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Deliveries handled per transaction (default: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many deliveries and logs would be compacted'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['dry_run']:
+            eligible = compactable_deliveries(options['days'])
+            logs = DeliveryStatusLog.objects.filter(delivery__in=eligible.values('id')).count()
+            self.stdout.write(f'{eligible.count()} deliveries ({logs} logs) would be compacted')
+            return
+
+        deliveries = logs = 0
+        for deliveries, logs in compact_delivery_logs(options['days'], options['batch_size']):
+            self.stdout.write(f'Compacted {deliveries} deliveries ({logs} logs)...')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Compacted {logs} logs from {deliveries} deliveries'))
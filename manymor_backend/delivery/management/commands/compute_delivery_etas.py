@@ -0,0 +1,39 @@
+"""
+Management command to rebuild the delivery ETA percentile table.
+Usage: python manage.py compute_delivery_etas [--history-days 90] [--min-samples 20]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from delivery.eta import compute_eta_estimates, HISTORY_DAYS, MIN_SAMPLES
+
+
+class Command(BaseCommand):
+    help = 'Compute per-city, per-status time-to-delivery percentiles from delivery status logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=HISTORY_DAYS,
+            help=f'Use deliveries completed in the last N days (default: {HISTORY_DAYS})'
+        )
+        parser.add_argument(
+            '--min-samples',
+            type=int,
+            default=MIN_SAMPLES,
+            help=f'Deliveries a city (or all cities together) needs for an estimate (default: {MIN_SAMPLES})'
+        )
+
+    def handle(self, *args, **options):
+        if options['history_days'] < 1:
+            raise CommandError('--history-days must be at least 1')
+        if options['min_samples'] < 1:
+            raise CommandError('--min-samples must be at least 1')
+
+        self.stdout.write(f"Mining deliveries completed in the last {options['history_days']} days...")
+
+        deliveries, rows = compute_eta_estimates(
+            history_days=options['history_days'],
+            min_samples=options['min_samples']
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Computed {rows} ETA estimates from {deliveries} deliveries'))
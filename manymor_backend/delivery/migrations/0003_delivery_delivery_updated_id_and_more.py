@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0002_deliverystatuslog'),
+        ('orders', '0004_order_orders_order_created_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['-updated_at', '-id'], name='delivery_updated_id'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['status', '-updated_at'], name='delivery_status_updated'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-19 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0003_delivery_delivery_updated_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryEtaEstimate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('PLACED', 'Placed'), ('PACKED', 'Packed'), ('DISPATCHED', 'Dispatched'), ('IN_TRANSIT', 'In Transit'), ('DELIVERED', 'Delivered')], max_length=20)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('hours_p50', models.FloatField()),
+                ('hours_p80', models.FloatField()),
+                ('hours_p95', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('city', 'status'), name='delivery_eta_city_status')],
+            },
+        ),
+    ]
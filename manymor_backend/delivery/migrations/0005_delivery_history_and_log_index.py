@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 03:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0004_deliveryetaestimate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='history',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='deliverystatuslog',
+            index=models.Index(fields=['delivery', '-created_at'], name='delivery_log_delivery_created'),
+        ),
+    ]
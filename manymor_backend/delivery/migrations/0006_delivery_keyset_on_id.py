@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-19 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0005_delivery_history_and_log_index'),
+        ('orders', '0005_order_shipping_city'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='delivery',
+            name='delivery_updated_id',
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['status', '-id'], name='delivery_status_id'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['updated_at'], name='delivery_updated'),
+        ),
+    ]
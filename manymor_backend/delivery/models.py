@@ -1,7 +1,8 @@
 from django.db import models
 from orders.models import Order
+from products.models import LoadedValuesMixin
 
-class Delivery(models.Model):
+class Delivery(LoadedValuesMixin, models.Model):
     class Status(models.TextChoices):
         PLACED = 'PLACED', 'Placed'
         PACKED = 'PACKED', 'Packed'
@@ -20,8 +21,21 @@ class Delivery(models.Model):
         default=Status.PLACED
     )
     estimated_delivery = models.DateField(null=True, blank=True)
+    # Status log entries compacted by manage.py compact_delivery_logs, newest first
+    history = models.JSONField(default=list, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    TRACKED_FIELDS = ('status',)
+
+    class Meta:
+        indexes = [
+            # Delivery listing: newest first by id, optionally by status; the
+            # date filters (and ETA / retention scans) range over updated_at
+            models.Index(fields=['status', '-id'], name='delivery_status_id'),
+            models.Index(fields=['updated_at'], name='delivery_updated'),
+            models.Index(fields=['status', '-updated_at'], name='delivery_status_updated'),
+        ]
+
     def __str__(self):
         return f"Delivery for Order #{self.order.id}"
 
@@ -47,6 +61,50 @@ class DeliveryStatusLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A delivery's logs, newest first (the default ordering)
+            models.Index(fields=['delivery', '-created_at'], name='delivery_log_delivery_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.delivery.order.id} -> {self.status}"
+
+class DeliveryEtaEstimate(models.Model):
+    """
+    Hours from reaching ``status`` until delivery, as percentiles over
+    recently delivered orders, per shipping city ('' for all cities).
+    Written by ``manage.py compute_delivery_etas``.
+    """
+    city = models.CharField(max_length=100, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Delivery.Status.choices
+    )
+    samples = models.PositiveIntegerField(default=0)
+    hours_p50 = models.FloatField()
+    hours_p80 = models.FloatField()
+    hours_p95 = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'status'], name='delivery_eta_city_status'),
+        ]
 
     def __str__(self):
-        return f"{self.delivery.order.id} -> {self.status}"
\ No newline at end of file
+        return f"{self.city or '*'} {self.status}: {self.hours_p80:.1f}h"
+
+
+# Order.Status.DISPATCHED is stored as 'DISATCHED', so statuses are mapped
+# member by member rather than by value
+ORDER_STATUS_FOR_DELIVERY = {
+    Delivery.Status.PLACED: Order.Status.PLACED,
+    Delivery.Status.PACKED: Order.Status.PACKED,
+    Delivery.Status.DISPATCHED: Order.Status.DISPATCHED,
+    Delivery.Status.IN_TRANSIT: Order.Status.IN_TRANSIT,
+    Delivery.Status.DELIVERED: Order.Status.DELIVERED,
+}
+DELIVERY_STATUS_FOR_ORDER = {
+    order_status: delivery_status
+    for delivery_status, order_status in ORDER_STATUS_FOR_DELIVERY.items()
+}
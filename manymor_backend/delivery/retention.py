@@ -0,0 +1,86 @@
+"""
+Retention for DeliveryStatusLog.
+
+Logs of orders delivered long ago are only ever read back as part of the
+delivery's tracking history, so they are folded into ``Delivery.history``
+(a JSON list in the same shape and newest-first order the API serializes
+logs in) and the rows deleted. Work is done a small batch of deliveries per transaction, so
+locks are held briefly and the command can be stopped and rerun anytime.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Delivery, DeliveryStatusLog
+from .serializers import DeliveryStatusLogSerializer
+from .tracking import invalidate_tracking
+
+
+RETENTION_DAYS = 180
+
+BATCH_SIZE = 500
+
+
+def _delivered_before(older_than_days):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Delivery.objects.filter(status=Delivery.Status.DELIVERED, updated_at__lt=cutoff)
+
+
+def compactable_deliveries(older_than_days=RETENTION_DAYS):
+    """Delivered deliveries untouched for ``older_than_days`` that still have log rows"""
+    return _delivered_before(older_than_days).filter(status_logs__isnull=False).distinct()
+
+
+def compact_batch(delivery_ids, older_than_days=RETENTION_DAYS):
+    """
+    Move the logs of ``delivery_ids`` into their history, in one short
+    transaction. Deliveries that stopped being eligible since they were
+    listed (moved on, or updated) are left alone. Returns the number of log
+    rows removed.
+    """
+    with transaction.atomic():
+        deliveries = _delivered_before(older_than_days).select_for_update().only(
+            'id', 'order_id', 'history'
+        ).in_bulk(delivery_ids)
+        logs = DeliveryStatusLog.objects.filter(
+            delivery_id__in=list(deliveries)
+        ).select_related('created_by').order_by('delivery_id', '-created_at', '-id')
+
+        log_ids = []
+        for delivery_id, delivery_logs in groupby(logs, key=lambda log: log.delivery_id):
+            delivery_logs = list(delivery_logs)
+            # Remaining logs are newer than anything already compacted
+            deliveries[delivery_id].history = (
+                DeliveryStatusLogSerializer(delivery_logs, many=True).data +
+                list(deliveries[delivery_id].history or [])
+            )
+            log_ids.extend(log.id for log in delivery_logs)
+
+        # bulk_update leaves updated_at alone, so compaction does not make
+        # a delivery look recently changed
+        Delivery.objects.bulk_update(deliveries.values(), ['history'])
+        DeliveryStatusLog.objects.filter(id__in=log_ids).delete()
+
+        order_ids = [delivery.order_id for delivery in deliveries.values()]
+        transaction.on_commit(lambda: invalidate_tracking(*order_ids))
+    return len(log_ids)
+
+
+def compact_delivery_logs(older_than_days=RETENTION_DAYS, batch_size=BATCH_SIZE):
+    """
+    Compact every eligible delivery, ``batch_size`` deliveries per
+    transaction. Yields ``(deliveries, logs)`` running totals after each batch.
+    """
+    eligible = compactable_deliveries(older_than_days)
+    deliveries = logs = 0
+    last_id = 0
+    while True:
+        ids = list(eligible.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        logs += compact_batch(ids, older_than_days)
+        deliveries += len(ids)
+        last_id = ids[-1]
+        yield deliveries, logs
@@ -6,14 +6,15 @@ class DeliveryStatusLogSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = DeliveryStatusLog
-        fields = ['status', 'notes', 'created_at', 'created_by']
-        read_only_fields = ['created_at', 'created_by']
+        fields = ['id', 'status', 'notes', 'created_at', 'created_by']
+        read_only_fields = ['id', 'created_at', 'created_by']
 
 
 class DeliverySerializer(serializers.ModelSerializer):
     status_logs = DeliveryStatusLogSerializer(many=True, read_only=True)
     order_id = serializers.IntegerField(source='order.id', read_only=True)
-    customer_name = serializers.CharField(source='order.user.get_full_name', read_only=True)
+    # Users have no name fields; the email identifies the customer
+    customer_name = serializers.CharField(source='order.user.email', read_only=True)
     
     class Meta:
         model = Delivery
@@ -24,6 +25,39 @@ class DeliverySerializer(serializers.ModelSerializer):
             'status',
             'estimated_delivery',
             'status_logs',
+            'history',
             'updated_at'
         ]
-        read_only_fields = ['status_logs', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['status_logs', 'history', 'updated_at']
+
+
+class DeliveryListSerializer(serializers.ModelSerializer):
+    """
+    Delivery row for listings. Expects ``order__user`` to be joined and the
+    newest log prefetched into ``latest_logs`` (see DeliveryViewSet.list).
+    """
+    order_id = serializers.IntegerField(read_only=True)
+    customer_name = serializers.CharField(source='order.user.email', read_only=True)
+    latest_log = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Delivery
+        fields = [
+            'id',
+            'order_id',
+            'customer_name',
+            'status',
+            'estimated_delivery',
+            'latest_log',
+            'updated_at'
+        ]
+
+    def get_latest_log(self, obj):
+        logs = obj.latest_logs
+        if not logs:
+            return None
+        return {
+            'status': logs[0].status,
+            'notes': logs[0].notes,
+            'created_at': logs[0].created_at
+        }
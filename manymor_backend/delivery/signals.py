@@ -1,8 +1,18 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from orders.models import Order
-from orders.emails import send_delivery_status_update_email
-from .models import Delivery, DeliveryStatusLog
+from orders.notifications import order_notifications
+from .models import Delivery, DeliveryStatusLog, ORDER_STATUS_FOR_DELIVERY
+from .tracking import invalidate_tracking
+from .events import publish_status_logs
+from .eta import fill_estimated_delivery
+
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=Order)
 def create_delivery_on_order(sender, instance, created, **kwargs):
@@ -14,23 +24,53 @@ def create_delivery_on_order(sender, instance, created, **kwargs):
             status=Delivery.Status.PLACED,
             notes='Order placed'
         )
-        print(f"Created delivery record for Order #{instance.id}")
+        logger.info("Created delivery record for Order #%s", instance.id)
+
+
+@receiver(pre_save, sender=Delivery)
+def estimate_delivery_on_transition(sender, instance, raw=False, **kwargs):
+    """Re-estimate the delivery date whenever the status changes"""
+    if raw:
+        return
+    if instance.pk is None or instance.get_loaded_value('status') != instance.status:
+        fill_estimated_delivery(instance)
 
 
 @receiver(post_save, sender=Delivery)
 def delivery_status_changed(sender, instance, created, **kwargs):
     """
-    Send email notification when delivery status changes.
-    Skip email on creation since order confirmation already sent.
+    Queue a customer notification when the delivery status changes.
+    Skip creation since order confirmation already sent. The Order save
+    that usually follows queues the same order, and the two are coalesced
+    into one email.
     """
-    if not created:
-        # Delivery status was updated, send email notification
-        try:
-            # Get the most recent status log entry for notes
-            latest_log = instance.status_logs.first()
-            notes = latest_log.notes if latest_log else None
-            
-            # Send email notification
-            send_delivery_status_update_email(instance, notes)
-        except Exception as e:
-            print(f"Failed to send delivery status email: {str(e)}")
+    old_status = instance.get_loaded_value('status')
+    if not created and old_status is not None and old_status != instance.status:
+        order_notifications.add(instance.order_id, ORDER_STATUS_FOR_DELIVERY[old_status])
+
+
+@receiver(post_save, sender=Delivery)
+@receiver(post_delete, sender=Delivery)
+def invalidate_delivery_tracking(sender, instance, **kwargs):
+    """Drop the cached tracking document once the change is committed"""
+    order_id = instance.order_id
+    transaction.on_commit(lambda: invalidate_tracking(order_id))
+
+
+@receiver(post_save, sender=DeliveryStatusLog)
+def invalidate_tracking_on_log(sender, instance, created, raw=False, **kwargs):
+    """
+    New log entries appear in the tracking history. Every writer passes the
+    delivery instance, so reading its order_id costs no query.
+    """
+    if raw:
+        return
+    order_id = instance.delivery.order_id
+    transaction.on_commit(lambda: invalidate_tracking(order_id))
+
+
+@receiver(post_save, sender=DeliveryStatusLog)
+def publish_status_log(sender, instance, created, raw=False, **kwargs):
+    """Push new log entries to customers watching the order"""
+    if created and not raw:
+        publish_status_logs([instance])
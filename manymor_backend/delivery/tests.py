@@ -1,3 +1,359 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from dashboard.models import DailySalesRollup
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .dispatch import plan_dispatch_batches
+from .eta import compute_eta_estimates, estimate_delivery_date
+from .models import Delivery, DeliveryStatusLog, DeliveryEtaEstimate
+from .retention import compact_batch
+from .tracking import get_tracking
+
+
+# Send notifications on commit instead of from a timer thread that could
+# fire during a later test
+@override_settings(ORDER_NOTIFICATION_WINDOW=0)
+class DeliveryTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin@example.com', 'pw', role=User.Role.ADMIN)
+        self.customer = User.objects.create_user('customer@example.com', 'pw')
+        category = Category.objects.create(name='Shoes')
+        self.product = Product.objects.create(
+            category=category, name='Runner', price=Decimal('10.00'), stock_quantity=100
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_order(self, quantity=1, **fields):
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('10.00') * quantity, **fields)
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, unit_price=Decimal('10.00'))
+        return order
+
+    def set_status(self, order, new_status):
+        Delivery.objects.filter(order=order).update(status=new_status)
+
+
+class UpdateStatusTests(DeliveryTestCase):
+
+    def update(self, order_id, new_status):
+        return self.client.put(
+            f'/api/delivery/{order_id}/update_status/', {'status': new_status}, format='json'
+        )
+
+    def test_moves_forward(self):
+        order = self.create_order()
+        response = self.update(order.id, Delivery.Status.PACKED)
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.Status.PACKED)
+
+    def test_rejects_backward_move(self):
+        order = self.create_order()
+        self.set_status(order, Delivery.Status.DISPATCHED)
+        response = self.update(order.id, Delivery.Status.PACKED)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Delivery.objects.get(order=order).status, Delivery.Status.DISPATCHED)
+
+    def test_rejects_cancelled_order(self):
+        order = self.create_order()
+        order.status = Order.Status.CANCELLED
+        order.save()
+        response = self.update(order.id, Delivery.Status.PACKED)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Order is cancelled')
+
+    def test_missing_delivery_is_not_found(self):
+        order = self.create_order()
+        Delivery.objects.filter(order=order).delete()
+        response = self.update(order.id, Delivery.Status.PACKED)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Delivery.objects.filter(order=order).exists())
+
+
+class StatusLogTrackingTests(DeliveryTestCase):
+
+    def test_log_invalidates_tracking_without_extra_queries(self):
+        order = self.create_order()
+        delivery = Delivery.objects.get(order=order)
+        get_tracking(order.id)
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            DeliveryStatusLog.objects.create(delivery=delivery, status=Delivery.Status.PACKED, notes='Packed')
+
+        notes = [log['notes'] for log in get_tracking(order.id)['delivery']['status_logs']]
+        self.assertIn('Packed', notes)
+
+
+class BulkUpdateStatusTests(DeliveryTestCase):
+
+    def bulk_update(self, updates):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/delivery/bulk_update_status/', updates, format='json')
+
+    def test_reports_rejected_transitions(self):
+        moved, backward, cancelled, invalid = [self.create_order() for _ in range(4)]
+        self.set_status(backward, Delivery.Status.DISPATCHED)
+        cancelled.status = Order.Status.CANCELLED
+        cancelled.save()
+
+        response = self.bulk_update([
+            {'order_id': moved.id, 'status': Delivery.Status.PACKED},
+            {'order_id': backward.id, 'status': Delivery.Status.PACKED},
+            {'order_id': cancelled.id, 'status': Delivery.Status.PACKED},
+            {'order_id': 99999, 'status': Delivery.Status.PACKED},
+            {'order_id': invalid.id, 'status': 'LOST'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], [moved.id])
+        errors = {error['order_id']: error['error'] for error in response.data['errors']}
+        self.assertEqual(errors[backward.id], 'Cannot move delivery from DISPATCHED to PACKED')
+        self.assertEqual(errors[cancelled.id], 'Order is cancelled')
+        self.assertEqual(errors[99999], 'No delivery found for this order')
+        self.assertTrue(errors[invalid.id].startswith('Invalid status'))
+        self.assertEqual(Delivery.objects.get(order=backward).status, Delivery.Status.DISPATCHED)
+        self.assertEqual(Delivery.objects.get(order=cancelled).status, Delivery.Status.PLACED)
+
+    def test_all_rejected_is_bad_request(self):
+        order = self.create_order()
+        response = self.bulk_update([{'order_id': order.id, 'status': Delivery.Status.PLACED}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DeliveryStatusLog.objects.filter(delivery__order=order, notes__startswith='Status').exists())
+
+    def test_refreshes_rollups_and_tracking(self):
+        orders = [self.create_order(quantity=2) for _ in range(3)]
+        # Cache the tracking documents before the update
+        for order in orders:
+            self.assertEqual(get_tracking(order.id)['delivery']['status'], Delivery.Status.PLACED)
+
+        response = self.bulk_update([
+            {'order_id': order.id, 'status': Delivery.Status.PACKED, 'notes': 'Packed'} for order in orders
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        totals = dict(DailySalesRollup.objects.filter(category__isnull=True).values_list('status', 'order_count'))
+        self.assertEqual(totals.get(Order.Status.PACKED), 3)
+        self.assertFalse(totals.get(Order.Status.PLACED))
+        for order in orders:
+            tracking = get_tracking(order.id)['delivery']
+            self.assertEqual(tracking['status'], Delivery.Status.PACKED)
+            self.assertEqual(tracking['status_logs'][0]['notes'], 'Packed')
+
+
+class EtaEstimateTests(DeliveryTestCase):
+
+    def deliver(self, city, hours_to_deliver, packed_after=2):
+        """A delivered order placed ten days ago, delivered ``hours_to_deliver`` later"""
+        order = self.create_order(shipping_city=city)
+        delivery = Delivery.objects.get(order=order)
+        placed_at = timezone.now() - timedelta(days=10)
+        DeliveryStatusLog.objects.filter(delivery=delivery).update(created_at=placed_at)
+        for new_status, hours in ((Delivery.Status.PACKED, packed_after), (Delivery.Status.DELIVERED, hours_to_deliver)):
+            log = DeliveryStatusLog.objects.create(delivery=delivery, status=new_status)
+            DeliveryStatusLog.objects.filter(id=log.id).update(created_at=placed_at + timedelta(hours=hours))
+        Delivery.objects.filter(id=delivery.id).update(status=Delivery.Status.DELIVERED)
+
+    def compute(self, **kwargs):
+        # The rebuild drops the cached table on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return compute_eta_estimates(**kwargs)
+
+    def estimate(self, city, new_status):
+        return DeliveryEtaEstimate.objects.get(city=city, status=new_status)
+
+    def test_percentiles_per_city_and_status(self):
+        for hours in range(10, 110, 10):
+            self.deliver('harare', hours)
+
+        deliveries, rows = self.compute(min_samples=5)
+
+        self.assertEqual(deliveries, 10)
+        placed = self.estimate('harare', Delivery.Status.PLACED)
+        self.assertEqual(placed.samples, 10)
+        self.assertEqual(placed.hours_p50, 55)
+        self.assertEqual(placed.hours_p80, 82)
+        self.assertEqual(placed.hours_p95, 95.5)
+        self.assertEqual(self.estimate('harare', Delivery.Status.PACKED).hours_p50, 53)
+        # Statuses nobody passed through get no row
+        self.assertFalse(DeliveryEtaEstimate.objects.filter(status=Delivery.Status.DISPATCHED).exists())
+
+    def test_small_city_falls_back_to_all_cities(self):
+        for _ in range(5):
+            self.deliver('harare', 24)
+        self.deliver('bulawayo', 200)
+
+        self.compute(min_samples=5)
+
+        self.assertFalse(DeliveryEtaEstimate.objects.filter(city='bulawayo').exists())
+        fallback = self.estimate('', Delivery.Status.PLACED)
+        self.assertEqual(fallback.samples, 6)
+        at = timezone.now()
+        self.assertEqual(
+            estimate_delivery_date('bulawayo', Delivery.Status.PLACED, at),
+            timezone.localdate(at + timedelta(hours=fallback.hours_p80))
+        )
+        self.assertEqual(
+            estimate_delivery_date('harare', Delivery.Status.PLACED, at),
+            timezone.localdate(at + timedelta(hours=24))
+        )
+
+    def test_fallback_row_needs_min_samples(self):
+        for city in ('harare', 'bulawayo', 'mutare'):
+            self.deliver(city, 24)
+
+        deliveries, rows = self.compute(min_samples=5)
+
+        self.assertEqual((deliveries, rows), (3, 0))
+        self.assertIsNone(estimate_delivery_date('harare', Delivery.Status.PLACED))
+
+
+class DispatchPlanTests(DeliveryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.socks = Product.objects.create(
+            category=self.product.category, name='Socks', price=Decimal('2.00'), stock_quantity=100
+        )
+
+    def test_splits_batches_at_max_batch_size(self):
+        orders = [self.create_order(shipping_city='Harare') for _ in range(5)]
+        self.create_order(shipping_city='Bulawayo')
+
+        batches = plan_dispatch_batches(city='harare', max_batch_size=2)
+
+        self.assertEqual([batch['order_ids'] for batch in batches], [
+            [orders[0].id, orders[1].id], [orders[2].id, orders[3].id], [orders[4].id]
+        ])
+        self.assertTrue(all(batch['city'] == 'harare' for batch in batches))
+        self.assertEqual([batch['order_count'] for batch in batches], [2, 2, 1])
+
+    def test_batches_by_city_and_status(self):
+        packed = self.create_order(shipping_city='Harare')
+        Order.objects.filter(id=packed.id).update(status=Order.Status.PACKED)
+        self.create_order(shipping_city='Harare')
+        self.create_order(shipping_city='Bulawayo')
+
+        batches = plan_dispatch_batches()
+
+        self.assertEqual(
+            [(batch['city'], batch['status'], batch['next_status']) for batch in batches],
+            [
+                ('bulawayo', Order.Status.PLACED, Delivery.Status.PACKED),
+                ('harare', Order.Status.PACKED, Delivery.Status.DISPATCHED),
+                ('harare', Order.Status.PLACED, Delivery.Status.PACKED),
+            ]
+        )
+
+    def test_pick_list_totals(self):
+        first = self.create_order(quantity=3, shipping_city='Harare')
+        OrderItem.objects.create(order=first, product=self.socks, quantity=1, unit_price=Decimal('2.00'))
+        # The same product on two lines of one order is picked together
+        OrderItem.objects.create(order=first, product=self.socks, quantity=4, unit_price=Decimal('2.00'))
+        second = self.create_order(quantity=1, shipping_city='Harare')
+        OrderItem.objects.create(order=second, product=self.socks, quantity=2, unit_price=Decimal('2.00'))
+
+        batch, = plan_dispatch_batches(city='Harare')
+
+        self.assertEqual(batch['units'], 11)
+        self.assertEqual(
+            [(pick['product_name'], pick['quantity']) for pick in batch['pick_list']],
+            [('Socks', 7), ('Runner', 4)]
+        )
+
+    def test_pick_lists_are_per_batch(self):
+        self.create_order(quantity=3, shipping_city='Harare')
+        self.create_order(quantity=5, shipping_city='Harare')
+
+        batches = plan_dispatch_batches(city='Harare', max_batch_size=1)
+
+        self.assertEqual([batch['units'] for batch in batches], [3, 5])
+        self.assertEqual([batch['pick_list'][0]['quantity'] for batch in batches], [3, 5])
+
+    def test_rejects_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            plan_dispatch_batches(status=Order.Status.DELIVERED)
+        with self.assertRaises(ValueError):
+            plan_dispatch_batches(max_batch_size=0)
+
+
+class RetentionTests(DeliveryTestCase):
+
+    def delivered_long_ago(self):
+        order = self.create_order()
+        for new_status in (Delivery.Status.PACKED, Delivery.Status.DELIVERED):
+            response = self.client.put(
+                f'/api/delivery/{order.id}/update_status/', {'status': new_status}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+        delivery = Delivery.objects.get(order=order)
+        Delivery.objects.filter(id=delivery.id).update(updated_at=timezone.now() - timedelta(days=365))
+        return delivery
+
+    def test_history_is_newest_first(self):
+        delivery = self.delivered_long_ago()
+        expected = self.client.get(f'/api/delivery/{delivery.order_id}/').data['status_logs']
+
+        # Compaction drops the cached tracking document on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(compact_batch([delivery.id]), 3)
+
+        data = self.client.get(f'/api/delivery/{delivery.order_id}/').data
+        self.assertEqual(data['status_logs'], [])
+        self.assertEqual(data['history'], expected)
+        self.assertEqual(
+            [entry['status'] for entry in data['history']],
+            [Delivery.Status.DELIVERED, Delivery.Status.PACKED, Delivery.Status.PLACED]
+        )
+
+    def test_skips_deliveries_no_longer_eligible(self):
+        delivery = self.delivered_long_ago()
+        # Touched again after being listed for compaction
+        Delivery.objects.filter(id=delivery.id).update(updated_at=timezone.now())
+
+        self.assertEqual(compact_batch([delivery.id]), 0)
+        self.assertEqual(DeliveryStatusLog.objects.filter(delivery=delivery).count(), 3)
+        self.assertEqual(Delivery.objects.get(id=delivery.id).history, [])
+
+
+class TrackingEventStreamTests(DeliveryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        self.other = User.objects.create_user('other@example.com', 'pw')
+
+    def events(self, user, **headers):
+        return self.async_client.get(
+            f'/api/delivery/{self.order.id}/events/',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(user)}', **headers}
+        )
+
+    async def test_streams_snapshot_first(self):
+        response = await self.events(self.customer, Accept='text/event-stream')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        events = response.streaming_content
+        self.assertIn(b'event: snapshot\n', await anext(events))
+        await events.aclose()
+
+    async def test_long_poll_returns_snapshot(self):
+        response = await self.events(self.customer)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['snapshot']['status'], Delivery.Status.PLACED)
+
+    async def test_other_customers_are_forbidden(self):
+        response = await self.events(self.other)
+
+        self.assertEqual(response.status_code, 403)
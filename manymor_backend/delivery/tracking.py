@@ -0,0 +1,47 @@
+"""
+Cached per-order tracking documents.
+
+Tracking pages poll the delivery endpoint; serving them from a cached,
+serialized document keeps those polls read-only and off the database.
+Documents are dropped whenever the delivery or its logs change.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import Delivery, DeliveryStatusLog
+from .serializers import DeliverySerializer
+
+
+TRACKING_CACHE_KEY = 'delivery:tracking:{order_id}'
+TRACKING_CACHE_SECONDS = 300
+
+
+def build_tracking(order_id):
+    """
+    ``{'user_id': ..., 'delivery': ...}`` for an order's delivery, or None if
+    the order has no delivery record. Pure read: two queries.
+    """
+    delivery = Delivery.objects.select_related('order__user').prefetch_related(
+        Prefetch('status_logs', queryset=DeliveryStatusLog.objects.select_related('created_by'))
+    ).filter(order_id=order_id).first()
+    if delivery is None:
+        return None
+    return {
+        'user_id': delivery.order.user_id,
+        'delivery': DeliverySerializer(delivery).data
+    }
+
+
+def get_tracking(order_id):
+    """Cached tracking document for an order (None if there is no delivery)"""
+    key = TRACKING_CACHE_KEY.format(order_id=order_id)
+    document = cache.get(key)
+    if document is None:
+        document = build_tracking(order_id)
+        if document is not None:
+            cache.set(key, document, timeout=TRACKING_CACHE_SECONDS)
+    return document
+
+
+def invalidate_tracking(*order_ids):
+    cache.delete_many([TRACKING_CACHE_KEY.format(order_id=order_id) for order_id in order_ids])
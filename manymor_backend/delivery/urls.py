@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DeliveryViewSet
+from .views import DeliveryViewSet, delivery_event_stream
 
 router = DefaultRouter()
 router.register(r'delivery', DeliveryViewSet, basename='delivery')
 
 urlpatterns = [
+    path('delivery/<int:order_id>/events/', delivery_event_stream, name='delivery-events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
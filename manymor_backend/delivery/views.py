@@ -2,12 +2,49 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
+import math
 
-from .models import Delivery, DeliveryStatusLog
-from .serializers import DeliverySerializer
-from orders.models import Order
+from .models import Delivery, DeliveryStatusLog, ORDER_STATUS_FOR_DELIVERY
+from .serializers import DeliverySerializer, DeliveryListSerializer
+from .bulk import parse_updates, apply_status_updates, transition_error
+from .dispatch import plan_dispatch_batches, dispatch_batch, MAX_BATCH_SIZE
+from .tracking import get_tracking
+from .events import (
+    iter_tracking_events, wait_for_logs, get_tracking_async, snapshot_event_id, LONG_POLL_SECONDS
+)
+from manymor_backend.pagination import keyset_page, count_matches, parse_page_size
+from dashboard.events import authenticate_stream_request
+
+
+def filter_deliveries(queryset, params):
+    """
+    Apply the status and date_from/date_to (YYYY-MM-DD, local days, on
+    updated_at) filters. Raises ValueError for bad input.
+    """
+    status_filter = params.get('status')
+    if status_filter:
+        if status_filter not in Delivery.Status.values:
+            raise ValueError(f'Invalid status. Must be one of: {list(Delivery.Status.values)}')
+        queryset = queryset.filter(status=status_filter)
+    
+    # Compare against local midnights so the updated_at index can be used
+    for param, lookup, offset in (('date_from', 'updated_at__gte', 0), ('date_to', 'updated_at__lt', 1)):
+        value = params.get(param)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'{param} must be a date in YYYY-MM-DD format')
+            boundary = timezone.make_aware(datetime.combine(parsed + timedelta(days=offset), time.min))
+            queryset = queryset.filter(**{lookup: boundary})
+    
+    return queryset
 
 
 class IsAdminUser(permissions.BasePermission):
@@ -37,29 +74,23 @@ class DeliveryViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order = get_object_or_404(Order, id=order_id)
+        # Read-only: deliveries are created with their order (or by
+        # manage.py backfill_deliveries), never lazily here
+        tracking = get_tracking(order_id)
+        if tracking is None:
+            return Response(
+                {'error': 'No delivery found for this order'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
         # Authorization check
-        if request.user.role == 'CUSTOMER' and order.user != request.user:
+        if request.user.role == 'CUSTOMER' and tracking['user_id'] != request.user.id:
             return Response(
                 {'error': 'You can only view your own orders'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get or create delivery record
-        delivery, created = Delivery.objects.get_or_create(order=order)
-        
-        # If created, add initial status log
-        if created:
-            DeliveryStatusLog.objects.create(
-                delivery=delivery,
-                status=Delivery.Status.PLACED,
-                notes='Order placed',
-                created_by=request.user if request.user.role == 'ADMIN' else None
-            )
-        
-        serializer = DeliverySerializer(delivery)
-        return Response(serializer.data)
+        return Response(tracking['delivery'])
     
     # PUT /api/delivery/{order_id}/update_status/ - Admin updates delivery status
     @action(detail=True, methods=['put'], permission_classes=[IsAdminUser])
@@ -73,43 +104,237 @@ class DeliveryViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order = get_object_or_404(Order, id=order_id)
-        delivery, _ = Delivery.objects.get_or_create(order=order)
+        with transaction.atomic():
+            delivery = get_object_or_404(
+                Delivery.objects.select_related('order__user').select_for_update(of=('self', 'order')),
+                order_id=order_id
+            )
+            
+            # Same rules as bulk updates: forward only, never for cancelled orders
+            new_status = request.data.get('status')
+            error = transition_error(delivery, new_status)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Update delivery status
+            old_status = delivery.status
+            delivery.status = new_status
+            delivery.save()
+            
+            # Log the status change
+            notes = request.data.get('notes', f'Status changed from {old_status} to {new_status}')
+            DeliveryStatusLog.objects.create(
+                delivery=delivery,
+                status=new_status,
+                notes=notes,
+                created_by=request.user
+            )
+            
+            # Sync order status (optional but good practice)
+            order = delivery.order
+            order.status = ORDER_STATUS_FOR_DELIVERY[new_status]
+            order.save()
         
-        # Validate status
-        new_status = request.data.get('status')
-        if not new_status or new_status not in Delivery.Status.values:
+        return Response({
+            'message': 'Delivery status updated successfully',
+            'delivery': DeliverySerializer(delivery).data
+        })
+    
+    # POST /api/delivery/bulk_update_status/ - Admin moves many deliveries at once
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_update_status(self, request):
+        """
+        Apply a dispatch run: a list of {order_id, status, notes}.
+
+        Deliveries only move forward. Invalid entries are reported in
+        ``errors`` and the rest are applied; customers are emailed once the
+        batch is committed.
+        """
+        try:
+            updates = parse_updates(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        deliveries, errors = apply_status_updates(updates, user=request.user)
+        if not deliveries:
             return Response(
-                {'error': f'Invalid status. Must be one of: {list(Delivery.Status.values)}'},
+                {'error': 'No updates were applied', 'errors': errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update delivery status
-        old_status = delivery.status
-        delivery.status = new_status
-        delivery.save()
+        return Response({
+            'message': f'{len(deliveries)} deliveries updated successfully',
+            'updated': [delivery.order_id for delivery in deliveries],
+            'errors': errors
+        })
+    
+    # GET /api/delivery/dispatch_batches/ - Pending orders batched by city
+    # POST /api/delivery/dispatch_batches/ - Move one batch to its next status
+    @action(detail=False, methods=['get', 'post'], permission_classes=[IsAdminUser])
+    def dispatch_batches(self, request):
+        """
+        GET lists batches of PLACED / PACKED orders per shipping city with
+        their pick lists (filters: city, status, batch_size).
+
+        POST {city, status, order_ids (optional), notes} moves the batch to
+        its next status (PLACED -> PACKED, PACKED -> DISPATCHED).
+        """
+        if request.method == 'GET':
+            try:
+                batches = plan_dispatch_batches(
+                    city=request.query_params.get('city'),
+                    status=request.query_params.get('status'),
+                    max_batch_size=int(request.query_params.get('batch_size', MAX_BATCH_SIZE))
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'count': len(batches), 'batches': batches})
         
-        # Log the status change
-        notes = request.data.get('notes', f'Status changed from {old_status} to {new_status}')
-        DeliveryStatusLog.objects.create(
-            delivery=delivery,
-            status=new_status,
-            notes=notes,
-            created_by=request.user
-        )
+        order_ids = request.data.get('order_ids')
+        if order_ids is not None:
+            try:
+                order_ids = [int(order_id) for order_id in order_ids]
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'order_ids must be a list of integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        # Sync order status (optional but good practice)
-        order.status = new_status
-        order.save()
+        try:
+            deliveries, errors = dispatch_batch(
+                city=request.data.get('city', ''),
+                status=request.data.get('status'),
+                order_ids=order_ids,
+                notes=request.data.get('notes', ''),
+                user=request.user
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not deliveries:
+            return Response(
+                {'error': 'No updates were applied', 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response({
-            'message': 'Delivery status updated successfully',
-            'delivery': DeliverySerializer(delivery).data
+            'message': f'{len(deliveries)} deliveries updated successfully',
+            'updated': [delivery.order_id for delivery in deliveries],
+            'errors': errors
         })
     
     # GET /api/delivery/ - List all deliveries (Admin) or customer's deliveries
     def list(self, request):
-        """List deliveries based on user role"""
+        """
+        List deliveries based on user role, newest first.
+
+        Filters: status, date_from / date_to (YYYY-MM-DD, on last update).
+        Keyset-paginated with cursor / page_size on id (updated_at changes
+        with every status update, so it cannot key a stable cursor). Each row carries its newest
+        log; pass include_logs=true for the full history.
+        """
         deliveries = self.get_queryset()
-        serializer = DeliverySerializer(deliveries, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        
+        try:
+            deliveries = filter_deliveries(deliveries, request.query_params)
+            page, next_cursor = keyset_page(
+                deliveries.select_related('order__user').prefetch_related(
+                    Prefetch(
+                        'status_logs',
+                        queryset=DeliveryStatusLog.objects.order_by('-created_at', '-id')[:1],
+                        to_attr='latest_logs'
+                    )
+                ),
+                ordering=('-id',),
+                cursor=request.query_params.get('cursor'),
+                page_size=parse_page_size(request.query_params.get('page_size'))
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.query_params.get('include_logs', 'false').lower() == 'true':
+            prefetch_related_objects(page, Prefetch(
+                'status_logs',
+                queryset=DeliveryStatusLog.objects.select_related('created_by')
+            ))
+            results = DeliverySerializer(page, many=True).data
+        else:
+            results = DeliveryListSerializer(page, many=True).data
+        
+        count, count_is_estimate = count_matches(deliveries)
+        
+        return Response({
+            'count': count,
+            'count_is_estimate': count_is_estimate,
+            'next_cursor': next_cursor,
+            'results': results
+        })
+
+
+async def delivery_event_stream(request, order_id):
+    """
+    Live tracking for one order: GET /api/delivery/{order_id}/events/
+
+    With ``Accept: text/event-stream`` (EventSource), streams a ``snapshot``
+    of the delivery once and then each new ``status_log``; reconnects send
+    only what was missed since ``Last-Event-ID``.
+
+    Otherwise it is a long-poll: without ``after`` the snapshot is returned
+    straight away; with ``after=<log id>`` the request waits until a newer
+    log is committed (or ``timeout`` seconds pass) and returns
+    ``{"events": [...], "last_event_id": ...}``.
+
+    Authenticate with the Bearer header or ``?token=<access token>``.
+    """
+    user = await authenticate_stream_request(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    tracking = await get_tracking_async(order_id)
+    if tracking is None:
+        return JsonResponse(
+            {'error': 'No delivery found for this order'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if user.role != 'ADMIN' and tracking['user_id'] != user.id:
+        return JsonResponse(
+            {'error': 'You can only view your own orders'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        after = request.GET.get('after') or request.headers.get('Last-Event-ID')
+        after = int(after) if after not in (None, '') else None
+        timeout = float(request.GET.get('timeout', LONG_POLL_SECONDS))
+        if not math.isfinite(timeout):
+            raise ValueError('timeout must be finite')
+        timeout = min(timeout, LONG_POLL_SECONDS)
+    except ValueError:
+        return JsonResponse(
+            {'error': 'after must be a log id and timeout a number of seconds'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(
+            iter_tracking_events(order_id, last_event_id=after),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    if after is None:
+        return JsonResponse({
+            'snapshot': tracking['delivery'],
+            'last_event_id': snapshot_event_id(tracking['delivery'])
+        })
+    
+    events = await wait_for_logs(order_id, after, timeout=max(timeout, 0))
+    return JsonResponse({
+        'events': events,
+        'last_event_id': events[-1]['id'] if events else after
+    })
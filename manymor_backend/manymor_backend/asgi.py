@@ -2,6 +2,8 @@
 ASGI config for manymor_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The web process runs it under uvicorn, so every StreamingHttpResponse must be
+given an async iterator: a sync one is consumed whole before it is sent.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -213,15 +213,29 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@manymor.com')
 COMPANY_NAME = 'ManyMor'
 COMPANY_SUPPORT_EMAIL = 'support@manymor.com'
-
-
-# Cache Configuration (for rate limiting)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Seconds to collect order status changes before emailing customers (0 = no coalescing)
+ORDER_NOTIFICATION_WINDOW = int(os.environ.get('ORDER_NOTIFICATION_WINDOW', 10))
+
+
+# Cache Configuration (rate limiting, promotion version, cached stats).
+# Local memory by default, which is per process. Deployments running the
+# promotion scheduler worker next to the web server need a cache shared by
+# every process: set CACHE_BACKEND (and CACHE_LOCATION), e.g. to
+# django.core.cache.backends.redis.RedisCache and redis://...
+if os.environ.get('CACHE_BACKEND'):
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ['CACHE_BACKEND'],
+            'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
 
 # Security Settings
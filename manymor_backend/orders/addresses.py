@@ -0,0 +1,40 @@
+"""
+Helpers for the free-text ``Order.shipping_address``.
+"""
+import re
+
+
+def normalize_city(value):
+    """Comparable city key: case-folded, single-spaced ('' if blank)"""
+    return ' '.join((value or '').split()).casefold()
+
+
+def _words(part):
+    """Words of an address part, without house numbers and postal codes"""
+    return [word for word in part.split() if not any(char.isdigit() for char in word)]
+
+
+def _is_region_code(words):
+    """A state or province code left of a postal code ("IL 62704")"""
+    return all(word.isupper() and len(word) <= 3 for word in words)
+
+
+def city_from_address(address):
+    """
+    Best-effort city of a free-text address, read from the comma or line
+    separated parts, last first. Postal codes and region codes are skipped,
+    and so is a trailing country: a last part without digits that follows
+    another part not starting with a house number, in addresses of three
+    or more parts ("5 Samora Machel Ave, Harare, Zimbabwe").
+    """
+    parts = [part.strip() for part in re.split(r'[,\n]', address or '') if part.strip()]
+    if len(parts) >= 3 and not any(char.isdigit() for char in parts[-1]):
+        before = parts[-2].split()[0]
+        if not any(char.isdigit() for char in before):
+            parts.pop()
+
+    for part in reversed(parts):
+        words = _words(part)
+        if words and not (len(words) < len(part.split()) and _is_region_code(words)):
+            return normalize_city(' '.join(words))
+    return ''
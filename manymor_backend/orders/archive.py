@@ -0,0 +1,159 @@
+"""
+Hot/cold partitioning of historical orders.
+
+Orders in a terminal status that are older than the retention window are
+moved into ``ArchivedOrder`` / ``ArchivedOrderItem`` so the hot tables used
+by checkout, customer history and the admin dashboard stay small. The read
+helpers below let detail lookups and admin exports see both tables.
+"""
+import heapq
+from datetime import timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Order, ArchivedOrder, ArchivedOrderItem
+
+
+# Orders in these statuses will never change again and are safe to archive
+TERMINAL_STATUSES = [Order.Status.DELIVERED, Order.Status.CANCELLED]
+
+
+def archive_cutoff(months):
+    """Return the created_at cutoff for orders older than ``months`` months"""
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def archivable_orders(cutoff):
+    """Queryset of hot orders eligible for archiving"""
+    return Order.objects.filter(
+        created_at__lt=cutoff,
+        status__in=TERMINAL_STATUSES
+    )
+
+
+def _delivery_snapshot(order):
+    """Serialize the order's delivery record and logs into plain JSON"""
+    try:
+        delivery = order.delivery
+    except ObjectDoesNotExist:
+        return []
+
+    logs = [{
+        'status': log.status,
+        'notes': log.notes,
+        'created_at': log.created_at.isoformat(),
+        'created_by': log.created_by_id,
+    } for log in delivery.status_logs.all()]
+    # Logs already compacted into the delivery's history (newest first, and
+    # older than any remaining log); their author is kept as serialized
+    return logs + [{
+        'status': entry['status'],
+        'notes': entry['notes'],
+        'created_at': entry['created_at'],
+        'created_by': entry['created_by'],
+    } for entry in delivery.history or []]
+
+
+def archive_order_chunk(order_ids):
+    """
+    Move one chunk of orders into the archive tables.
+
+    Runs in its own short transaction so the hot tables are never locked
+    for longer than a single chunk. Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.filter(id__in=order_ids, status__in=TERMINAL_STATUSES)
+            .select_for_update()
+            .select_related('delivery')
+            .prefetch_related('items', 'delivery__status_logs')
+        )
+        if not orders:
+            return 0
+
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                total_amount=order.total_amount,
+                status=order.status,
+                payment_status=order.payment_status,
+                shipping_address=order.shipping_address,
+                created_at=order.created_at,
+                delivery_history=_delivery_snapshot(order),
+            )
+            for order in orders
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                order_id=order.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+            )
+            for order in orders
+            for item in order.items.all()
+        ])
+
+        # Cascades to order items, delivery and delivery status logs
+        Order.objects.filter(id__in=[order.id for order in orders]).delete()
+
+    return len(orders)
+
+
+def archive_orders(cutoff, chunk_size=500):
+    """
+    Archive every eligible order older than ``cutoff`` in chunks.
+
+    Yields the number of orders moved per chunk so callers can report
+    progress.
+    """
+    while True:
+        order_ids = list(
+            archivable_orders(cutoff)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not order_ids:
+            return
+        yield archive_order_chunk(order_ids)
+
+
+def get_order_or_archived(order_id, user=None):
+    """
+    Look up an order by id in the hot table, falling back to the archive.
+
+    Raises Http404 when the order exists in neither table (or belongs to a
+    different user when ``user`` is given).
+    """
+    filters = {'id': order_id}
+    if user is not None:
+        filters['user'] = user
+
+    order = Order.objects.filter(**filters).first()
+    if order is not None:
+        return order
+
+    archived = ArchivedOrder.objects.filter(**filters).first()
+    if archived is not None:
+        return archived
+
+    raise Http404('No Order matches the given query.')
+
+
+def iter_orders_with_archive(orders, archived_orders):
+    """
+    Merge hot and archived order iterables, both already ordered by
+    ``-created_at``, into one stream ordered by ``-created_at``.
+
+    Works lazily, so it can be fed ``.iterator()`` querysets for exports.
+    """
+    return heapq.merge(
+        orders,
+        archived_orders,
+        key=lambda order: order.created_at,
+        reverse=True
+    )
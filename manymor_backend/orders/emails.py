@@ -66,6 +66,89 @@ def send_order_confirmation_email(order):
         return False
 
 
+def order_status_context(order, new_status, status_message=None):
+    """
+    Template context describing an order's new status.
+    
+    Args:
+        order: Order instance
+        new_status: New status value
+        status_message: Optional custom message about the status change
+    """
+    # Map status to CSS class
+    status_class_map = {
+        'PLACED': 'placed',
+        'PACKED': 'packed',
+        'DISPATCHED': 'dispatched',
+        'DISATCHED': 'dispatched',  # Handle typo in model
+        'IN_TRANSIT': 'in_transit',
+        'DELIVERED': 'delivered',
+        'CANCELLED': 'cancelled',
+    }
+    
+    # Default status messages
+    default_messages = {
+        'PLACED': 'Your order has been received and is being prepared.',
+        'PACKED': 'Your order has been packed and is ready for dispatch.',
+        'DISPATCHED': 'Your order has been dispatched and is on its way to you!',
+        'DISATCHED': 'Your order has been dispatched and is on its way to you!',
+        'IN_TRANSIT': 'Your order is currently in transit and will arrive soon.',
+        'DELIVERED': 'Your order has been delivered successfully. Enjoy your purchase!',
+        'CANCELLED': 'Your order has been cancelled. If you have any questions, please contact support.',
+    }
+    
+    # Get delivery info if exists
+    estimated_delivery = None
+    if hasattr(order, 'delivery'):
+        estimated_delivery = order.delivery.estimated_delivery
+    
+    context = {
+        'order_id': order.id,
+        'order_date': order.created_at.strftime('%B %d, %Y'),
+        'customer_email': order.user.email,
+        'new_status': order.get_status_display(),
+        'current_status': new_status,
+        'status_class': status_class_map.get(new_status, 'placed'),
+        'status_message': status_message or default_messages.get(new_status, ''),
+        'total_amount': f"{order.total_amount:.2f}",
+        'estimated_delivery': estimated_delivery.strftime('%B %d, %Y') if estimated_delivery else None,
+        'company_name': settings.COMPANY_NAME,
+        'support_email': settings.COMPANY_SUPPORT_EMAIL,
+    }
+    return context
+
+
+def build_order_status_update_email(order, new_status, status_message=None):
+    """
+    Build (without sending) the order status update email.
+    
+    Args:
+        order: Order instance
+        new_status: New status value
+        status_message: Optional custom message about the status change
+    """
+    context = order_status_context(order, new_status, status_message)
+    
+    # Render email templates
+    html_content = render_to_string('emails/order_status_update.html', context)
+    text_content = render_to_string('emails/order_status_update.txt', context)
+    
+    # Create email
+    subject = f'Order Status Update - Order #{order.id} is now {order.get_status_display()}'
+    from_email = settings.DEFAULT_FROM_EMAIL
+    to_email = [order.user.email]
+    
+    # Create email message with both HTML and plain text
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=from_email,
+        to=to_email
+    )
+    email.attach_alternative(html_content, "text/html")
+    return email
+
+
 def send_order_status_update_email(order, new_status, status_message=None):
     """
     Send order status update email to customer when order status changes.
@@ -76,64 +159,7 @@ def send_order_status_update_email(order, new_status, status_message=None):
         status_message: Optional custom message about the status change
     """
     try:
-        # Map status to CSS class
-        status_class_map = {
-            'PLACED': 'placed',
-            'PACKED': 'packed',
-            'DISPATCHED': 'dispatched',
-            'DISATCHED': 'dispatched',  # Handle typo in model
-            'IN_TRANSIT': 'in_transit',
-            'DELIVERED': 'delivered',
-            'CANCELLED': 'cancelled',
-        }
-        
-        # Default status messages
-        default_messages = {
-            'PLACED': 'Your order has been received and is being prepared.',
-            'PACKED': 'Your order has been packed and is ready for dispatch.',
-            'DISPATCHED': 'Your order has been dispatched and is on its way to you!',
-            'DISATCHED': 'Your order has been dispatched and is on its way to you!',
-            'IN_TRANSIT': 'Your order is currently in transit and will arrive soon.',
-            'DELIVERED': 'Your order has been delivered successfully. Enjoy your purchase!',
-            'CANCELLED': 'Your order has been cancelled. If you have any questions, please contact support.',
-        }
-        
-        # Get delivery info if exists
-        estimated_delivery = None
-        if hasattr(order, 'delivery'):
-            estimated_delivery = order.delivery.estimated_delivery
-        
-        context = {
-            'order_id': order.id,
-            'order_date': order.created_at.strftime('%B %d, %Y'),
-            'customer_email': order.user.email,
-            'new_status': order.get_status_display(),
-            'current_status': new_status,
-            'status_class': status_class_map.get(new_status, 'placed'),
-            'status_message': status_message or default_messages.get(new_status, ''),
-            'total_amount': f"{order.total_amount:.2f}",
-            'estimated_delivery': estimated_delivery.strftime('%B %d, %Y') if estimated_delivery else None,
-            'company_name': settings.COMPANY_NAME,
-            'support_email': settings.COMPANY_SUPPORT_EMAIL,
-        }
-        
-        # Render email templates
-        html_content = render_to_string('emails/order_status_update.html', context)
-        text_content = render_to_string('emails/order_status_update.txt', context)
-        
-        # Create email
-        subject = f'Order Status Update - Order #{order.id} is now {order.get_status_display()}'
-        from_email = settings.DEFAULT_FROM_EMAIL
-        to_email = [order.user.email]
-        
-        # Create email message with both HTML and plain text
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
-            to=to_email
-        )
-        email.attach_alternative(html_content, "text/html")
+        email = build_order_status_update_email(order, new_status, status_message)
         
         # Send email
         email.send(fail_silently=False)
@@ -159,3 +185,32 @@ def send_delivery_status_update_email(delivery, notes=None):
         new_status=delivery.status,
         status_message=notes
     )
+
+
+def build_order_status_digest_email(updates):
+    """
+    Build one email covering status changes of several orders of the same
+    customer.
+    
+    Args:
+        updates: list of (order, new_status, status_message) tuples
+    """
+    orders = [order_status_context(*update) for update in updates]
+    context = {
+        'customer_email': orders[0]['customer_email'],
+        'orders': orders,
+        'company_name': settings.COMPANY_NAME,
+        'support_email': settings.COMPANY_SUPPORT_EMAIL,
+    }
+    
+    html_content = render_to_string('emails/order_status_digest.html', context)
+    text_content = render_to_string('emails/order_status_digest.txt', context)
+    
+    email = EmailMultiAlternatives(
+        subject=f'Order Status Update - {len(orders)} of your orders have been updated',
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[context['customer_email']]
+    )
+    email.attach_alternative(html_content, "text/html")
+    return email
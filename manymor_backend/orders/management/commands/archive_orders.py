@@ -0,0 +1,52 @@
+"""
+Management command to move old, finished orders into the archive tables.
+Usage: python manage.py archive_orders --months 12 --chunk-size 500
+"""
+from django.core.management.base import BaseCommand
+from orders.archive import archive_cutoff, archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move delivered/cancelled orders older than N months into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=12,
+            help='Archive orders created more than this many months ago (default: 12)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of orders moved per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many orders would be archived'
+        )
+
+    def handle(self, *args, **options):
+        months = options['months']
+        chunk_size = options['chunk_size']
+
+        if months < 1 or chunk_size < 1:
+            self.stdout.write(self.style.ERROR('--months and --chunk-size must be positive'))
+            return
+
+        cutoff = archive_cutoff(months)
+        self.stdout.write(f'Archiving finished orders created before {cutoff:%Y-%m-%d %H:%M}')
+
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f'{count} orders would be archived')
+            return
+
+        total = 0
+        for moved in archive_orders(cutoff, chunk_size=chunk_size):
+            total += moved
+            self.stdout.write(f'  moved {moved} orders ({total} so far)')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Archived {total} orders'))
@@ -0,0 +1,44 @@
+"""
+Management command sending queued order status update emails.
+Usage: python manage.py send_order_notifications [--poll-interval 30] [--once]
+
+Web processes send their own notifications when the coalescing window
+closes. This drains what they could not: notifications queued by a
+process that stopped before its window closed, or whose sending failed.
+Run it as a long-lived worker process, or with --once from cron.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.notifications import order_notifications
+
+
+class Command(BaseCommand):
+    help = 'Send order status update emails queued for longer than the notification window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30,
+            help='Seconds between checks for queued notifications (default: 30)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send what is due now and exit'
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        if poll_interval <= 0:
+            raise CommandError('--poll-interval must be positive')
+
+        while True:
+            sent = order_notifications.flush_due()
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'✓ Sent {sent} order status update emails'))
+
+            if options['once']:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-19 03:25
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of orders.addresses.city_from_address as of this migration
+def normalize_city(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def city_from_address(address):
+    parts = [part.strip() for part in re.split(r'[,\n]', address or '') if part.strip()]
+    if len(parts) >= 3 and not any(char.isdigit() for char in parts[-1]):
+        before = parts[-2].split()[0]
+        if not any(char.isdigit() for char in before):
+            parts.pop()
+
+    for part in reversed(parts):
+        words = [word for word in part.split() if not any(char.isdigit() for char in word)]
+        is_region_code = all(word.isupper() and len(word) <= 3 for word in words)
+        if words and not (len(words) < len(part.split()) and is_region_code):
+            return normalize_city(' '.join(words))
+    return ''
+
+
+def backfill_shipping_city(apps, schema_editor):
+    """Parse the city out of existing shipping addresses, in id-ordered chunks"""
+    Order = apps.get_model('orders', 'Order')
+    last_id = 0
+    while True:
+        orders = list(Order.objects.filter(id__gt=last_id).order_by('id').only('id', 'shipping_address')[:2000])
+        if not orders:
+            break
+        for order in orders:
+            order.shipping_city = city_from_address(order.shipping_address)[:100]
+        Order.objects.bulk_update(orders, ['shipping_city'])
+        last_id = orders[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_orders_order_created_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipping_city',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(backfill_shipping_city, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'shipping_city'], name='orders_order_status_city'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_shipping_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingOrderNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_notification', to='orders.order')),
+            ],
+        ),
+    ]
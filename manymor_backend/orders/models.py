@@ -1,11 +1,12 @@
 from django.db import models
 from django.conf import settings
-from products.models import Product
+from products.models import Product, LoadedValuesMixin
+from .addresses import normalize_city, city_from_address
 
 User = settings.AUTH_USER_MODEL
 
 
-class Order(models.Model):
+class Order(LoadedValuesMixin, models.Model):
     class Status(models.TextChoices):
         PLACED = 'PLACED', 'Placed'
         PACKED = 'PACKED', 'Packed'
@@ -30,8 +31,26 @@ class Order(models.Model):
         default='PAID'  # mocked for MVP
     )
     shipping_address = models.TextField(blank=True)  # ADD THIS FIELD
+    # Normalized city, for dispatch batching and delivery estimates
+    shipping_city = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    TRACKED_FIELDS = ('status', 'total_amount')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of admin listings, newest first
+            models.Index(fields=['-created_at', '-id'], name='orders_order_created_id'),
+            models.Index(fields=['status', '-created_at'], name='orders_order_status_created'),
+            # Dispatch planning groups pending orders by city
+            models.Index(fields=['status', 'shipping_city'], name='orders_order_status_city'),
+        ]
+
+    def save(self, *args, **kwargs):
+        city = normalize_city(self.shipping_city) or city_from_address(self.shipping_address)
+        self.shipping_city = city[:self._meta.get_field('shipping_city').max_length]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Order #{self.id}"
 
@@ -51,3 +70,74 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
+
+
+class PendingOrderNotification(models.Model):
+    """
+    An order whose customer is owed a status update email, with the status
+    the order had before the first change not yet emailed. Written in the
+    transaction that changes the order and drained by orders.notifications,
+    so queued emails survive restarts and any process can send them.
+    """
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='pending_notification'
+    )
+    previous_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Notification for Order #{self.order_id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Cold copy of an Order in a terminal status, moved out of the hot tables
+    by the ``archive_orders`` management command. Keeps the original order id
+    so existing links and detail lookups keep resolving.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_orders'
+    )
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(
+        max_length=20,
+        choices=Order.Status.choices
+    )
+    payment_status = models.CharField(max_length=20)
+    shipping_address = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Snapshot of the delivery record and its status logs at archive time
+    delivery_history = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archived Order #{self.id}"
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name='items',
+        on_delete=models.CASCADE
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name='archived_order_items'
+    )
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.product.name} x {self.quantity}"
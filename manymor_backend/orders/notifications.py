@@ -0,0 +1,158 @@
+"""
+Coalesced order status notifications.
+
+A single status change reaches us twice (the Delivery save and the Order
+save it triggers), and admins often click through several statuses in a
+row. Instead of mailing on every save, changes are collected per order for
+a short window; when it closes, each customer gets one email covering the
+final status of every order that actually changed, all sent over a single
+mail connection and outside the request.
+
+Pending orders are stored in PendingOrderNotification, in the same
+transaction as the change, so nothing queued is lost when a process
+exits. The process that made a change sends once its window closes;
+``manage.py send_order_notifications`` drains whatever a stopped process
+left behind.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from delivery.models import DeliveryStatusLog, DELIVERY_STATUS_FOR_ORDER
+from .emails import build_order_status_update_email, build_order_status_digest_email
+from .models import Order, PendingOrderNotification
+
+
+def notification_window():
+    """
+    Seconds to wait for more changes before sending. 0 turns coalescing
+    off: every commit sends the emails for its own changes.
+    """
+    return getattr(settings, 'ORDER_NOTIFICATION_WINDOW', 10)
+
+
+class NotificationCoalescer:
+    """
+    Queues notifications in PendingOrderNotification, keyed by order id and
+    remembering the status each order had before the first unsent change,
+    and sends them when this process's window closes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, order_id, previous_status):
+        """Queue a notification for ``order_id`` with the current transaction"""
+        self.add_many([(order_id, previous_status)])
+
+    def add_many(self, changes):
+        """Queue ``(order_id, previous_status)`` pairs together with the current transaction"""
+        # An order already pending keeps the status it had before that change
+        PendingOrderNotification.objects.bulk_create(
+            [
+                PendingOrderNotification(order_id=order_id, previous_status=previous_status)
+                for order_id, previous_status in changes
+            ],
+            ignore_conflicts=True
+        )
+        transaction.on_commit(self._schedule)
+
+    def _schedule(self):
+        window = notification_window()
+        if window <= 0:
+            self.flush()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(window, self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self, queued_before=None):
+        """
+        Send everything pending now; with ``queued_before``, only once the
+        oldest pending notification was queued before it. Returns the number
+        of emails sent. If sending fails, the notifications stay queued.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        queued = PendingOrderNotification.objects.all()
+        if queued_before is not None and not queued.filter(created_at__lt=queued_before).exists():
+            return 0
+
+        try:
+            with transaction.atomic():
+                # Rows another process is sending are skipped, not sent twice
+                pending = dict(
+                    queued.select_for_update(skip_locked=True).values_list('order_id', 'previous_status')
+                )
+                if not pending:
+                    return 0
+                messages = build_messages(pending)
+                sent = get_connection(fail_silently=False).send_messages(messages) if messages else 0
+                PendingOrderNotification.objects.filter(order_id__in=list(pending)).delete()
+            if sent:
+                print(f"✓ Sent {sent} order status update emails for {len(pending)} orders")
+            return sent or 0
+        except Exception as e:
+            print(f"✗ Failed to send order status update emails: {str(e)}")
+            return 0
+
+    def flush_due(self):
+        """Send pending notifications once the oldest has waited a full window"""
+        return self.flush(queued_before=timezone.now() - timedelta(seconds=notification_window()))
+
+
+def _latest_notes(order_ids):
+    """Latest delivery log per order as ``{order_id: (status, notes)}``"""
+    latest = {}
+    logs = DeliveryStatusLog.objects.filter(delivery__order_id__in=order_ids).order_by(
+        'delivery_id', '-created_at', '-id'
+    ).values_list('delivery__order_id', 'status', 'notes')
+    for order_id, status, notes in logs:
+        latest.setdefault(order_id, (status, notes))
+    return latest
+
+
+def build_messages(pending):
+    """
+    One message per customer for the orders in ``pending`` (order id to the
+    status before the window) whose status differs from where it started.
+    """
+    orders = Order.objects.select_related('user', 'delivery').in_bulk(list(pending))
+    changed = [order for order_id, order in orders.items() if order.status != pending[order_id]]
+    if not changed:
+        return []
+    notes = _latest_notes([order.id for order in changed])
+
+    by_customer = {}
+    for order in sorted(changed, key=lambda order: order.id):
+        # The templates know delivery statuses; only reuse a log's notes if
+        # they describe the status the order ended up in
+        status = DELIVERY_STATUS_FOR_ORDER.get(order.status, order.status)
+        log_status, log_notes = notes.get(order.id, (None, None))
+        message = log_notes if log_status == status else None
+        by_customer.setdefault(order.user_id, []).append((order, status, message))
+
+    return [
+        build_order_status_update_email(*updates[0]) if len(updates) == 1
+        else build_order_status_digest_email(updates)
+        for updates in by_customer.values()
+    ]
+
+
+order_notifications = NotificationCoalescer()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 from products.serializers import ProductSerializer
 
 
@@ -24,3 +24,69 @@ class OrderSerializer(serializers.ModelSerializer):
             'items',
             'created_at'
         )
+
+
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    """Lean order line for listings: no nested product, images or promotions"""
+    product_id = serializers.IntegerField(read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'product_id', 'product_name', 'quantity', 'unit_price')
+
+
+class AdminOrderListSerializer(serializers.ModelSerializer):
+    """Order row for the admin order listing"""
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+    customer_email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = (
+            'id',
+            'status',
+            'payment_status',
+            'total_amount',
+            'customer_email',
+            'shipping_address',
+            'shipping_city',
+            'items',
+            'created_at'
+        )
+
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product = ProductSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ('id', 'product', 'quantity', 'unit_price')
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    is_archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedOrder
+        fields = (
+            'id',
+            'status',
+            'payment_status',
+            'total_amount',
+            'items',
+            'created_at',
+            'archived_at',
+            'is_archived'
+        )
+
+    def get_is_archived(self, obj):
+        return True
+
+
+def serialize_order(order):
+    """Serialize a hot or archived order with the matching serializer"""
+    if isinstance(order, ArchivedOrder):
+        return ArchivedOrderSerializer(order).data
+    return OrderSerializer(order).data
@@ -1,3 +1,251 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F, Sum
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Address
+from cart.models import Cart, CartItem
+from products.models import Category, Product
+from dashboard.models import DailySalesRollup
+from delivery.models import Delivery, DeliveryStatusLog
+from delivery.retention import compact_delivery_logs
+from promotions.index import promotion_index
+from promotions.models import ProductPromotion
+from promotions.pricing import quote_products
+from .addresses import city_from_address
+from .archive import archive_cutoff, archive_orders, get_order_or_archived
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+
+class CityFromAddressTests(TestCase):
+
+    def test_city_before_postal_code(self):
+        self.assertEqual(city_from_address('12 Main St, Springfield, 12345'), 'springfield')
+        self.assertEqual(city_from_address('Flat 3\n221B Baker Street\nLondon NW1 6XE'), 'london')
+        self.assertEqual(city_from_address('12 Main St, Springfield, IL 62704'), 'springfield')
+
+    def test_skips_trailing_country(self):
+        self.assertEqual(city_from_address('5 Samora Machel Ave, Harare, Zimbabwe'), 'harare')
+        self.assertEqual(city_from_address('10 Downing St, London SW1A 1AA, United Kingdom'), 'london')
+
+    def test_city_after_street(self):
+        self.assertEqual(city_from_address('5 Samora Machel Ave, Harare'), 'harare')
+        self.assertEqual(city_from_address('Flat 2, 10 Downing St, London'), 'london')
+        self.assertEqual(city_from_address(''), '')
+
+
+class CheckoutShippingCityTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('customer@example.com', 'pw')
+        category = Category.objects.create(name='Shoes')
+        product = Product.objects.create(category=category, name='Runner', price=Decimal('10.00'), stock_quantity=10)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, data):
+        return self.client.post('/api/orders/checkout/', data, format='json')
+
+    def test_city_from_saved_address(self):
+        address = Address.objects.create(
+            user=self.user, city='  Harare ', address_line='5 Samora Machel Ave, Zimbabwe'
+        )
+        response = self.checkout({'address_id': address.id})
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.shipping_city, 'harare')
+        self.assertIn('Samora Machel', order.shipping_address)
+
+    def test_other_customers_address_is_rejected(self):
+        other = User.objects.create_user('other@example.com', 'pw')
+        address = Address.objects.create(user=other, city='Harare', address_line='1 Road')
+        response = self.checkout({'address_id': address.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_city_parsed_without_saved_address(self):
+        response = self.checkout({'shipping_address': '5 Samora Machel Ave, Harare, Zimbabwe'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get(user=self.user).shipping_city, 'harare')
+
+    def test_non_string_city_is_rejected(self):
+        response = self.checkout({'shipping_address': '1 Road, Harare', 'shipping_city': 123})
+        self.assertEqual(response.status_code, 400)
+
+    def test_long_city_is_truncated(self):
+        response = self.checkout({'shipping_city': 'x' * 150})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(Order.objects.get(user=self.user).shipping_city), 100)
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('customer@example.com', 'pw')
+        category = Category.objects.create(name='Shoes')
+        self.runner = Product.objects.create(category=category, name='Runner', price=Decimal('10.00'), stock_quantity=50)
+        self.socks = Product.objects.create(category=category, name='Socks', price=Decimal('2.50'), stock_quantity=50)
+
+    def create_order(self, order_status, days_old):
+        order = Order.objects.create(user=self.user, total_amount=Decimal('25.00'))
+        OrderItem.objects.create(order=order, product=self.runner, quantity=2, unit_price=Decimal('10.00'))
+        OrderItem.objects.create(order=order, product=self.socks, quantity=2, unit_price=Decimal('2.50'))
+        order.status = order_status
+        order.save()
+        Delivery.objects.filter(order=order).update(
+            status=Delivery.Status.DELIVERED if order_status == Order.Status.DELIVERED else Delivery.Status.PLACED,
+            updated_at=timezone.now() - timedelta(days=days_old)
+        )
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - timedelta(days=days_old))
+        return order
+
+    def rollup_totals(self):
+        return DailySalesRollup.objects.filter(category__isnull=True).aggregate(
+            orders=Sum('order_count'), revenue=Sum('revenue')
+        )
+
+    def archive(self, months=12):
+        return sum(archive_orders(archive_cutoff(months), chunk_size=1))
+
+    def test_moves_finished_old_orders_with_items(self):
+        delivered = self.create_order(Order.Status.DELIVERED, days_old=400)
+        cancelled = self.create_order(Order.Status.CANCELLED, days_old=400)
+        recent = self.create_order(Order.Status.DELIVERED, days_old=10)
+        pending = self.create_order(Order.Status.PACKED, days_old=400)
+        before = self.rollup_totals()
+
+        self.assertEqual(self.archive(), 2)
+
+        self.assertEqual(
+            set(Order.objects.values_list('id', flat=True)), {recent.id, pending.id}
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[delivered.id, cancelled.id]).exists())
+        archived = ArchivedOrder.objects.get(id=delivered.id)
+        self.assertEqual(archived.status, Order.Status.DELIVERED)
+        self.assertEqual(archived.total_amount, Decimal('25.00'))
+        items_total = ArchivedOrderItem.objects.filter(order=archived).aggregate(
+            total=Sum(F('unit_price') * F('quantity'))
+        )['total']
+        self.assertEqual(items_total, archived.total_amount)
+        self.assertEqual(archived.items.count(), 2)
+        # Archiving moves rows; the sales already recorded stay counted
+        self.assertEqual(self.rollup_totals(), before)
+        self.assertEqual(get_order_or_archived(delivered.id, user=self.user), archived)
+
+    def test_archive_then_compact(self):
+        archived = self.create_order(Order.Status.DELIVERED, days_old=400)
+        kept = self.create_order(Order.Status.DELIVERED, days_old=200)
+
+        self.assertEqual(self.archive(), 1)
+        history = ArchivedOrder.objects.get(id=archived.id).delivery_history
+        self.assertEqual(history[-1]['notes'], 'Order placed')
+
+        # Only the delivery still in the hot tables is left to compact
+        compacted = list(compact_delivery_logs())
+
+        self.assertEqual(compacted, [(1, 1)])
+        self.assertFalse(DeliveryStatusLog.objects.exists())
+        self.assertEqual(len(Delivery.objects.get(order=kept).history), 1)
+
+    def test_compacted_history_is_archived(self):
+        order = self.create_order(Order.Status.DELIVERED, days_old=400)
+        logs = DeliveryStatusLog.objects.filter(delivery__order=order).count()
+
+        list(compact_delivery_logs())
+        self.assertFalse(DeliveryStatusLog.objects.exists())
+        self.archive()
+
+        history = ArchivedOrder.objects.get(id=order.id).delivery_history
+        self.assertEqual(len(history), logs)
+        self.assertEqual(history[-1]['notes'], 'Order placed')
+
+
+class PromotionPricingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        promotion_index.clear()
+        self.now = timezone.now()
+        self.user = User.objects.create_user('customer@example.com', 'pw')
+        category = Category.objects.create(name='Shoes')
+        self.product = Product.objects.create(
+            category=category, name='Runner', price=Decimal('100.00'), stock_quantity=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        promotion_index.clear()
+
+    def promote(self, discount_value, discount_type='percentage', **fields):
+        fields.setdefault('start_date', self.now - timedelta(days=1))
+        fields.setdefault('end_date', self.now + timedelta(days=1))
+        promotion = ProductPromotion.objects.create(
+            name=f'{discount_value} {discount_type}', discount_type=discount_type,
+            discount_value=Decimal(discount_value), **fields
+        )
+        promotion.products.add(self.product)
+        return promotion
+
+    def quote(self):
+        return quote_products([self.product])[self.product.id]
+
+    def test_exclusive_beats_combined_stackables(self):
+        self.promote('10')
+        self.promote('5', discount_type='fixed')
+        exclusive = self.promote('20', is_exclusive=True)
+
+        quote = self.quote()
+
+        self.assertEqual(quote.price, Decimal('80.00'))
+        self.assertEqual(quote.promotions, (exclusive,))
+
+    def test_stackables_combine_percentage_first(self):
+        self.promote('10', is_exclusive=True)
+        self.promote('10')
+        self.promote('10', discount_type='fixed')
+
+        # 100 - 10% - 10 = 80, better than the exclusive 90
+        self.assertEqual(self.quote().price, Decimal('80.00'))
+
+    def test_only_the_highest_priority_tier_applies(self):
+        top = self.promote('5', priority=2)
+        self.promote('50', priority=1, is_exclusive=True)
+
+        quote = self.quote()
+
+        self.assertEqual(quote.price, Decimal('95.00'))
+        self.assertEqual(quote.promotions, (top,))
+
+    def test_expired_and_future_promotions_do_not_apply(self):
+        self.promote('50', start_date=self.now - timedelta(days=3), end_date=self.now - timedelta(hours=1))
+        self.promote('50', start_date=self.now + timedelta(hours=1), end_date=self.now + timedelta(days=3))
+        self.promote('50', is_active=False)
+
+        quote = self.quote()
+
+        self.assertEqual(quote.price, Decimal('100.00'))
+        self.assertEqual(quote.promotions, ())
+
+    def test_checkout_charges_the_quoted_price(self):
+        self.promote('15')
+        self.promote('2.50', discount_type='fixed')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=3)
+        quoted = self.quote().price
+        cart_total = self.client.get('/api/cart/').data['total']
+
+        response = self.client.post('/api/orders/checkout/', {'shipping_address': '1 Road, Harare'}, format='json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(quoted, Decimal('82.50'))
+        self.assertEqual(order.items.get().unit_price, quoted)
+        self.assertEqual(order.total_amount, quoted * 3)
+        self.assertEqual(order.total_amount, cart_total)
@@ -4,11 +4,14 @@ from rest_framework import status, permissions
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 
-from .models import Order, OrderItem
-from .serializers import OrderSerializer
+from .models import Order, OrderItem, ArchivedOrder
+from .serializers import OrderSerializer, serialize_order
+from .archive import get_order_or_archived, iter_orders_with_archive
 from .emails import send_order_confirmation_email
+from accounts.models import Address
 from cart.models import Cart
 from products.models import Product
+from promotions.pricing import quote_products
 
 
 class CheckoutView(APIView):
@@ -24,6 +27,28 @@ class CheckoutView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        shipping_address = request.data.get('shipping_address', '')
+        # Optional; parsed from the address when not given
+        shipping_city = request.data.get('shipping_city', '')
+        if not isinstance(shipping_address, str) or not isinstance(shipping_city, str):
+            return Response(
+                {"detail": "shipping_address and shipping_city must be strings"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # A saved address supplies its city (and the address, if none was typed)
+        address_id = request.data.get('address_id')
+        if address_id not in (None, ''):
+            try:
+                address = Address.objects.get(id=int(address_id), user=request.user)
+            except (TypeError, ValueError, Address.DoesNotExist):
+                return Response(
+                    {"detail": "Address not found"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            shipping_address = shipping_address or f"{address.address_line}\n{address.city}"
+            shipping_city = address.city
+
         total = 0
         
         # Create order WITH shipping_address
@@ -32,12 +57,19 @@ class CheckoutView(APIView):
             total_amount=0,  
             status='PLACED',
             payment_status='PAID',
-            shipping_address=request.data.get('shipping_address', '')  
+            shipping_address=shipping_address,
+            shipping_city=shipping_city
         )
 
+        items = list(cart.items.select_related('product'))
+
+        # Charge promotional prices, resolved exactly as the catalog shows them
+        quotes = quote_products([item.product for item in items])
+
         # Process order items
-        for item in cart.items.select_related('product'):
+        for item in items:
             product = item.product
+            unit_price = quotes[product.id].price
 
             if product.stock_quantity < item.quantity:
                 raise ValueError(f"Not enough stock for {product.name}")
@@ -51,10 +83,10 @@ class CheckoutView(APIView):
                 order=order,
                 product=product,
                 quantity=item.quantity,
-                unit_price=product.price
+                unit_price=unit_price
             )
 
-            total += product.price * item.quantity
+            total += unit_price * item.quantity
 
         # Update order total
         order.total_amount = total
@@ -75,9 +107,20 @@ class OrderListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        orders = Order.objects.filter(user=request.user).prefetch_related(
+            'items__product'
+        ).order_by('-created_at')
+
+        # Older orders live in the archive tables; merge them back in so the
+        # customer still sees their full history
+        archived_orders = ArchivedOrder.objects.filter(user=request.user).prefetch_related(
+            'items__product'
+        ).order_by('-created_at')
+
+        return Response([
+            serialize_order(order)
+            for order in iter_orders_with_archive(orders, archived_orders)
+        ])
 
 
 
@@ -85,6 +128,5 @@ class OrderDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id, user=request.user)
-        serializer = OrderSerializer(order)
-        return Response(serializer.data)
\ No newline at end of file
+        order = get_order_or_archived(order_id, user=request.user)
+        return Response(serialize_order(order))
@@ -4,6 +4,39 @@ from django.conf import settings
 User = settings.AUTH_USER_MODEL
 
 
+class LoadedValuesMixin:
+    """
+    Remembers the values of TRACKED_FIELDS as loaded from (or last saved
+    to) the database, so post_save receivers can tell what changed without
+    re-querying the row.
+    """
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have run against the old values; from here on
+        # the saved values are the baseline
+        self.remember_loaded_values(kwargs.get('update_fields'))
+
+    def remember_loaded_values(self, fields=None):
+        """Record the current values of TRACKED_FIELDS as the saved state"""
+        loaded = getattr(self, '_loaded_values', {})
+        for field in self.TRACKED_FIELDS:
+            if fields is None or field in fields:
+                loaded[field] = self.__dict__.get(field)
+        self._loaded_values = loaded
+
+    def get_loaded_value(self, field):
+        """Value of a tracked field as last loaded or saved, or None if unknown"""
+        return getattr(self, '_loaded_values', {}).get(field)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=150, unique=True)
     parent = models.ForeignKey(
@@ -21,7 +54,7 @@ class Category(models.Model):
         return self.name
 
 
-class Product(models.Model):
+class Product(LoadedValuesMixin, models.Model):
     category = models.ForeignKey(
         Category,
         related_name='products',
@@ -34,6 +67,11 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    TRACKED_FIELDS = ('stock_quantity',)
+
+    # Active products with less stock than this count as low on stock
+    LOW_STOCK_THRESHOLD = 10
+
     def __str__(self):
         return self.name
 
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Category, Product, ProductImage
-from django.utils import timezone
+from promotions.pricing import quote_products, quote_product, discount_percentage
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -20,6 +20,16 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ('id', 'image')
 
 
+class ProductListSerializer(serializers.ListSerializer):
+    """Prices every product of a listing in one pass before serializing"""
+
+    def to_representation(self, data):
+        products = data.all() if hasattr(data, 'all') else data
+        products = list(products)
+        self.context.setdefault('price_quotes', {}).update(quote_products(products))
+        return super().to_representation(products)
+
+
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     uploaded_images = serializers.ListField(
@@ -54,17 +64,21 @@ class ProductSerializer(serializers.ModelSerializer):
             'promotional_price',
             'discount_percentage',
         )
+        list_serializer_class = ProductListSerializer
+
+    def get_price_quote(self, obj):
+        """Promotion price quote for a product, computed once per response"""
+        quotes = self.context.setdefault('price_quotes', {})
+        if obj.id not in quotes:
+            quotes[obj.id] = quote_product(obj)
+        return quotes[obj.id]
 
     def get_active_promotion(self, obj):
-        """Get the first active promotion for this product"""
-        now = timezone.now()
-        active_promotion = obj.promotions.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).first()
+        """Get the main promotion applied to this product's price"""
+        quote = self.get_price_quote(obj)
         
-        if active_promotion:
+        if quote.promotions:
+            active_promotion = quote.promotions[0]
             return {
                 'id': active_promotion.id,
                 'name': active_promotion.name,
@@ -75,38 +89,23 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def get_promotional_price(self, obj):
         """Calculate promotional price if promotion exists"""
-        now = timezone.now()
-        active_promotion = obj.promotions.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).first()
+        quote = self.get_price_quote(obj)
         
-        if active_promotion:
-            return active_promotion.calculate_discounted_price(obj.price)
+        if quote.promotions:
+            return quote.price
         return None
 
     def get_discount_percentage(self, obj):
         """Get discount percentage for display"""
-        now = timezone.now()
-        active_promotion = obj.promotions.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).first()
+        quote = self.get_price_quote(obj)
         
-        if active_promotion:
-            return active_promotion.get_discount_percentage(obj.price)
+        if quote.promotions:
+            return discount_percentage(quote)
         return None
 
     def get_has_promotion(self, obj):
         """Check if product has any active promotion"""
-        now = timezone.now()
-        return obj.promotions.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).exists()
+        return bool(self.get_price_quote(obj).promotions)
 
     def create(self, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
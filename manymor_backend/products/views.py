@@ -1,5 +1,8 @@
 from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Sum, Q, F
+from django.utils import timezone
+from datetime import timedelta
 
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer
@@ -17,7 +20,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related('category').prefetch_related('images', 'promotions').filter(is_active=True)
+    queryset = Product.objects.select_related('category').prefetch_related('images').filter(is_active=True)
     serializer_class = ProductSerializer
 
     filter_backends = [
@@ -27,6 +30,30 @@ class ProductViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     filterset_fields = ['category']
 
+    # Window used by ?ordering=trending
+    TRENDING_DAYS = 7
+
+    def get_queryset(self):
+        """
+        Support ?ordering=trending (units sold in the last TRENDING_DAYS days)
+        and ?ordering=best_selling (all-time units), both served from the
+        precomputed per-product daily sales.
+        """
+        queryset = super().get_queryset()
+        ordering = self.request.query_params.get('ordering')
+
+        if ordering == 'trending':
+            since = timezone.localdate() - timedelta(days=self.TRENDING_DAYS)
+            queryset = queryset.annotate(
+                units_sold=Sum('daily_sales__units', filter=Q(daily_sales__date__gt=since))
+            )
+        elif ordering == 'best_selling':
+            queryset = queryset.annotate(units_sold=Sum('daily_sales__units'))
+        else:
+            return queryset
+
+        return queryset.order_by(F('units_sold').desc(nulls_last=True), '-created_at')
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminUserRole()]
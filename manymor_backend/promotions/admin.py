@@ -29,8 +29,8 @@ class CarouselPromotionAdmin(admin.ModelAdmin):
 
 @admin.register(ProductPromotion)
 class ProductPromotionAdmin(admin.ModelAdmin):
-    list_display = ['name', 'discount_type', 'discount_value', 'is_active', 'start_date', 'end_date']
-    list_filter = ['is_active', 'discount_type', 'start_date', 'end_date']
+    list_display = ['name', 'discount_type', 'discount_value', 'priority', 'is_exclusive', 'is_active', 'start_date', 'end_date']
+    list_filter = ['is_active', 'is_exclusive', 'discount_type', 'start_date', 'end_date']
     search_fields = ['name', 'description']
     list_editable = ['is_active']
     filter_horizontal = ['products']
@@ -44,6 +44,12 @@ class ProductPromotionAdmin(admin.ModelAdmin):
         ('Discount Settings', {
             'fields': ('discount_type', 'discount_value')
         }),
+        ('Stacking', {
+            'fields': ('priority', 'is_exclusive'),
+            'description': 'Only the highest priority tier of active promotions applies. Within it, '
+                           'the customer gets the lower of each exclusive promotion and all '
+                           'stackable promotions combined.'
+        }),
         ('Badge Display', {
             'fields': ('badge_text', 'badge_color'),
             'description': 'Configure how the promotion appears on product cards'
@@ -0,0 +1,127 @@
+"""
+Set-based assignment of products to a promotion.
+
+Products are selected with filters (category subtree, price range, search
+term, stock status) and added or removed with a single statement against
+the promotion/product through table, instead of shipping and looping over
+explicit id lists. Raw through-table writes do not send m2m_changed, so the
+promotion version is bumped here.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from products.models import Category, Product
+from .cache import bump_promotions_version
+from .models import ProductPromotion
+
+
+STOCK_STATUSES = ('in_stock', 'low_stock', 'out_of_stock')
+
+FILTER_FIELDS = ('category', 'min_price', 'max_price', 'search', 'stock_status')
+
+
+def category_subtree_ids(category_id):
+    """Ids of a category and all its descendants (one query)"""
+    children = {}
+    for pk, parent_id in Category.objects.values_list('id', 'parent_id'):
+        children.setdefault(parent_id, []).append(pk)
+
+    ids, pending = [], [category_id]
+    while pending:
+        current = pending.pop()
+        ids.append(current)
+        pending.extend(children.get(current, ()))
+    return ids
+
+
+def _decimal(value, name):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{name} must be a number')
+
+
+def filter_products(criteria):
+    """
+    Active products matching ``criteria`` (a dict with any of FILTER_FIELDS).
+    Raises ValueError for invalid or missing criteria.
+    """
+    if not any(criteria.get(field) not in (None, '') for field in FILTER_FIELDS):
+        raise ValueError(f"Provide at least one of: {', '.join(FILTER_FIELDS)}")
+
+    products = Product.objects.filter(is_active=True)
+
+    category = criteria.get('category')
+    if category not in (None, ''):
+        try:
+            category = int(category)
+        except (TypeError, ValueError):
+            raise ValueError('category must be an integer id')
+        if not Category.objects.filter(id=category).exists():
+            raise ValueError(f'Category {category} does not exist')
+        products = products.filter(category_id__in=category_subtree_ids(category))
+
+    if criteria.get('min_price') not in (None, ''):
+        products = products.filter(price__gte=_decimal(criteria['min_price'], 'min_price'))
+    if criteria.get('max_price') not in (None, ''):
+        products = products.filter(price__lte=_decimal(criteria['max_price'], 'max_price'))
+
+    search = criteria.get('search')
+    if search:
+        products = products.filter(Q(name__icontains=search) | Q(description__icontains=search))
+
+    stock_status = criteria.get('stock_status')
+    if stock_status:
+        if stock_status not in STOCK_STATUSES:
+            raise ValueError(f"stock_status must be one of: {', '.join(STOCK_STATUSES)}")
+        if stock_status == 'in_stock':
+            products = products.filter(stock_quantity__gt=0)
+        elif stock_status == 'low_stock':
+            products = products.filter(stock_quantity__gt=0, stock_quantity__lt=Product.LOW_STOCK_THRESHOLD)
+        else:
+            products = products.filter(stock_quantity=0)
+
+    return products
+
+
+def assign_products(promotion, products):
+    """
+    Add every product of ``products`` to ``promotion`` with one
+    INSERT ... SELECT, skipping existing memberships. Returns the number added.
+    """
+    through = ProductPromotion.products.through
+    quote = connection.ops.quote_name
+    table = quote(through._meta.db_table)
+    promotion_column = quote(through._meta.get_field('productpromotion').column)
+    product_column = quote(through._meta.get_field('product').column)
+
+    select_sql, select_params = products.order_by().values('id').query.sql_with_params()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({promotion_column}, {product_column}) '
+            f'SELECT %s, candidate.id FROM ({select_sql}) candidate '
+            f'WHERE NOT EXISTS ('
+            f'SELECT 1 FROM {table} existing '
+            f'WHERE existing.{promotion_column} = %s AND existing.{product_column} = candidate.id)',
+            [promotion.pk, *select_params, promotion.pk]
+        )
+        added = cursor.rowcount
+        if added:
+            transaction.on_commit(bump_promotions_version)
+    return added
+
+
+def unassign_products(promotion, products):
+    """Remove every product of ``products`` from ``promotion`` with one DELETE"""
+    through = ProductPromotion.products.through
+    with transaction.atomic():
+        removed, _ = through.objects.filter(
+            productpromotion=promotion,
+            product__in=products.order_by().values('id')
+        ).delete()
+        if removed:
+            transaction.on_commit(bump_promotions_version)
+    return removed
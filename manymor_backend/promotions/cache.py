@@ -0,0 +1,23 @@
+"""
+Shared promotion schedule version.
+
+Any change to a promotion (or to which products it covers) bumps a version
+number in the shared cache. Cached promotion data embeds or checks the
+version, so every process drops stale entries without explicit deletes.
+"""
+import time
+
+from django.core.cache import cache
+
+
+PROMOTIONS_VERSION_KEY = 'promotions:version'
+
+
+def get_promotions_version():
+    """Current promotion schedule version"""
+    return cache.get_or_set(PROMOTIONS_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_promotions_version():
+    """Invalidate everything cached against the current version"""
+    cache.set(PROMOTIONS_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,82 @@
+"""
+Cached active carousel for the homepage.
+
+The active banner set only changes when an admin edits a banner (which
+bumps the promotion version, see promotions.cache) or when a banner's
+start_date/end_date passes. The serialized carousel is therefore cached
+until the next such boundary, and responses carry Cache-Control headers
+derived from the same instant so browsers and CDNs can cache it too.
+"""
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .cache import get_promotions_version
+from .models import CarouselPromotion
+
+
+CAROUSEL_CACHE_KEY = 'promotions:carousel'
+
+# Upper bounds on how long a carousel may be reused when no boundary is
+# near: server-side and shared caches can hold it longer than browsers,
+# which cannot be told about admin edits.
+CAROUSEL_CACHE_SECONDS = 3600
+CAROUSEL_SHARED_MAX_AGE = 3600
+CAROUSEL_BROWSER_MAX_AGE = 300
+
+
+def active_carousel_queryset(now):
+    return CarouselPromotion.objects.filter(
+        is_active=True,
+        start_date__lte=now,
+        end_date__gte=now
+    ).order_by('display_order', '-created_at')
+
+
+def next_carousel_boundary(now):
+    """Earliest future instant at which the active banner set changes"""
+    bounds = CarouselPromotion.objects.filter(is_active=True).aggregate(
+        next_start=Min('start_date', filter=Q(start_date__gt=now)),
+        next_end=Min('end_date', filter=Q(end_date__gte=now))
+    )
+    boundaries = [
+        bounds['next_start'],
+        # end_date is inclusive, the banner disappears just after it
+        bounds['next_end'] and bounds['next_end'] + timedelta(microseconds=1),
+    ]
+    return min((boundary for boundary in boundaries if boundary), default=None)
+
+
+def get_active_carousel(serialize, base_url):
+    """
+    Return ``(data, expires_at)`` for the active carousel, computing it with
+    ``serialize(queryset)`` on a miss. ``base_url`` is part of the key since
+    image URLs are absolute.
+    """
+    key = f'{CAROUSEL_CACHE_KEY}:{get_promotions_version()}:{base_url}'
+    entry = cache.get(key)
+    now = timezone.now()
+    if entry is not None and entry[1] > now:
+        return entry
+
+    boundary = next_carousel_boundary(now)
+    expires_at = now + timedelta(seconds=CAROUSEL_CACHE_SECONDS)
+    if boundary is not None:
+        expires_at = min(expires_at, boundary)
+
+    entry = (serialize(active_carousel_queryset(now)), expires_at)
+    cache.set(key, entry, timeout=max(1, math.ceil((expires_at - now).total_seconds())))
+    return entry
+
+
+def set_cache_headers(response, expires_at):
+    """Public Cache-Control expiring no later than the next boundary"""
+    remaining = max(0, int((expires_at - timezone.now()).total_seconds()))
+    response['Cache-Control'] = (
+        f'public, max-age={min(remaining, CAROUSEL_BROWSER_MAX_AGE)}, '
+        f's-maxage={min(remaining, CAROUSEL_SHARED_MAX_AGE)}'
+    )
+    return response
@@ -0,0 +1,152 @@
+"""
+Process-local index of product promotion schedules.
+
+All active, not yet ended product promotions are loaded in one query and
+turned into a per-product timeline: sorted boundary instants, each with the
+promotions active from that instant until the next one. "Which promotions
+apply to product X at time T" is then a dict lookup plus a bisect, with no
+SQL.
+
+The index reloads itself when the earliest boundary it knows of passes (so
+it never holds ended promotions for long) and when the promotion version in
+the shared cache changes, which promotion saves and product membership
+changes bump (see promotions.signals). The version is checked at most once
+every VERSION_CHECK_SECONDS.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .cache import get_promotions_version
+from .models import ProductPromotion
+
+
+VERSION_CHECK_SECONDS = 2
+
+# end_date is inclusive; timelines use half-open [start, end + RESOLUTION)
+RESOLUTION = timedelta(microseconds=1)
+
+Snapshot = namedtuple('Snapshot', 'timelines next_boundary version loaded_at')
+
+
+def build_timeline(promotions):
+    """
+    Return ``(instants, active)`` for one product: ``active[i]`` holds the
+    promotions in effect from ``instants[i]`` until ``instants[i + 1]``,
+    most recently created first.
+    """
+    points = sorted(
+        {promotion.start_date for promotion in promotions}
+        | {promotion.end_date + RESOLUTION for promotion in promotions}
+    )
+
+    instants, active = [], []
+    for point in points:
+        current = tuple(sorted(
+            (p for p in promotions if p.start_date <= point < p.end_date + RESOLUTION),
+            key=lambda p: (p.created_at, p.id),
+            reverse=True
+        ))
+        # Skip boundaries that do not change anything
+        if active and active[-1] == current:
+            continue
+        instants.append(point)
+        active.append(current)
+    return instants, active
+
+
+class PromotionIndex:
+    """Per-product promotion timelines answering lookups in O(log n)"""
+
+    def __init__(self, version_check_seconds=VERSION_CHECK_SECONDS):
+        self.version_check_seconds = version_check_seconds
+        self._snapshot = None
+        self._next_version_check = 0
+        self._lock = threading.Lock()
+
+    def load(self, now=None):
+        """Rebuild the index from the database with a single query"""
+        now = now or timezone.now()
+        # Read the version first: a bump racing with the query triggers
+        # another reload instead of being lost
+        version = get_promotions_version()
+
+        memberships = ProductPromotion.products.through.objects.filter(
+            productpromotion__is_active=True,
+            productpromotion__end_date__gte=now
+        ).select_related('productpromotion')
+
+        by_product = defaultdict(list)
+        promotions = {}
+        for membership in memberships:
+            # Share one instance per promotion across all its products
+            promotion = promotions.setdefault(membership.productpromotion_id, membership.productpromotion)
+            by_product[membership.product_id].append(promotion)
+
+        timelines = {
+            product_id: build_timeline(product_promotions)
+            for product_id, product_promotions in by_product.items()
+        }
+        upcoming = [
+            instant
+            for instants, _ in timelines.values()
+            for instant in instants
+            if instant > now
+        ]
+
+        self._snapshot = Snapshot(timelines, min(upcoming, default=None), version, now)
+        self._next_version_check = time.monotonic() + self.version_check_seconds
+        return self._snapshot
+
+    def _current(self, now):
+        snapshot = self._snapshot
+        stale = (
+            snapshot is None
+            or (snapshot.next_boundary is not None and now >= snapshot.next_boundary)
+        )
+        if not stale and time.monotonic() >= self._next_version_check:
+            self._next_version_check = time.monotonic() + self.version_check_seconds
+            stale = get_promotions_version() != snapshot.version
+        if not stale:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._snapshot is not snapshot:
+                return self._snapshot
+            return self.load(now)
+
+    @property
+    def next_boundary(self):
+        """Earliest future instant at which any product's promotions change"""
+        return self._current(timezone.now()).next_boundary
+
+    def active_promotions(self, product_id, when=None):
+        """
+        Promotions in effect for a product at ``when`` (default now), newest
+        first. Only instants after the last reload are covered; ended
+        promotions are not indexed.
+        """
+        now = timezone.now()
+        when = when or now
+        timeline = self._current(now).timelines.get(product_id)
+        if timeline is None:
+            return ()
+        instants, active = timeline
+        position = bisect_right(instants, when) - 1
+        return active[position] if position >= 0 else ()
+
+    def active_promotion(self, product_id, when=None):
+        """The promotion shown for a product: the most recently created active one"""
+        promotions = self.active_promotions(product_id, when)
+        return promotions[0] if promotions else None
+
+    def clear(self):
+        self._snapshot = None
+
+
+promotion_index = PromotionIndex()
@@ -0,0 +1,56 @@
+"""
+Management command sending promotion_started / promotion_ended as
+promotion schedule boundaries pass.
+Usage: python manage.py run_promotion_scheduler [--poll-interval 30] [--once]
+
+Run it as a long-lived worker process, or with --once from cron. Missed
+boundaries since the previous run (checkpointed in the database) are
+caught up on start.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from promotions.scheduler import PromotionScheduler, get_last_run, save_last_run
+from promotions.signals import promotion_started
+
+
+class Command(BaseCommand):
+    help = 'Fire promotion lifecycle events at each promotion start and end'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30,
+            help='Maximum seconds between checks for promotion edits (default: 30)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Fire the boundaries passed since the last run and exit'
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        if poll_interval <= 0:
+            raise CommandError('--poll-interval must be positive')
+
+        scheduler = PromotionScheduler(since=get_last_run())
+        self.stdout.write(f'Promotion scheduler running from {scheduler.since.isoformat()}')
+
+        while True:
+            now = timezone.now()
+            for at, signal, promotion in scheduler.run_due(now):
+                event = 'started' if signal is promotion_started else 'ended'
+                self.stdout.write(self.style.SUCCESS(f'✓ {promotion} {event} at {at.isoformat()}'))
+            save_last_run(now)
+
+            if options['once']:
+                return
+
+            # Sleep until the next boundary, but wake up regularly to notice edits
+            wait = poll_interval
+            if scheduler.next_boundary is not None:
+                wait = min(wait, (scheduler.next_boundary - timezone.now()).total_seconds())
+            time.sleep(max(wait, 0))
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('promotions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carouselpromotion',
+            index=models.Index(fields=['is_active', 'start_date', 'end_date'], name='promotions_carousel_window'),
+        ),
+        migrations.AddIndex(
+            model_name='productpromotion',
+            index=models.Index(fields=['is_active', 'start_date', 'end_date'], name='promotions_product_window'),
+        ),
+    ]
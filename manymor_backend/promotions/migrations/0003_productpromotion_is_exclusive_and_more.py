@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0002_carouselpromotion_promotions_carousel_window_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productpromotion',
+            name='is_exclusive',
+            field=models.BooleanField(default=False, help_text='Exclusive promotions are never combined with other promotions'),
+        ),
+        migrations.AddField(
+            model_name='productpromotion',
+            name='priority',
+            field=models.PositiveIntegerField(default=0, help_text='When several promotions apply, only the highest priority ones are considered'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 03:09
+
+import promotions.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0003_productpromotion_is_exclusive_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='carouselpromotion',
+            name='image',
+            field=models.ImageField(upload_to=promotions.models.ContentHashedUploadTo('promotions/carousel/')),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0004_alter_carouselpromotion_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run', models.DateTimeField()),
+            ],
+        ),
+    ]
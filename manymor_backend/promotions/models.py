@@ -1,15 +1,45 @@
+import hashlib
+import os
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-from products.models import Product
+from django.utils.deconstruct import deconstructible
+from products.models import Product, LoadedValuesMixin
+
+
+@deconstructible
+class ContentHashedUploadTo:
+    """
+    ``upload_to`` naming files after a hash of their content, so a given
+    URL always serves the same bytes and can be cached as immutable.
+    """
+    def __init__(self, prefix, field_name='image'):
+        self.prefix = prefix
+        self.field_name = field_name
 
+    def __call__(self, instance, filename):
+        content = getattr(instance, self.field_name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        extension = os.path.splitext(filename)[1].lower()
+        return f'{self.prefix}{digest.hexdigest()[:20]}{extension}'
 
-class CarouselPromotion(models.Model):
+    def __eq__(self, other):
+        return (
+            isinstance(other, ContentHashedUploadTo)
+            and (self.prefix, self.field_name) == (other.prefix, other.field_name)
+        )
+
+
+class CarouselPromotion(LoadedValuesMixin, models.Model):
     """
     Promotional banners for the homepage carousel
     """
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='promotions/carousel/')
+    image = models.ImageField(upload_to=ContentHashedUploadTo('promotions/carousel/'))
     link_url = models.URLField(blank=True, null=True, help_text="Optional link when banner is clicked")
     button_text = models.CharField(max_length=50, blank=True, help_text="Text for CTA button")
     is_active = models.BooleanField(default=True)
@@ -22,8 +52,14 @@ class CarouselPromotion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    TRACKED_FIELDS = ('is_active', 'start_date', 'end_date')
+
     class Meta:
         ordering = ['display_order', '-created_at']
+        indexes = [
+            # "Active now" window: is_active AND start_date <= now <= end_date
+            models.Index(fields=['is_active', 'start_date', 'end_date'], name='promotions_carousel_window'),
+        ]
         verbose_name = "Carousel Promotion"
         verbose_name_plural = "Carousel Promotions"
 
@@ -36,8 +72,18 @@ class CarouselPromotion(models.Model):
         now = timezone.now()
         return self.is_active and self.start_date <= now <= self.end_date
 
+    def was_active_at(self, when):
+        """Whether the promotion, as last loaded or saved, was active at ``when``"""
+        start_date = self.get_loaded_value('start_date')
+        end_date = self.get_loaded_value('end_date')
+        return bool(
+            self.get_loaded_value('is_active')
+            and start_date and end_date
+            and start_date <= when <= end_date
+        )
 
-class ProductPromotion(models.Model):
+
+class ProductPromotion(LoadedValuesMixin, models.Model):
     """
     Promotions that can be applied to specific products
     """
@@ -55,6 +101,14 @@ class ProductPromotion(models.Model):
         validators=[MinValueValidator(0)]
     )
     products = models.ManyToManyField(Product, related_name='promotions', blank=True)
+    priority = models.PositiveIntegerField(
+        default=0,
+        help_text="When several promotions apply, only the highest priority ones are considered"
+    )
+    is_exclusive = models.BooleanField(
+        default=False,
+        help_text="Exclusive promotions are never combined with other promotions"
+    )
     badge_text = models.CharField(
         max_length=50,
         blank=True,
@@ -71,8 +125,14 @@ class ProductPromotion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    TRACKED_FIELDS = ('is_active', 'start_date', 'end_date')
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "Active now" window: is_active AND start_date <= now <= end_date
+            models.Index(fields=['is_active', 'start_date', 'end_date'], name='promotions_product_window'),
+        ]
         verbose_name = "Product Promotion"
         verbose_name_plural = "Product Promotions"
 
@@ -85,6 +145,16 @@ class ProductPromotion(models.Model):
         now = timezone.now()
         return self.is_active and self.start_date <= now <= self.end_date
 
+    def was_active_at(self, when):
+        """Whether the promotion, as last loaded or saved, was active at ``when``"""
+        start_date = self.get_loaded_value('start_date')
+        end_date = self.get_loaded_value('end_date')
+        return bool(
+            self.get_loaded_value('is_active')
+            and start_date and end_date
+            and start_date <= when <= end_date
+        )
+
     def calculate_discounted_price(self, original_price):
         """Calculate the discounted price based on promotion type"""
         if self.discount_type == 'percentage':
@@ -101,3 +171,16 @@ class ProductPromotion(models.Model):
             if original_price > 0:
                 return (self.discount_value / original_price) * 100
             return 0
+
+
+class SchedulerCheckpoint(models.Model):
+    """
+    How far ``run_promotion_scheduler`` has fired boundaries. Kept in the
+    database so cron runs resume where the last one stopped and web
+    processes can follow the worker (see dashboard.promotion_events).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_run = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_run.isoformat()}"
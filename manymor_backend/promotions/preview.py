@@ -0,0 +1,105 @@
+"""
+Vectorized price preview for a product promotion.
+
+Prices of the target products are loaded once as an array of integer cents
+and the promotion's discount (same semantics as
+``ProductPromotion.calculate_discounted_price``, rounded to cents and
+clamped at zero) is applied to the whole array at once.
+"""
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+
+from products.models import Product
+
+
+DISCOUNT_TYPES = ('percentage', 'fixed')
+
+
+def to_cents(value):
+    """Decimal amount to integer cents; ValueError if not a number"""
+    try:
+        return int((Decimal(str(value)) * 100).to_integral_value())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{value!r} is not a valid amount')
+
+
+def _money(cents):
+    return str(Decimal(int(round(cents))).scaleb(-2))
+
+
+def load_prices(products):
+    """``(ids, cents)`` arrays for a product queryset, ordered by id. One query."""
+    rows = list(products.order_by('id').values_list('id', 'price'))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    cents = np.fromiter((int(row[1] * 100) for row in rows), dtype=np.int64, count=len(rows))
+    return ids, cents
+
+
+def discounted_cents(cents, discount_type, discount_value):
+    """Apply a percentage or fixed discount to an array of prices in cents"""
+    if discount_type == 'percentage':
+        # Work in basis points; add half the divisor to round half up
+        basis_points = to_cents(discount_value)
+        discounted = (cents * (10000 - basis_points) + 5000) // 10000
+    else:
+        discounted = cents - to_cents(discount_value)
+    return np.maximum(discounted, 0)
+
+
+def preview_promotion(products, discount_type, discount_value, floor=None, offset=0, limit=20):
+    """
+    Summary of what a discount would do to ``products`` plus a sample page
+    of the products losing the most, largest discount first.
+    """
+    if discount_type not in DISCOUNT_TYPES:
+        raise ValueError(f"discount_type must be one of: {', '.join(DISCOUNT_TYPES)}")
+    if to_cents(discount_value) < 0:
+        raise ValueError('discount_value cannot be negative')
+    floor_cents = to_cents(floor) if floor not in (None, '') else 0
+
+    ids, cents = load_prices(products)
+    new_cents = discounted_cents(cents, discount_type, discount_value)
+    discount = cents - new_cents
+
+    summary = {
+        'product_count': int(len(ids)),
+        'below_floor_count': 0,
+        'free_count': 0,
+        'total_price': '0.00',
+        'total_discounted_price': '0.00',
+        'total_discount': '0.00',
+        'average_discount_percentage': '0.00',
+        'min_discounted_price': None,
+        'median_discounted_price': None,
+        'max_discounted_price': None,
+        'floor': _money(floor_cents),
+    }
+    if len(ids):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentages = np.where(cents > 0, discount * 100 / cents, 0)
+        summary.update({
+            'below_floor_count': int(np.count_nonzero(new_cents < floor_cents)),
+            'free_count': int(np.count_nonzero(new_cents == 0)),
+            'total_price': _money(cents.sum()),
+            'total_discounted_price': _money(new_cents.sum()),
+            'total_discount': _money(discount.sum()),
+            'average_discount_percentage': f'{percentages.mean():.2f}',
+            'min_discounted_price': _money(new_cents.min()),
+            'median_discounted_price': _money(np.median(new_cents)),
+            'max_discounted_price': _money(new_cents.max()),
+        })
+
+    # Stable sort on the negated discount keeps ties in id order
+    order = np.argsort(-discount, kind='stable')[offset:offset + limit]
+    names = dict(Product.objects.filter(id__in=ids[order].tolist()).values_list('id', 'name'))
+    sample = [{
+        'id': int(ids[i]),
+        'name': names.get(int(ids[i])),
+        'price': _money(cents[i]),
+        'discounted_price': _money(new_cents[i]),
+        'discount': _money(discount[i]),
+        'below_floor': bool(new_cents[i] < floor_cents),
+    } for i in order.tolist()]
+
+    return summary, sample
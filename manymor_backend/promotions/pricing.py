@@ -0,0 +1,80 @@
+"""
+Promotion pricing: which active promotions apply to a product and the
+resulting price.
+
+Resolution rules, given the promotions active for a product:
+
+1. Only the highest ``priority`` tier is considered.
+2. Within that tier the candidates are each exclusive promotion on its own
+   and all stackable promotions combined (percentages first, then fixed
+   amounts, which is the order that favours the customer).
+3. The candidate giving the lowest price wins; on a tie, the first
+   candidate in that order wins.
+
+Prices are rounded to cents and never go below zero. The catalog, cart
+totals and checkout all price through here so they always agree.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from .index import promotion_index
+
+
+CENT = Decimal('0.01')
+
+PriceQuote = namedtuple('PriceQuote', 'base_price price promotions')
+
+
+def _round(amount):
+    return max(Decimal(amount), Decimal('0')).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _apply(price, promotions):
+    # Percentages before fixed amounts: the lower of the two orders
+    for promotion in sorted(promotions, key=lambda p: p.discount_type != 'percentage'):
+        price = promotion.calculate_discounted_price(price)
+    return _round(price)
+
+
+def resolve_price(base_price, promotions):
+    """Apply the resolution rules to one product's active promotions"""
+    base_price = _round(base_price)
+    if not promotions:
+        return PriceQuote(base_price, base_price, ())
+
+    top = max(promotion.priority for promotion in promotions)
+    tier = [promotion for promotion in promotions if promotion.priority == top]
+
+    candidates = [(promotion,) for promotion in tier if promotion.is_exclusive]
+    stackable = tuple(promotion for promotion in tier if not promotion.is_exclusive)
+    if stackable:
+        candidates.append(stackable)
+
+    best = min(candidates, key=lambda candidate: _apply(base_price, candidate))
+    return PriceQuote(base_price, _apply(base_price, best), best)
+
+
+def quote_products(products, when=None):
+    """
+    Price quotes for many products in one pass, keyed by product id. Active
+    promotions come from the in-memory promotion index; no queries.
+    """
+    when = when or timezone.now()
+    return {
+        product.id: resolve_price(product.price, promotion_index.active_promotions(product.id, when))
+        for product in products
+    }
+
+
+def quote_product(product, when=None):
+    """Price quote for a single product"""
+    return quote_products([product], when)[product.id]
+
+
+def discount_percentage(quote):
+    """Effective discount of a quote as a percentage of the base price"""
+    if not quote.base_price:
+        return Decimal('0')
+    return _round((quote.base_price - quote.price) / quote.base_price * 100)
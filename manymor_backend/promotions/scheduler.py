@@ -0,0 +1,94 @@
+"""
+Promotion lifecycle scheduler.
+
+Keeps a heap of upcoming promotion start and end instants and sends the
+``promotion_started`` / ``promotion_ended`` signals when each one passes,
+so derived data (promotion index, cached carousel, dashboard stats) is
+refreshed at the boundary rather than on the next read. Driven by
+``manage.py run_promotion_scheduler``.
+
+Receivers run in the scheduler's process. Cache invalidation reaches the
+web processes through the promotion version in the cache, and promotion
+edits reach the scheduler the same way, so running it as a separate worker
+needs a shared cache (CACHE_BACKEND, see settings). How far it has got is
+checkpointed in the database, which is also what web processes follow to
+push the boundaries to live dashboards.
+"""
+import heapq
+import itertools
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .cache import get_promotions_version
+from .models import CarouselPromotion, ProductPromotion, SchedulerCheckpoint
+from .signals import promotion_started, promotion_ended
+
+
+# end_date is inclusive; a promotion ends just after it
+RESOLUTION = timedelta(microseconds=1)
+
+CHECKPOINT_NAME = 'promotions'
+
+
+def get_last_run():
+    """Instant the scheduler last fired boundaries up to; None if it never ran"""
+    return SchedulerCheckpoint.objects.filter(
+        name=CHECKPOINT_NAME
+    ).values_list('last_run', flat=True).first()
+
+
+def save_last_run(at):
+    SchedulerCheckpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={'last_run': at})
+
+
+def send_signal(signal, promotion, at):
+    signal.send(sender=type(promotion), promotion=promotion, at=at)
+
+
+class PromotionScheduler:
+    """
+    Fires lifecycle signals for every boundary in ``(since, now]`` on each
+    ``run_due(now)`` call. The heap is rebuilt whenever the promotion
+    version changes, so edits made while running are picked up.
+    ``send(signal, promotion, at)`` is called for each boundary; by default
+    it sends the signal.
+    """
+
+    def __init__(self, since=None, send=send_signal):
+        self.since = since or timezone.now()
+        self.send = send
+        self.version = None
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def load(self):
+        """Rebuild the heap of boundaries after ``since``"""
+        self.version = get_promotions_version()
+        heap = []
+        for model in (CarouselPromotion, ProductPromotion):
+            for promotion in model.objects.filter(is_active=True, end_date__gte=self.since):
+                if promotion.start_date > self.since:
+                    heap.append((promotion.start_date, next(self._sequence), promotion_started, promotion))
+                heap.append((promotion.end_date + RESOLUTION, next(self._sequence), promotion_ended, promotion))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    @property
+    def next_boundary(self):
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now=None):
+        """Send the signals for every boundary up to ``now``; returns what fired"""
+        now = now or timezone.now()
+        if self.version is None or get_promotions_version() != self.version:
+            self.load()
+
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            at, _, signal, promotion = heapq.heappop(self._heap)
+            self.send(signal, promotion, at)
+            fired.append((at, signal, promotion))
+
+        self.since = now
+        return fired
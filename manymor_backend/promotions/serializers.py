@@ -38,6 +38,8 @@ class ProductPromotionSerializer(serializers.ModelSerializer):
             'description',
             'discount_type',
             'discount_value',
+            'priority',
+            'is_exclusive',
             'badge_text',
             'badge_color',
             'is_active',
@@ -0,0 +1,40 @@
+"""
+Django signals invalidating cached promotion data when promotions change,
+and the promotion lifecycle signals sent by ``manage.py run_promotion_scheduler``.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+from .models import CarouselPromotion, ProductPromotion
+from .cache import bump_promotions_version
+
+
+# Sent when a scheduled start_date / end_date passes, with the promotion
+# instance (``promotion``) and the boundary instant (``at``) as arguments
+promotion_started = Signal()
+promotion_ended = Signal()
+
+
+@receiver(post_save, sender=CarouselPromotion)
+@receiver(post_save, sender=ProductPromotion)
+@receiver(post_delete, sender=CarouselPromotion)
+@receiver(post_delete, sender=ProductPromotion)
+def promotion_changed(sender, instance, raw=False, **kwargs):
+    """Bump the schedule version once the change is committed"""
+    if raw:
+        return
+    transaction.on_commit(bump_promotions_version)
+
+
+@receiver(m2m_changed, sender=ProductPromotion.products.through)
+def promotion_products_changed(sender, instance, action, **kwargs):
+    """Adding or removing products changes which products are promoted"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_promotions_version)
+
+
+@receiver(promotion_started)
+@receiver(promotion_ended)
+def promotion_boundary_passed(sender, promotion, at, **kwargs):
+    """Refresh the promotion index, carousel and stats caches at the boundary"""
+    bump_promotions_version()
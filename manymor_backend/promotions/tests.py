@@ -1,3 +1,400 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Category, Product
+from .assignment import assign_products, filter_products, unassign_products
+from .cache import get_promotions_version
+from .carousel import CAROUSEL_CACHE_SECONDS, get_active_carousel
+from .index import RESOLUTION, PromotionIndex
+from .models import CarouselPromotion, ProductPromotion, SchedulerCheckpoint
+from .preview import discounted_cents, preview_promotion
+from .scheduler import PromotionScheduler, get_last_run, save_last_run
+from .signals import promotion_started, promotion_ended
+
+
+class PromotionTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.category = Category.objects.create(name='Shoes')
+        self.product = Product.objects.create(
+            category=self.category, name='Runner', price=Decimal('100.00'), stock_quantity=10
+        )
+
+    def promote(self, products=(), **fields):
+        fields.setdefault('name', 'Sale')
+        fields.setdefault('discount_value', Decimal('10'))
+        fields.setdefault('start_date', self.now - timedelta(days=1))
+        fields.setdefault('end_date', self.now + timedelta(days=1))
+        promotion = ProductPromotion.objects.create(**fields)
+        promotion.products.add(*products)
+        return promotion
+
+
+class PromotionIndexTests(PromotionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = PromotionIndex(version_check_seconds=0)
+
+    def test_start_is_inclusive_and_end_exclusive(self):
+        start = self.now + timedelta(hours=1)
+        end = self.now + timedelta(hours=2)
+        promotion = self.promote([self.product], start_date=start, end_date=end)
+
+        self.assertEqual(self.index.active_promotions(self.product.id, start - RESOLUTION), ())
+        self.assertEqual(self.index.active_promotions(self.product.id, start), (promotion,))
+        # end_date itself is the last instant covered
+        self.assertEqual(self.index.active_promotions(self.product.id, end), (promotion,))
+        self.assertEqual(self.index.active_promotions(self.product.id, end + RESOLUTION), ())
+
+    def test_overlapping_promotions_newest_first(self):
+        older = self.promote([self.product])
+        newer = self.promote([self.product], end_date=self.now + timedelta(hours=1))
+
+        self.assertEqual(self.index.active_promotions(self.product.id), (newer, older))
+        self.assertEqual(self.index.active_promotion(self.product.id), newer)
+        self.assertEqual(
+            self.index.active_promotions(self.product.id, self.now + timedelta(hours=2)), (older,)
+        )
+
+    def test_next_boundary(self):
+        self.promote([self.product], end_date=self.now + timedelta(hours=3))
+        starts = self.now + timedelta(hours=2)
+        self.promote([self.product], start_date=starts, end_date=self.now + timedelta(days=2))
+
+        self.assertEqual(self.index.load(self.now).next_boundary, starts)
+
+    def test_unrelated_and_inactive_promotions(self):
+        other = Product.objects.create(category=self.category, name='Walker', price=Decimal('5.00'))
+        self.promote([other])
+        self.promote([self.product], is_active=False)
+
+        self.assertEqual(self.index.active_promotions(self.product.id), ())
+
+    def test_saving_a_promotion_bumps_the_version(self):
+        promotion = self.promote([self.product])
+        self.index.load()
+        version = get_promotions_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.is_active = False
+            promotion.save()
+
+        self.assertNotEqual(get_promotions_version(), version)
+        self.assertEqual(self.index.active_promotions(self.product.id), ())
+
+    def test_adding_products_bumps_the_version(self):
+        promotion = self.promote()
+        self.assertEqual(self.index.active_promotions(self.product.id), ())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.products.add(self.product)
+
+        self.assertEqual(self.index.active_promotions(self.product.id), (promotion,))
+
+    def test_version_is_checked_at_most_every_interval(self):
+        index = PromotionIndex(version_check_seconds=3600)
+        promotion = self.promote()
+        index.load()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.products.add(self.product)
+
+        self.assertEqual(index.active_promotions(self.product.id), ())
+
+
+class CarouselCacheTests(PromotionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.serialized = []
+
+    def banner(self, title, **fields):
+        fields.setdefault('start_date', self.now - timedelta(days=1))
+        fields.setdefault('end_date', self.now + timedelta(days=1))
+        return CarouselPromotion.objects.create(title=title, image='promotions/carousel/banner.jpg', **fields)
+
+    def serialize(self, banners):
+        titles = [banner.title for banner in banners]
+        self.serialized.append(titles)
+        return titles
+
+    def carousel(self):
+        return get_active_carousel(self.serialize, 'http://testserver/')
+
+    def test_cached_until_the_next_boundary(self):
+        self.banner('Now', end_date=self.now + timedelta(minutes=10))
+        upcoming = self.banner('Soon', start_date=self.now + timedelta(minutes=5))
+
+        data, expires_at = self.carousel()
+
+        self.assertEqual(data, ['Now'])
+        self.assertEqual(expires_at, upcoming.start_date)
+        self.assertEqual(self.carousel(), (data, expires_at))
+        self.assertEqual(len(self.serialized), 1)
+
+    def test_cached_for_at_most_an_hour_without_boundaries(self):
+        self.banner('Always', end_date=self.now + timedelta(days=30))
+
+        _, expires_at = self.carousel()
+
+        self.assertLessEqual(expires_at, timezone.now() + timedelta(seconds=CAROUSEL_CACHE_SECONDS))
+
+    def test_entry_expires_at_the_boundary(self):
+        ending = self.banner('Ending', end_date=self.now + timedelta(minutes=10))
+        self.banner('Soon', start_date=self.now + timedelta(minutes=5))
+        self.carousel()
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(minutes=6)):
+            data, expires_at = self.carousel()
+        self.assertEqual(data, ['Soon', 'Ending'])
+        # end_date is inclusive, the banner goes just after it
+        self.assertEqual(expires_at, ending.end_date + timedelta(microseconds=1))
+
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(minutes=11)):
+            data, _ = self.carousel()
+        self.assertEqual(data, ['Soon'])
+        self.assertEqual(len(self.serialized), 3)
+
+    def test_editing_a_banner_invalidates(self):
+        banner = self.banner('Old')
+        self.carousel()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            banner.title = 'New'
+            banner.save()
+
+        self.assertEqual(self.carousel()[0], ['New'])
+
+    def test_cache_headers_expire_at_the_boundary(self):
+        self.banner('Now', end_date=self.now + timedelta(minutes=2))
+
+        response = self.client.get('/api/promotions/carousel-promotions/active/')
+
+        self.assertEqual(response.status_code, 200)
+        directives = dict(
+            directive.strip().partition('=')[::2] for directive in response['Cache-Control'].split(',')
+        )
+        self.assertIn('public', directives)
+        self.assertLessEqual(int(directives['max-age']), 120)
+        self.assertGreater(int(directives['max-age']), 100)
+        self.assertEqual(directives['max-age'], directives['s-maxage'])
+
+
+class AssignmentTests(PromotionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.child = Category.objects.create(name='Trail', parent=self.category)
+        other = Category.objects.create(name='Hats')
+        self.trail = Product.objects.create(
+            category=self.child, name='Trail runner', price=Decimal('60.00'), stock_quantity=5
+        )
+        self.hat = Product.objects.create(
+            category=other, name='Sun hat', description='For runners', price=Decimal('20.00'), stock_quantity=0
+        )
+        self.retired = Product.objects.create(
+            category=self.category, name='Retired', price=Decimal('30.00'), is_active=False
+        )
+        self.promotion = self.promote()
+
+    def matching(self, **criteria):
+        return set(filter_products(criteria))
+
+    def test_category_includes_subcategories(self):
+        self.assertEqual(self.matching(category=self.category.id), {self.product, self.trail})
+
+    def test_price_range_and_search(self):
+        self.assertEqual(self.matching(min_price='50', max_price='80'), {self.trail})
+        self.assertEqual(self.matching(search='trail'), {self.trail})
+        # Descriptions are searched too
+        self.assertEqual(self.matching(search='for runners'), {self.hat})
+
+    def test_stock_status(self):
+        self.assertEqual(self.matching(stock_status='in_stock'), {self.product, self.trail})
+        # Below Product.LOW_STOCK_THRESHOLD but not sold out
+        self.assertEqual(self.matching(stock_status='low_stock'), {self.trail})
+        self.assertEqual(self.matching(stock_status='out_of_stock'), {self.hat})
+
+    def test_rejects_invalid_criteria(self):
+        for criteria in ({}, {'category': 'shoes'}, {'category': 0}, {'min_price': 'cheap'},
+                         {'stock_status': 'plenty'}):
+            with self.subTest(criteria=criteria), self.assertRaises(ValueError):
+                filter_products(criteria)
+
+    def test_assign_skips_existing_members(self):
+        self.promotion.products.add(self.product)
+
+        added = assign_products(self.promotion, filter_products({'category': self.category.id}))
+
+        self.assertEqual(added, 1)
+        self.assertEqual(set(self.promotion.products.all()), {self.product, self.trail})
+
+    def test_unassign_by_filter(self):
+        self.promotion.products.add(self.product, self.trail, self.hat)
+
+        removed = unassign_products(self.promotion, filter_products({'category': self.category.id}))
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(set(self.promotion.products.all()), {self.hat})
+
+    def test_assign_bumps_the_version(self):
+        version = get_promotions_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assign_products(self.promotion, filter_products({'search': 'runner'}))
+
+        self.assertNotEqual(get_promotions_version(), version)
+
+    def test_assign_endpoint(self):
+        client = APIClient()
+        url = f'/api/promotions/product-promotions/{self.promotion.id}/assign/'
+        client.force_authenticate(User.objects.create_user('customer@example.com', 'pw'))
+        self.assertEqual(client.post(url, {'search': 'runner'}, format='json').status_code, 403)
+
+        client.force_authenticate(User.objects.create_user('admin@example.com', 'pw', role=User.Role.ADMIN))
+        response = client.post(url, {'stock_status': 'low_stock'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'added': 1, 'products_count': 1})
+        self.assertEqual(client.post(url, {}, format='json').status_code, 400)
+
+
+class PreviewTests(PromotionTestCase):
+
+    PRICES = ['19.99', '0.05', '100.00', '3.33', '0.00', '1234.57']
+
+    def per_row(self, discount_type, discount_value):
+        promotion = ProductPromotion(discount_type=discount_type, discount_value=Decimal(discount_value))
+        return [
+            Decimal(max(promotion.calculate_discounted_price(Decimal(price)), 0)).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            )
+            for price in self.PRICES
+        ]
+
+    def test_matches_per_row_prices(self):
+        cents = np.array([int(Decimal(price) * 100) for price in self.PRICES])
+        for discount_type, discount_value in [
+            ('percentage', '12.5'), ('percentage', '33.33'), ('percentage', '100'),
+            ('fixed', '5'), ('fixed', '150.00'),
+        ]:
+            with self.subTest(discount_type=discount_type, discount_value=discount_value):
+                vectorized = discounted_cents(cents, discount_type, discount_value)
+                self.assertEqual(
+                    [Decimal(int(value)).scaleb(-2) for value in vectorized],
+                    self.per_row(discount_type, discount_value)
+                )
+
+    def test_summary_and_sample(self):
+        Product.objects.all().delete()
+        for number, price in enumerate(self.PRICES):
+            Product.objects.create(category=self.category, name=f'P{number}', price=Decimal(price))
+
+        summary, sample = preview_promotion(
+            Product.objects.all(), 'fixed', '5', floor='10', offset=0, limit=2
+        )
+
+        expected = self.per_row('fixed', '5')
+        self.assertEqual(summary['product_count'], 6)
+        self.assertEqual(summary['free_count'], sum(price == 0 for price in expected))
+        self.assertEqual(summary['below_floor_count'], sum(price < 10 for price in expected))
+        self.assertEqual(summary['total_discounted_price'], str(sum(expected)))
+        self.assertEqual(summary['min_discounted_price'], '0.00')
+        self.assertEqual(summary['max_discounted_price'], '1229.57')
+        # Largest discounts first, ties in id order
+        self.assertEqual([row['name'] for row in sample], ['P0', 'P2'])
+        self.assertEqual(sample[0]['discounted_price'], '14.99')
+
+    def test_no_products(self):
+        summary, sample = preview_promotion(Product.objects.none(), 'percentage', '10')
+
+        self.assertEqual(summary['product_count'], 0)
+        self.assertIsNone(summary['median_discounted_price'])
+        self.assertEqual(sample, [])
+
+    def test_rejects_invalid_discounts(self):
+        for discount_type, discount_value in [('bogo', '1'), ('fixed', '-1'), ('fixed', 'lots')]:
+            with self.subTest(discount_type=discount_type), self.assertRaises(ValueError):
+                preview_promotion(Product.objects.all(), discount_type, discount_value)
+
+
+class SchedulerTests(PromotionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sent = []
+
+    def send(self, signal, promotion, at):
+        self.sent.append((at, 'started' if signal is promotion_started else 'ended', promotion.name))
+
+    def test_fires_each_boundary_once(self):
+        self.promote(name='A', start_date=self.now + timedelta(hours=1), end_date=self.now + timedelta(hours=3))
+        scheduler = PromotionScheduler(since=self.now, send=self.send)
+
+        scheduler.run_due(self.now + timedelta(hours=2))
+        scheduler.run_due(self.now + timedelta(hours=2))
+        scheduler.run_due(self.now + timedelta(hours=4))
+
+        self.assertEqual([(kind, name) for _, kind, name in self.sent], [('started', 'A'), ('ended', 'A')])
+        self.assertEqual(self.sent[1][0], self.now + timedelta(hours=3, microseconds=1))
+
+    def test_resumes_from_the_checkpoint_without_refiring(self):
+        checkpoint = self.now + timedelta(hours=2)
+        # Starts exactly at the checkpoint: fired before it, not after
+        self.promote(name='A', start_date=checkpoint, end_date=self.now + timedelta(hours=3))
+        # Ends just after the checkpoint
+        self.promote(name='B', start_date=self.now + timedelta(hours=1), end_date=checkpoint)
+
+        first = PromotionScheduler(since=self.now, send=self.send)
+        first.run_due(checkpoint)
+        save_last_run(checkpoint)
+        self.assertEqual([(kind, name) for _, kind, name in self.sent], [('started', 'B'), ('started', 'A')])
+
+        self.sent.clear()
+        resumed = PromotionScheduler(since=get_last_run(), send=self.send)
+        resumed.run_due(self.now + timedelta(hours=4))
+
+        self.assertEqual([(kind, name) for _, kind, name in self.sent], [('ended', 'B'), ('ended', 'A')])
+
+    def test_picks_up_edits_through_the_version(self):
+        scheduler = PromotionScheduler(since=self.now, send=self.send)
+        scheduler.run_due(self.now)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.promote(name='A', start_date=self.now + timedelta(minutes=5))
+
+        scheduler.run_due(self.now + timedelta(minutes=10))
+        self.assertEqual([(kind, name) for _, kind, name in self.sent], [('started', 'A')])
+
+    def test_command_checkpoints_between_runs(self):
+        received = []
+
+        def receiver(sender, promotion, at, **kwargs):
+            received.append(promotion.name)
+
+        promotion_started.connect(receiver)
+        promotion_ended.connect(receiver)
+        self.addCleanup(promotion_started.disconnect, receiver)
+        self.addCleanup(promotion_ended.disconnect, receiver)
+        save_last_run(self.now - timedelta(hours=2))
+        self.promote(name='A', start_date=self.now - timedelta(hours=1))
+
+        call_command('run_promotion_scheduler', '--once', stdout=StringIO())
+        call_command('run_promotion_scheduler', '--once', stdout=StringIO())
 
-# Create your tests here.
+        self.assertEqual(received, ['A'])
+        self.assertEqual(SchedulerCheckpoint.objects.count(), 1)
+        self.assertGreaterEqual(get_last_run(), self.now)
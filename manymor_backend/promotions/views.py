@@ -4,6 +4,10 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import CarouselPromotion, ProductPromotion
 from .serializers import CarouselPromotionSerializer, ProductPromotionSerializer
+from .carousel import active_carousel_queryset, get_active_carousel, set_cache_headers
+from .assignment import filter_products, assign_products, unassign_products, FILTER_FIELDS
+from .preview import preview_promotion
+from products.models import Product
 from products.permissions import IsAdminUserRole
 
 
@@ -40,29 +44,27 @@ class CarouselPromotionViewSet(viewsets.ModelViewSet):
         
         # If 'active_only' parameter is passed, filter to currently active promotions
         if self.request.query_params.get('active_only', 'false').lower() == 'true':
-            now = timezone.now()
-            queryset = queryset.filter(
-                is_active=True,
-                start_date__lte=now,
-                end_date__gte=now
-            )
+            queryset = active_carousel_queryset(timezone.now())
         
         return queryset.order_by('display_order', '-created_at')
 
+    def list(self, request, *args, **kwargs):
+        # The public active-only listing is the same as the cached carousel
+        if request.query_params.get('active_only', 'false').lower() == 'true':
+            return self.active(request)
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
     def active(self, request):
         """
-        Get only currently active carousel promotions for frontend display
+        Get only currently active carousel promotions for frontend display.
+        Cached until the next banner starts or ends (or any banner is edited).
         """
-        now = timezone.now()
-        active_promotions = self.queryset.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).order_by('display_order')
-        
-        serializer = self.get_serializer(active_promotions, many=True)
-        return Response(serializer.data)
+        data, expires_at = get_active_carousel(
+            lambda promotions: self.get_serializer(promotions, many=True).data,
+            request.build_absolute_uri('/')
+        )
+        return set_cache_headers(Response(data), expires_at)
 
 
 class ProductPromotionViewSet(viewsets.ModelViewSet):
@@ -105,6 +107,30 @@ class ProductPromotionViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(active_promotions, many=True)
         return Response(serializer.data)
 
+    def _validate_product_ids(self, product_ids):
+        """Return (ids, None) if every id is an existing product, else (None, error response)"""
+        if not isinstance(product_ids, list):
+            return None, Response(
+                {"error": "product_ids must be a list"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            product_ids = {int(product_id) for product_id in product_ids}
+        except (TypeError, ValueError):
+            return None, Response(
+                {"error": "product_ids must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - existing)
+        if missing:
+            return None, Response(
+                {"error": "Some products do not exist", "missing_product_ids": missing},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return sorted(product_ids), None
+
     @action(detail=True, methods=['post'])
     def add_products(self, request, pk=None):
         """
@@ -129,6 +155,10 @@ class ProductPromotionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        product_ids, error = self._validate_product_ids(product_ids)
+        if error:
+            return error
+        
         promotion.products.add(*product_ids)
         
         serializer = self.get_serializer(promotion)
@@ -158,7 +188,104 @@ class ProductPromotionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        product_ids, error = self._validate_product_ids(product_ids)
+        if error:
+            return error
+        
         promotion.products.remove(*product_ids)
         
         serializer = self.get_serializer(promotion)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def assign(self, request, pk=None):
+        """
+        Add every product matching a filter to a promotion in one statement
+        Expects any of: {"category": 1, "min_price": "10", "max_price": "50",
+                         "search": "shirt", "stock_status": "in_stock"}
+        The category filter includes its subcategories.
+        """
+        return self._bulk_update_products(request, assign_products, 'added')
+
+    @action(detail=True, methods=['post'])
+    def unassign(self, request, pk=None):
+        """
+        Remove every product matching a filter from a promotion in one statement
+        Accepts the same filters as assign.
+        """
+        return self._bulk_update_products(request, unassign_products, 'removed')
+
+    def _bulk_update_products(self, request, operation, result_key):
+        # Check if user has ADMIN role
+        if not (request.user.is_authenticated and 
+                hasattr(request.user, 'role') and 
+                request.user.role == 'ADMIN'):
+            return Response(
+                {"error": "Only admin users can modify promotions"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        promotion = self.get_object()
+        
+        try:
+            products = filter_products(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        count = operation(promotion, products)
+        
+        # Count afresh: the products prefetched by get_queryset are stale now
+        return Response({
+            result_key: count,
+            'products_count': ProductPromotion.products.through.objects.filter(
+                productpromotion=promotion
+            ).count()
+        })
+
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """
+        Preview the prices a promotion would produce before activating it.
+        Targets the promotion's products, or the products matching the
+        assign filters if any are given. discount_type and discount_value
+        default to the promotion's own; floor counts products that would
+        drop below that price. The sample is paged with page/page_size.
+        """
+        # Check if user has ADMIN role
+        if not (request.user.is_authenticated and 
+                hasattr(request.user, 'role') and 
+                request.user.role == 'ADMIN'):
+            return Response(
+                {"error": "Only admin users can preview promotions"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        promotion = self.get_object()
+        params = request.query_params
+        
+        try:
+            if any(params.get(field) for field in FILTER_FIELDS):
+                products = filter_products(params)
+            else:
+                products = Product.objects.filter(promotions=promotion)
+            
+            page = max(1, int(params.get('page', 1)))
+            page_size = max(1, min(int(params.get('page_size', 20)), 100))
+            
+            summary, sample = preview_promotion(
+                products,
+                params.get('discount_type', promotion.discount_type),
+                params.get('discount_value', promotion.discount_value),
+                floor=params.get('floor'),
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'summary': summary,
+            'sample': sample,
+            'page': page,
+            'page_size': page_size
+        })